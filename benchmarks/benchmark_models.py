@@ -1,80 +1,230 @@
-import os
+"""Compare hosted models on job-offer generation.
+
+Every (model, context, sample) cell is written to a JSONL results store as
+soon as it finishes, so a crash or rate limit only loses in-flight cells:
+rerunning skips everything already recorded.
+
+    python benchmarks/benchmark_models.py --samples 2
+    python benchmarks/benchmark_models.py --models gpt-4o sonnet-4 --log
+"""
+
+import argparse
 import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "summarizer"))
+
 import art
-from art.skypilot.backend import SkyPilotBackend
-from summarizer.get_judge_completion import clear_judge_cache
-from summarizer.load_documents import load_documents
-from summarizer.rollout import rollout, SummarizerScenario
-from summarizer.train import CLUSTER_NAME, PROJECT_NAME
-
-
-gpt_4o = art.Model(
-    name="gpt-4o",
-    project=PROJECT_NAME,
-    inference_model_name="openai/gpt-4o",
-    inference_api_key=os.getenv("OPENROUTER_API_KEY"),
-    inference_base_url="https://openrouter.ai/api/v1",
-)
-
-gpt_4_1 = art.Model(
-    name="gpt-4.1",
-    project=PROJECT_NAME,
-    inference_model_name="openai/gpt-4.1",
-    inference_api_key=os.getenv("OPENROUTER_API_KEY"),
-    inference_base_url="https://openrouter.ai/api/v1",
-)
-
-gemini_2_5_pro = art.Model(
-    name="gemini-2.5-pro",
-    project=PROJECT_NAME,
-    inference_model_name="google/gemini-2.5-pro-preview",
-    inference_api_key=os.getenv("OPENROUTER_API_KEY"),
-    inference_base_url="https://openrouter.ai/api/v1",
-)
-
-sonnet_4 = art.Model(
-    name="sonnet-4",
-    project=PROJECT_NAME,
-    inference_model_name="anthropic/claude-sonnet-4",
-    inference_api_key=os.getenv("OPENROUTER_API_KEY"),
-    inference_base_url="https://openrouter.ai/api/v1",
-)
-
-val_documents, _ = load_documents()
-
-
-async def benchmark_model(model: art.Model) -> None:
-    trajectory_groups = await art.gather_trajectory_groups(
-        (
-            art.TrajectoryGroup(
-                rollout(model, SummarizerScenario(doc=document)) for _ in range(2)
-            )
-            for document in val_documents
-        ),
-        pbar_desc=model.name,
+from get_judge_completion import clear_judge_cache
+from load_documents import JobContext, context_id, load_documents
+from rollout import JobOfferScenario, rollout
+from train import CLUSTER_NAME, PROJECT_NAME
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results", "model_benchmark.jsonl")
+
+# USD per 1M tokens (input, output), as listed on OpenRouter
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "sonnet-4": (3.00, 15.00),
+}
+
+# Max in-flight rollouts per model, to stay under each provider's rate limits
+CONCURRENCY = {
+    "gpt-4o": 16,
+    "gpt-4.1": 16,
+    "gemini-2.5-pro": 8,
+    "sonnet-4": 8,
+}
+
+
+def openrouter_model(name: str, inference_model_name: str) -> art.Model:
+    return art.Model(
+        name=name,
+        project=PROJECT_NAME,
+        inference_model_name=inference_model_name,
+        inference_api_key=os.getenv("OPENROUTER_API_KEY"),
+        inference_base_url="https://openrouter.ai/api/v1",
     )
-    await model.log(trajectories=trajectory_groups, split="val")
 
 
-async def main():
-    # clear_judge_cache()
-    backend = await SkyPilotBackend.initialize_cluster(
-        cluster_name=CLUSTER_NAME, env_path=".env", gpu="H100"
+MODELS = [
+    openrouter_model("gpt-4o", "openai/gpt-4o"),
+    openrouter_model("gpt-4.1", "openai/gpt-4.1"),
+    openrouter_model("gemini-2.5-pro", "google/gemini-2.5-pro-preview"),
+    openrouter_model("sonnet-4", "anthropic/claude-sonnet-4"),
+]
+
+
+class ResultsStore:
+    """Append-only JSONL store of finished benchmark cells."""
+
+    def __init__(self, path: str = RESULTS_PATH):
+        self.path = path
+        self.cells: Dict[tuple, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        cell = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partially written line from a crash
+                    self.cells[(cell["model"], cell["context"], cell["sample"])] = cell
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a")
+
+    def done(self, model: str, context: str, sample: int) -> bool:
+        return (model, context, sample) in self.cells
+
+    def add(self, cell: dict) -> None:
+        self.cells[(cell["model"], cell["context"], cell["sample"])] = cell
+        self._file.write(json.dumps(cell) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def for_model(self, model: str) -> List[dict]:
+        return [cell for (name, _, _), cell in self.cells.items() if name == model]
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def run_cell(model: art.Model, context: JobContext, sample: int, semaphore, store: ResultsStore) -> None:
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            trajectory = await rollout(model, JobOfferScenario(context=context))
+        except Exception as e:
+            # Not recorded, so the cell is retried on the next run
+            print(f"[{model.name}] {context.job_title} #{sample} failed: {e}")
+            return
+        latency = time.monotonic() - start
+
+    prompt_tokens = trajectory.metrics.get("prompt_tokens", 0)
+    completion_tokens = trajectory.metrics.get("completion_tokens", 0)
+    input_price, output_price = PRICES.get(model.name, (0.0, 0.0))
+    store.add(
+        {
+            "model": model.name,
+            "context": context_id(context),
+            "sample": sample,
+            "job_title": context.job_title,
+            "language": context.language,
+            "reward": trajectory.reward,
+            "latency": latency,
+            "generation_seconds": trajectory.metrics.get("generation_seconds", 0.0),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost": (prompt_tokens * input_price + completion_tokens * output_price) / 1e6,
+            "trajectory": trajectory.model_dump(mode="json"),
+        }
     )
-    models = [
-        gpt_4o,
-        gpt_4_1,
-        gemini_2_5_pro,
-        sonnet_4,
+
+
+async def benchmark_model(model: art.Model, contexts: List[JobContext], samples: int, store: ResultsStore, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    todo = [
+        (context, sample)
+        for context in contexts
+        for sample in range(samples)
+        if not store.done(model.name, context_id(context), sample)
     ]
+    skipped = len(contexts) * samples - len(todo)
+    print(f"[{model.name}] {len(todo)} cells to run, {skipped} already done (concurrency {concurrency})")
+    await asyncio.gather(*[run_cell(model, context, sample, semaphore, store) for context, sample in todo])
+
+
+def summarize(store: ResultsStore, models: List[art.Model]) -> None:
+    print("\n" + "=" * 96)
+    print(
+        f"{'Model':18s} {'Cells':>6s} {'Score':>7s} {'Lat p50':>8s} {'Lat p95':>8s} "
+        f"{'Gen p50':>8s} {'In tok':>8s} {'Out tok':>8s} {'Cost $':>9s}"
+    )
+    print("-" * 96)
     for model in models:
-        await model.register(backend)
-    # benchmark all models simultaneously
-    await asyncio.gather(*[benchmark_model(model) for model in models])
+        cells = store.for_model(model.name)
+        if not cells:
+            continue
+        latencies = sorted(c["latency"] for c in cells)
+        generation = sorted(c["generation_seconds"] for c in cells)
+        n = len(cells)
+        print(
+            f"{model.name:18s} {n:6d} "
+            f"{sum(c['reward'] for c in cells) / n:7.2f} "
+            f"{latencies[n // 2]:7.1f}s {latencies[min(n - 1, int(0.95 * n))]:7.1f}s "
+            f"{generation[n // 2]:7.1f}s "
+            f"{sum(c['prompt_tokens'] for c in cells) / n:8.0f} "
+            f"{sum(c['completion_tokens'] for c in cells) / n:8.0f} "
+            f"{sum(c['cost'] for c in cells):9.4f}"
+        )
+    print("=" * 96)
+
+
+async def log_to_backend(store: ResultsStore, models: List[art.Model]) -> None:
+    """Register the models with the backend and log the stored trajectories."""
+    from art.skypilot.backend import SkyPilotBackend
 
+    backend = await SkyPilotBackend.initialize_cluster(
+        cluster_name=CLUSTER_NAME, env_path=".env", gpu="H100"
+    )
     for model in models:
+        await model.register(backend)
+        by_context: Dict[str, List[art.Trajectory]] = {}
+        for cell in store.for_model(model.name):
+            by_context.setdefault(cell["context"], []).append(
+                art.Trajectory.model_validate(cell["trajectory"])
+            )
+        groups = [art.TrajectoryGroup(trajectories) for trajectories in by_context.values()]
+        await model.log(trajectories=groups, split="val")
         await backend._experimental_push_to_s3(model)
 
 
+async def main(args):
+    if args.clear_judge_cache:
+        clear_judge_cache()
+    val_contexts, _ = load_documents()
+    models = [m for m in MODELS if not args.models or m.name in args.models]
+
+    store = ResultsStore(args.results)
+    try:
+        # Models run simultaneously, each within its own concurrency budget
+        await asyncio.gather(
+            *[
+                benchmark_model(
+                    model,
+                    val_contexts,
+                    args.samples,
+                    store,
+                    args.concurrency or CONCURRENCY.get(model.name, 8),
+                )
+                for model in models
+            ]
+        )
+    finally:
+        store.close()
+        summarize(store, models)
+
+    if args.log:
+        await log_to_backend(store, models)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="*", help="Model names to run (default: all)")
+    parser.add_argument("--samples", type=int, default=2, help="Rollouts per validation context")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSONL results store")
+    parser.add_argument("--concurrency", type=int, help="Override every model's concurrency budget")
+    parser.add_argument("--clear-judge-cache", action="store_true")
+    parser.add_argument("--log", action="store_true", help="Log trajectories to the ART backend and push to S3")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
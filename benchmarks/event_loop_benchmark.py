@@ -0,0 +1,56 @@
+"""Compare the asyncio and uvloop event loops on the offline step benchmark.
+
+Runs benchmarks/offline_step_benchmark.py once per event loop with the same
+seed and arguments, and reports throughput and loop lag side by side. The
+defaults use short mock latencies and a large batch, so the loop itself is
+the bottleneck. uvloop is skipped when it is not installed.
+
+    python benchmarks/event_loop_benchmark.py --steps 3
+"""
+
+import asyncio
+
+from offline_step_benchmark import build_parser, run_benchmark
+
+from loop_monitor import install_event_loop
+
+LOOPS = ["asyncio", "uvloop"]
+
+
+def parse_args(argv=None):
+    parser = build_parser(__doc__)
+    # Short latencies and many rollouts, so scheduling overhead dominates
+    parser.set_defaults(
+        steps=2,
+        batch_size=40,
+        val_contexts=40,
+        policy_latency_ms=50.0,
+        judge_latency_ms=20.0,
+        judge_concurrency=200,
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = []
+    for name in LOOPS:
+        asyncio.set_event_loop_policy(None)
+        if install_event_loop(name) != name:
+            continue
+        rows.append(asyncio.run(run_benchmark(args)))
+
+    print("\n" + "=" * 80)
+    print("EVENT LOOP COMPARISON")
+    print("-" * 80)
+    print(f"{'Loop':8s} {'Steps/sec':>10s} {'Rollouts/sec':>13s} {'Judge QPS':>10s} {'Lag p99 (ms)':>13s} {'Lag max (ms)':>13s} {'Slow cb':>8s}")
+    for row in rows:
+        print(
+            f"{row['event_loop']:8s} {row['steps_per_sec']:10.3f} {row['rollouts_per_sec']:13.1f} "
+            f"{row['judge_qps']:10.1f} {row['loop_lag_p99_ms']:13.2f} {row['loop_lag_max_ms']:13.2f} {row['slow_callbacks']:8d}"
+        )
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
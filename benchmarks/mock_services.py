@@ -0,0 +1,346 @@
+"""Local stand-ins for the policy server, the Azure judge and the ART backend.
+
+Used by the offline benchmarks so a training step can be measured without
+Azure, S3 or a GPU cluster.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+from openai import AsyncOpenAI
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "summarizer"))
+
+# The judge pool builds Azure clients at import time; they are replaced below
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "mock")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1:1")
+
+import get_judge_completion
+from essential_skills import essential_skills
+from judge_pool import JudgeEndpoint, JudgePool
+from load_documents import JobContext
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), "..", "job_offer_dataset.json")
+
+EXTRA_SKILLS = ["Git", "Docker", "Communication", "Agile", "SQL", "Testing", "Leadership", "Excel"]
+
+
+def load_local_contexts(path: str = DATASET_PATH) -> list:
+    """Load job contexts from the local copy of the dataset instead of S3."""
+    with open(path) as f:
+        data = json.load(f)
+    return [
+        JobContext(
+            job_title=item["context"]["job_title"],
+            language=item["context"]["language"],
+            skills=item["context"].get("skills", []),
+        )
+        for item in data
+    ]
+
+
+def lognormal_seconds(median_ms: float, sigma: float) -> float:
+    """Sample a latency whose median is `median_ms` with a lognormal tail."""
+    return median_ms / 1000 * random.lognormvariate(0, sigma)
+
+
+def fake_job_offer(prompt: str) -> str:
+    """Build a plausible (and sometimes flawed) job offer for a generation prompt."""
+    title = re.search(r"Job Title: (.*)", prompt)
+    skills = re.search(r"Provided Skills: (.*)", prompt)
+    title = title.group(1).strip() if title else "Engineer"
+    skills = [s.strip() for s in skills.group(1).split(",")] if skills else []
+
+    # Drop some provided skills and add a few extra ones so rewards vary
+    kept = [s for s in skills if random.random() > 0.15]
+    extra = random.sample(EXTRA_SKILLS, random.randint(1, 4))
+    items = "\n".join(f"<item>{s}</item>" for s in kept + extra)
+    offer = f"""<job_offer>
+<title>{title}</title>
+<overview>
+We are looking for a {title} to join our growing team and help us deliver reliable products.
+</overview>
+<responsibilities>
+<item>Develop and maintain core features</item>
+<item>Collaborate with cross-functional teams</item>
+<item>Optimize performance and reliability</item>
+<item>Lead code reviews and share knowledge</item>
+<item>Manage priorities with stakeholders</item>
+</responsibilities>
+<skills>
+{items}
+</skills>
+<nice_to_have>
+<item>Open source contributions</item>
+<item>Cloud certifications</item>
+<item>Mentoring experience</item>
+</nice_to_have>
+</job_offer>"""
+    if random.random() < 0.1:
+        offer = offer.replace("</skills>", "")  # Malformed XML
+    if random.random() < 0.1:
+        offer += "\n\nI hope this job offer meets your needs! " * 20  # Rambling
+    return offer
+
+
+class MockPolicyServer:
+    """Minimal OpenAI-compatible /v1/chat/completions server on localhost.
+
+    With `top_logprobs` set, non-streamed completions carry vLLM-style
+    logprobs like ART's server returns: "token_id:N" tokens with their bytes
+    and `top_logprobs` alternatives per token.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 800.0,
+        sigma: float = 0.5,
+        host: str = "127.0.0.1",
+        top_logprobs: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.host = host
+        self.top_logprobs = top_logprobs
+        self.requests = 0
+        self.tokens_generated = 0
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{self.host}:{port}/v1"
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, value = line.decode().split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                request = json.loads(body) if body else {}
+
+                self.requests += 1
+                offer = fake_job_offer(request["messages"][-1]["content"])
+                latency = lognormal_seconds(self.latency_ms, self.sigma)
+                if request.get("stream"):
+                    await self._stream(writer, request, offer, latency)
+                    continue
+                await asyncio.sleep(latency)
+                self.tokens_generated += len(offer) // 4
+                payload = json.dumps(self.completion(request, offer)).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + b"Content-Length: %d\r\n\r\n" % len(payload)
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, writer: asyncio.StreamWriter, request: dict, offer: str, latency: float) -> None:
+        """Send the offer as server-sent events, about 4 characters per token.
+
+        `latency` is the time to generate the whole offer; a client that
+        closes the stream early stops the generation.
+        """
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        tokens = [offer[i : i + 4] for i in range(0, len(offer), 4)]
+        base = {
+            "id": f"mock-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+        }
+
+        def event(payload) -> bytes:
+            data = b"data: " + (payload if isinstance(payload, bytes) else json.dumps(payload).encode()) + b"\n\n"
+            return b"%x\r\n" % len(data) + data + b"\r\n"
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for i, token in enumerate(tokens):
+            if i % 8 == 0:
+                # Paced from the start: the server shares the client's event loop
+                # here, and sleeping a fixed time per token would add its lag to
+                # the generation time, which a real server would not
+                delay = start + latency * (i + 8) / len(tokens) - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            writer.write(event({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}))
+            self.tokens_generated += 1
+            await writer.drain()
+        writer.write(event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            usage = self.completion(request, offer)["usage"]
+            writer.write(event({**base, "choices": [], "usage": usage}))
+        writer.write(event(b"[DONE]") + b"0\r\n\r\n")
+        await writer.drain()
+
+    def completion(self, request: dict, offer: str) -> dict:
+        prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4
+        completion_tokens = len(offer) // 4
+        return {
+            "id": f"mock-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": offer},
+                    "finish_reason": "stop",
+                    "logprobs": self.logprobs(offer),
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+    def logprobs(self, offer: str) -> Optional[dict]:
+        if self.top_logprobs is None:
+            return None
+
+        def token_logprob(token: str) -> dict:
+            return {
+                "token": f"token_id:{sum(token.encode()) % 32000}",
+                "logprob": -random.random(),
+                "bytes": list(token.encode()),
+            }
+
+        content = []
+        for i in range(0, len(offer), 4):
+            token = offer[i : i + 4]
+            alternatives = [token_logprob(random.choice(EXTRA_SKILLS)[:4]) for _ in range(self.top_logprobs)]
+            content.append({**token_logprob(token), "top_logprobs": alternatives})
+        return {"content": content}
+
+
+class MockJudgeClient:
+    """Mimics AsyncAzureOpenAI.chat.completions with canned verdicts."""
+
+    def __init__(self, latency_ms: float = 1500.0, sigma: float = 0.6):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, model, temperature, max_tokens, timeout, **kwargs):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        await asyncio.sleep(lognormal_seconds(self.latency_ms, self.sigma))
+        content = self.verdict(prompt)
+        message = SimpleNamespace(content=content)
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(content) // 4,
+            total_tokens=(len(prompt) + len(content)) // 4,
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    @staticmethod
+    def verdict(prompt: str) -> str:
+        if '"essential_skills"' in prompt:
+            skills = random.sample(EXTRA_SKILLS, 4)
+            return json.dumps({"essential_skills": [{"skill": s, "importance": 0.5} for s in skills]})
+        if "language?" in prompt:
+            return json.dumps({"answer": "YES" if random.random() < 0.95 else "NO"})
+        if "valid XML" in prompt:
+            return json.dumps({"valid_xml": "</skills>" in prompt, "has_required_tags": True})
+        if "Required skills that MUST be included" in prompt:
+            required = re.search(r"MUST be included: (.*)", prompt).group(1).split(", ")
+            offer = prompt.split("Generated job offer:", 1)[1]
+            matched = sum(1 for skill in required if skill in offer)
+            return json.dumps({"final_score": matched / len(required)})
+        return json.dumps({"final_score": round(random.uniform(0.5, 1.0), 2)})
+
+
+class MockTrainableModel:
+    """Duck-typed art.TrainableModel whose training and logging are local no-ops."""
+
+    trainable = True
+
+    def __init__(
+        self, base_url: str, train_seconds: float = 0.0, delete_seconds: float = 0.0, name: str = "mock-policy"
+    ):
+        self.name = name
+        self.inference_model_name = name
+        self.train_seconds = train_seconds
+        self.delete_seconds = delete_seconds
+        self.checkpoints = {0}
+        self.step = 0
+        # Metrics of every validation and training trajectory the model saw
+        self.trajectory_metrics = []
+        self._client = AsyncOpenAI(base_url=base_url, api_key="mock")
+
+    def openai_client(self) -> AsyncOpenAI:
+        return self._client
+
+    async def log(self, trajectories=None, split="val", *, metrics=None, step=None) -> None:
+        self._record(trajectories)
+
+    async def delete_checkpoints(self, best_checkpoint_metric: str = "val/reward") -> None:
+        pass
+
+    def backend(self) -> "MockTrainableModel":
+        return self
+
+    async def _delete_checkpoint_files(self, model, steps_to_keep) -> None:
+        await asyncio.sleep(self.delete_seconds)
+        self.checkpoints &= set(steps_to_keep)
+
+    async def train(self, trajectory_groups, config=None) -> None:
+        self._record(trajectory_groups)
+        await asyncio.sleep(self.train_seconds)
+        self.step += 1
+        self.checkpoints.add(self.step)
+
+    def _record(self, groups) -> None:
+        for group in groups or []:
+            self.trajectory_metrics.extend(t.metrics for t in group)
+
+    async def get_step(self) -> int:
+        return self.step
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def install_mock_judge(client: MockJudgeClient, max_concurrency: int = 20) -> None:
+    """Route get_judge_completion to the mock judge and start from a cold cache."""
+    get_judge_completion.judge_pool = JudgePool(
+        [JudgeEndpoint(name="mock-judge", client=client, deployment="mock", max_concurrency=max_concurrency)]
+    )
+    get_judge_completion.get_judge_completion.cache_clear()
+    # Essential skills come from the mock judge too, and are never persisted
+    essential_skills.path = None
+    essential_skills.clear()
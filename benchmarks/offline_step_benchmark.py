@@ -0,0 +1,193 @@
+"""Measure the throughput of train.main steps offline.
+
+Runs the real rollout.rollout and train.train_step control flow (gather,
+straggler handling, group filtering, validation, train) against a local
+mock policy server and a mock judge, so no Azure, S3 or GPU is needed.
+
+    python benchmarks/offline_step_benchmark.py --steps 3 --val-contexts 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from mock_services import (
+    MockJudgeClient,
+    MockPolicyServer,
+    MockTrainableModel,
+    install_mock_judge,
+    load_local_contexts,
+)
+
+# Never report benchmark completions to OpenPipe
+os.environ.pop("OPENPIPE_API_KEY", None)
+
+from adaptive_sampler import AdaptiveRolloutPolicy
+from checkpoint_retention import CheckpointRetention
+from context_sampler import ContextSampler
+from sequential_validation import SequentialValidator
+from replay_buffer import ReplayBuffer
+from compact_trajectories import COMPACT_TRAJECTORIES, peak_rss_mb
+from loop_monitor import LoopLagMonitor, install_event_loop
+from skill_matcher import set_skill_vocabulary
+from straggler import StragglerPolicy
+from train import OVERSAMPLE_CONTEXTS, train_step
+
+
+async def run_benchmark(args) -> dict:
+    random.seed(args.seed)
+    # The local dataset is small, so contexts are reused across val and train
+    contexts = load_local_contexts()
+    set_skill_vocabulary(contexts)
+    val_contexts = [contexts[i % len(contexts)] for i in range(args.val_contexts)]
+
+    server = MockPolicyServer(
+        latency_ms=args.policy_latency_ms, sigma=args.policy_latency_sigma, top_logprobs=args.policy_logprobs
+    )
+    base_url = await server.start()
+    judge = MockJudgeClient(latency_ms=args.judge_latency_ms, sigma=args.judge_latency_sigma)
+    install_mock_judge(judge, max_concurrency=args.judge_concurrency)
+    model = MockTrainableModel(base_url, train_seconds=args.train_seconds, delete_seconds=args.delete_seconds)
+    checkpoints = CheckpointRetention(model)
+    replay = ReplayBuffer(fraction=args.replay_fraction) if args.replay_fraction > 0 else None
+
+    straggler_policy = StragglerPolicy.from_env()
+    adaptive_policy = AdaptiveRolloutPolicy.from_env(max_rollouts=10)
+    sampler = ContextSampler(contexts) if args.prioritized else None
+    validator = SequentialValidator() if args.sequential_validation else None
+    best_val_score = 0.0
+
+    loop_monitor = LoopLagMonitor().start()
+    start = time.monotonic()
+    try:
+        for step in range(args.steps):
+            if sampler:
+                batch = sampler.sample(args.batch_size + OVERSAMPLE_CONTEXTS)
+            else:
+                batch = random.choices(contexts, k=args.batch_size + OVERSAMPLE_CONTEXTS)
+            val_score, improved = await train_step(
+                model,
+                val_contexts,
+                batch,
+                batch_size=args.batch_size,
+                current_step=step,
+                straggler_policy=straggler_policy,
+                adaptive_policy=adaptive_policy,
+                pbar_suffix=f"benchmark step {step + 1}",
+                checkpoints=checkpoints,
+                replay=replay,
+                sampler=sampler,
+                validator=validator,
+                best_val_score=best_val_score,
+            )
+            if improved:
+                best_val_score = val_score
+    finally:
+        elapsed = time.monotonic() - start
+        await checkpoints.wait()
+        loop_monitor.stop()
+        await model.close()
+        await server.stop()
+
+    lag = loop_monitor.stats()
+    if args.show_slow_callbacks:
+        loop_monitor.report_slow_callbacks()
+
+    def mean_metric(name):
+        values = [m[name] for m in model.trajectory_metrics if name in m]
+        return sum(values) / max(len(values), 1)
+
+    return {
+        "steps": args.steps,
+        "elapsed": elapsed,
+        "steps_per_sec": args.steps / elapsed,
+        "rollouts_per_sec": server.requests / elapsed,
+        "rollouts": server.requests,
+        "groups_replayed": replay.replayed if replay else 0,
+        "policy_tokens_per_rollout": server.tokens_generated / max(server.requests, 1),
+        "judge_qps": judge.calls / elapsed,
+        "rollout_seconds": mean_metric("rollout_seconds"),
+        "generation_seconds": mean_metric("generation_seconds"),
+        "scoring_seconds": mean_metric("scoring_seconds"),
+        "judge_calls_started_early": mean_metric("judge_calls_started_early"),
+        "event_loop": type(asyncio.get_running_loop()).__module__.split(".")[0],
+        "loop_lag_mean_ms": lag["lag_mean_ms"],
+        "loop_lag_p99_ms": lag["lag_p99_ms"],
+        "loop_lag_max_ms": lag["lag_max_ms"],
+        "slow_callbacks": lag["slow_callbacks"],
+        "loop_lag_histogram": loop_monitor.histogram_lines(),
+        "compact_trajectories": COMPACT_TRAJECTORIES,
+        "peak_rss_mb": peak_rss_mb(),
+        "checkpoints_kept": sorted(model.checkpoints),
+        "prune_seconds": checkpoints.prune_seconds,
+    }
+
+
+def print_report(results: dict) -> None:
+    print("\n" + "=" * 50)
+    print("OFFLINE STEP BENCHMARK")
+    print("-" * 50)
+    print(f"{'Steps':25s}: {results['steps']} in {results['elapsed']:.1f}s")
+    print(f"{'Steps/sec':25s}: {results['steps_per_sec']:.3f}")
+    print(f"{'Rollouts/sec':25s}: {results['rollouts_per_sec']:.1f}")
+    print(f"{'Rollouts':25s}: {results['rollouts']} ({results['groups_replayed']} groups replayed)")
+    print(f"{'Policy tokens/rollout':25s}: {results['policy_tokens_per_rollout']:.0f}")
+    print(f"{'Judge QPS':25s}: {results['judge_qps']:.1f}")
+    print(
+        f"{'Trajectory wall time (s)':25s}: {results['rollout_seconds']:.2f} "
+        f"(generation {results['generation_seconds']:.2f}, scoring after it {results['scoring_seconds']:.2f})"
+    )
+    print(f"{'Early judge calls/rollout':25s}: {results['judge_calls_started_early']:.2f}")
+    print(
+        f"{'Event-loop lag (ms)':25s}: mean {results['loop_lag_mean_ms']:.2f}, "
+        f"p99 {results['loop_lag_p99_ms']:.2f}, max {results['loop_lag_max_ms']:.2f} ({results['event_loop']})"
+    )
+    print(f"{'Slow callbacks':25s}: {results['slow_callbacks']}")
+    for line in results["loop_lag_histogram"]:
+        print(f"{'':27s}{line}")
+    print(
+        f"{'Peak RSS (MB)':25s}: {results['peak_rss_mb']:.0f} "
+        f"(compact trajectories {'on' if results['compact_trajectories'] else 'off'})"
+    )
+    print(
+        f"{'Checkpoints kept':25s}: {results['checkpoints_kept']} "
+        f"(pruned in the background for {results['prune_seconds']:.1f}s)"
+    )
+    print("=" * 50)
+
+
+def build_parser(description: str = __doc__) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--val-contexts", type=int, default=20)
+    parser.add_argument("--policy-latency-ms", type=float, default=800.0, help="Median policy completion latency")
+    parser.add_argument("--policy-latency-sigma", type=float, default=0.5, help="Lognormal sigma of policy latency")
+    parser.add_argument("--judge-latency-ms", type=float, default=1500.0, help="Median judge latency")
+    parser.add_argument("--judge-latency-sigma", type=float, default=0.6, help="Lognormal sigma of judge latency")
+    parser.add_argument("--judge-concurrency", type=int, default=20, help="Max in-flight judge requests")
+    parser.add_argument(
+        "--policy-logprobs", type=int, default=None, metavar="TOP_N",
+        help="Return vLLM-style logprobs with TOP_N alternatives per token, like ART's server",
+    )
+    parser.add_argument("--train-seconds", type=float, default=0.0, help="Simulated model.train duration")
+    parser.add_argument("--sequential-validation", action="store_true", help="Stop validation once the save decision is clear")
+    parser.add_argument("--prioritized", action="store_true", help="Sample training contexts with ContextSampler")
+    parser.add_argument("--replay-fraction", type=float, default=0.0, help="Fraction of each batch replayed from earlier steps")
+    parser.add_argument("--delete-seconds", type=float, default=0.0, help="Simulated checkpoint deletion duration")
+    parser.add_argument("--event-loop", choices=["asyncio", "uvloop"], default="asyncio")
+    parser.add_argument("--show-slow-callbacks", action="store_true", help="Print the stacks of callbacks that blocked the loop")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    install_event_loop(args.event_loop)
+    print_report(asyncio.run(run_benchmark(args)))
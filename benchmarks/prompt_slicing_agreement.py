@@ -0,0 +1,120 @@
+"""Check that section-sliced judge prompts agree with full-text prompts.
+
+Every offer is judged twice per criterion, once with the full offer and once
+with only the sections the criterion needs, and the report compares scores
+and judge input tokens.
+
+    python benchmarks/prompt_slicing_agreement.py --data verdicts.jsonl --limit 200
+    python benchmarks/prompt_slicing_agreement.py --mock-judge   # offline smoke run
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+
+from mock_services import MockJudgeClient, fake_job_offer, install_mock_judge, load_local_contexts
+
+from get_judge_completion import get_judge_completion
+from judge_prompts import MAX_TOKENS, PROMPTS, build_prompt, count_tokens, parse_verdict
+from load_documents import JobContext
+from offer_parser import parse_offer
+from reward_model import BINARY_CRITERIA, harvest_verdicts
+
+
+def mock_samples(n: int) -> list:
+    """(context, offer) pairs from the local dataset and the mock policy's offers."""
+    contexts = load_local_contexts()
+    samples = []
+    for _ in range(n):
+        context = random.choice(contexts)
+        prompt = f"Job Title: {context.job_title}\nProvided Skills: {', '.join(context.skills or [])}"
+        samples.append((context, fake_job_offer(prompt)))
+    return samples
+
+
+async def judge_both(context, offer, semaphore) -> dict:
+    parsed = parse_offer(offer)
+    result = {}
+    for criterion in PROMPTS:
+        if criterion == "context_inclusion" and not context.skills:
+            continue
+        full = build_prompt(criterion, context, offer, parsed, slicing=False)
+        sliced = build_prompt(criterion, context, offer, parsed, slicing=True)
+        async with semaphore:
+            full_response, sliced_response = await asyncio.gather(
+                get_judge_completion(full, max_tokens=MAX_TOKENS[criterion]),
+                get_judge_completion(sliced, max_tokens=MAX_TOKENS[criterion]),
+            )
+        result[criterion] = {
+            "full": parse_verdict(criterion, full_response),
+            "sliced": parse_verdict(criterion, sliced_response),
+            "full_tokens": count_tokens(full),
+            "sliced_tokens": count_tokens(sliced),
+        }
+    return result
+
+
+def print_report(results: list) -> None:
+    print("\n" + "=" * 84)
+    print(f"SLICED vs FULL-TEXT JUDGE PROMPTS ({len(results)} offers)")
+    print("-" * 84)
+    print(f"{'Criterion':22s} {'N':>5s} {'Mean |diff|':>12s} {'Agreement':>10s} {'Full tok':>9s} {'Sliced tok':>11s} {'Saved':>7s}")
+    total_full = total_sliced = 0
+    for criterion in PROMPTS:
+        rows = [r[criterion] for r in results if criterion in r]
+        if not rows:
+            continue
+        diffs = [abs(r["full"] - r["sliced"]) for r in rows]
+        tolerance = 0.5 if criterion in BINARY_CRITERIA else 0.1
+        full_tokens = sum(r["full_tokens"] for r in rows)
+        sliced_tokens = sum(r["sliced_tokens"] for r in rows)
+        total_full += full_tokens
+        total_sliced += sliced_tokens
+        print(
+            f"{criterion:22s} {len(rows):5d} {sum(diffs) / len(rows):12.3f} "
+            f"{sum(d < tolerance for d in diffs) / len(rows):10.1%} "
+            f"{full_tokens / len(rows):9.0f} {sliced_tokens / len(rows):11.0f} "
+            f"{1 - sliced_tokens / max(full_tokens, 1):7.1%}"
+        )
+    print("-" * 84)
+    print(
+        f"Judge input tokens per trajectory: {total_full / len(results):.0f} full, "
+        f"{total_sliced / len(results):.0f} sliced ({1 - total_sliced / max(total_full, 1):.1%} saved)"
+    )
+    print("=" * 84)
+
+
+async def main(args):
+    random.seed(args.seed)
+    if args.mock_judge:
+        install_mock_judge(MockJudgeClient(latency_ms=20, sigma=0.2))
+    if args.data:
+        samples = [
+            (JobContext(job_title=v.job_title, language=v.language, skills=v.skills), v.offer)
+            for v in harvest_verdicts(args.data)
+        ]
+        random.shuffle(samples)
+    elif args.mock_judge:
+        samples = mock_samples(args.limit)
+    else:
+        sys.exit("--data is required unless --mock-judge is set")
+    samples = samples[: args.limit]
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results = await asyncio.gather(*[judge_both(context, offer, semaphore) for context, offer in samples])
+    print_report(results)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", nargs="*", help="Verdict .jsonl, benchmark .jsonl or ART .parquet files with offers")
+    parser.add_argument("--limit", type=int, default=100, help="Max offers to judge")
+    parser.add_argument("--concurrency", type=int, default=10, help="Offers judged at the same time")
+    parser.add_argument("--mock-judge", action="store_true", help="Use the mock judge and mock offers")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,131 @@
+"""Measure rollout throughput on one event loop vs 1..N rollout worker processes.
+
+The mock policy server runs in its own process and every rollout worker
+installs its own mock judge, so the numbers show how far sharding the
+client-side CPU work (prompt formatting, JSON parsing, pydantic validation)
+across processes scales. Expect no gain beyond the number of free cores.
+
+    python benchmarks/rollout_workers_benchmark.py --max-workers 4 --rollouts 400
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+
+import art
+
+from mock_services import MockJudgeClient, MockPolicyServer, install_mock_judge, load_local_contexts
+
+# Never report benchmark completions to OpenPipe
+os.environ.pop("OPENPIPE_API_KEY", None)
+
+from loop_monitor import LoopLagMonitor
+from rollout import JobOfferScenario, rollout
+from rollout_workers import RolloutWorkerPool
+from skill_matcher import set_skill_vocabulary
+
+
+def _serve_policy(latency_ms: float, sigma: float, urls) -> None:
+    async def serve():
+        server = MockPolicyServer(latency_ms=latency_ms, sigma=sigma)
+        urls.put(await server.start())
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def init_process(contexts: list, judge_latency_ms: float, judge_concurrency: int) -> None:
+    """Skill vocabulary and mock judge, for the trainer and for every worker."""
+    set_skill_vocabulary(contexts)
+    install_mock_judge(MockJudgeClient(latency_ms=judge_latency_ms, sigma=0.3), max_concurrency=judge_concurrency)
+
+
+async def timed_rollouts(run, scenarios: list) -> dict:
+    """Run all scenarios at once, measuring throughput and this loop's lag."""
+    loop_monitor = LoopLagMonitor().start()
+    start = time.monotonic()
+    try:
+        results = await asyncio.gather(*[run(s) for s in scenarios], return_exceptions=True)
+    finally:
+        elapsed = time.monotonic() - start
+        loop_monitor.stop()
+    return {
+        "elapsed": elapsed,
+        "rollouts_per_sec": len(scenarios) / elapsed,
+        "failed": sum(isinstance(r, BaseException) for r in results),
+        "loop_lag_p99_ms": loop_monitor.stats()["lag_p99_ms"],
+    }
+
+
+async def run_benchmark(args) -> list:
+    random.seed(args.seed)
+    contexts = load_local_contexts()
+    scenarios = [JobOfferScenario(context=random.choice(contexts)) for _ in range(args.rollouts)]
+    warmup = [JobOfferScenario(context=context) for context in contexts]
+
+    urls = multiprocessing.get_context("spawn").Queue()
+    server = multiprocessing.get_context("spawn").Process(
+        target=_serve_policy, args=(args.policy_latency_ms, 0.3, urls), daemon=True
+    )
+    server.start()
+    model_kwargs = {
+        "name": "mock-policy",
+        "project": "benchmark",
+        "inference_api_key": "mock",
+        "inference_base_url": urls.get(timeout=60),
+        "inference_model_name": "mock-policy",
+    }
+    initargs = (contexts, args.judge_latency_ms, args.judge_concurrency)
+
+    rows = []
+    try:
+        # Baseline: every rollout on this process's event loop
+        init_process(*initargs)
+        model = art.Model(**model_kwargs)
+        run = lambda scenario: rollout(model, scenario)
+        await timed_rollouts(run, warmup)
+        rows.append({"workers": 0, **await timed_rollouts(run, scenarios)})
+
+        for workers in range(1, args.max_workers + 1):
+            pool = await RolloutWorkerPool(model_kwargs, workers, initializer=init_process, initargs=initargs).start()
+            try:
+                await timed_rollouts(pool.rollout, warmup * workers)
+                rows.append({"workers": workers, **await timed_rollouts(pool.rollout, scenarios)})
+            finally:
+                await pool.close()
+    finally:
+        server.terminate()
+    return rows
+
+
+def print_report(rows: list) -> None:
+    baseline = rows[0]["rollouts_per_sec"]
+    print("\n" + "=" * 64)
+    print(f"ROLLOUT WORKER SCALING ({os.cpu_count()} CPUs)")
+    print("-" * 64)
+    print(f"{'Workers':>8s} {'Rollouts/sec':>13s} {'Speedup':>8s} {'Failed':>7s} {'Trainer loop lag p99 (ms)':>26s}")
+    for row in rows:
+        label = "in-loop" if row["workers"] == 0 else str(row["workers"])
+        print(
+            f"{label:>8s} {row['rollouts_per_sec']:13.1f} {row['rollouts_per_sec'] / baseline:7.2f}x "
+            f"{row['failed']:7d} {row['loop_lag_p99_ms']:26.2f}"
+        )
+    print("=" * 64)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rollouts", type=int, default=400, help="Rollouts started at once per measurement")
+    parser.add_argument("--policy-latency-ms", type=float, default=200.0, help="Median policy completion latency")
+    parser.add_argument("--judge-latency-ms", type=float, default=50.0, help="Median judge latency")
+    parser.add_argument("--judge-concurrency", type=int, default=200, help="Max in-flight judge requests per process")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    print_report(asyncio.run(run_benchmark(parse_args())))
@@ -0,0 +1,80 @@
+import os
+from typing import Awaitable, Callable, List
+
+import art
+from pydantic import BaseModel
+
+from group_filter import reward_std
+from load_documents import JobContext
+
+# Judge calls made by one rollout when every criterion is judged (an upper bound)
+JUDGE_CALLS_PER_ROLLOUT = 5
+
+
+class AdaptiveRolloutPolicy(BaseModel):
+    """Start each context with a few rollouts, expand only if rewards disagree.
+
+    Contexts whose first `initial_rollouts` rewards are all equal carry no
+    learning signal, so the remaining rollouts would only burn inference and
+    judge calls.
+    """
+
+    initial_rollouts: int = 10
+    max_rollouts: int = 10
+    min_std: float = 1e-6
+
+    @classmethod
+    def from_env(cls, max_rollouts: int) -> "AdaptiveRolloutPolicy":
+        initial = int(os.getenv("ADAPTIVE_INITIAL_ROLLOUTS", "0"))
+        # Fewer initial rollouts than the straggler filter keeps per group would
+        # drop every group whose rewards agree, and one rollout has no reward std
+        minimum = max(2, int(os.getenv("MIN_GROUP_TRAJECTORIES", "2")))
+        if initial and initial < minimum:
+            raise ValueError(
+                f"ADAPTIVE_INITIAL_ROLLOUTS must be 0 (off) or at least {minimum}, "
+                f"the larger of 2 and MIN_GROUP_TRAJECTORIES, got {initial}"
+            )
+        initial = initial or max_rollouts
+        return cls(
+            initial_rollouts=min(initial, max_rollouts),
+            max_rollouts=max_rollouts,
+            min_std=float(os.getenv("MIN_GROUP_REWARD_STD", "1e-6")),
+        )
+
+    def initial_groups(
+        self,
+        contexts: List[JobContext],
+        make_rollout: Callable[[JobContext], Awaitable[art.Trajectory]],
+    ) -> List[List[Awaitable[art.Trajectory]]]:
+        return [
+            [make_rollout(context) for _ in range(self.initial_rollouts)]
+            for context in contexts
+        ]
+
+    def expander(
+        self,
+        contexts: List[JobContext],
+        make_rollout: Callable[[JobContext], Awaitable[art.Trajectory]],
+    ):
+        """Build the `expand` callback for gather_groups_with_deadline."""
+
+        def expand(group_idx: int, finished: List[art.Trajectory], issued: int):
+            if issued >= self.max_rollouts:
+                return []
+            if reward_std(art.TrajectoryGroup(finished)) <= self.min_std:
+                return []
+            return [
+                make_rollout(contexts[group_idx])
+                for _ in range(self.max_rollouts - issued)
+            ]
+
+        return expand
+
+    def savings(self, num_contexts: int, rollouts_issued: int) -> dict:
+        """Rollouts and judge calls saved versus a fixed max_rollouts per context."""
+        saved = num_contexts * self.max_rollouts - rollouts_issued
+        return {
+            "rollouts_issued": rollouts_issued,
+            "rollouts_saved": saved,
+            "judge_calls_saved": saved * JUDGE_CALLS_PER_ROLLOUT,
+        }
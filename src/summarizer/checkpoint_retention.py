@@ -0,0 +1,113 @@
+"""Keep the best checkpoints by validation score, prune the rest in the background.
+
+model.delete_checkpoints() keeps only the latest checkpoint and the best one
+by val/reward, and train.main used to await it every step. CheckpointRetention
+keeps the KEEP_BEST_CHECKPOINTS best steps by the validation score train_step
+computes, plus the latest step, so a run can roll back to any of them.
+
+Deletion runs as a task next to the following step's rollouts. It must not
+overlap with model.train, which writes the next checkpoint (the backend
+deletes every checkpoint it is not told to keep), so train_step awaits
+wait() before training.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import art
+
+KEEP_BEST_CHECKPOINTS = int(os.getenv("KEEP_BEST_CHECKPOINTS", "2"))
+
+
+class CheckpointRetention:
+    """Best-K-by-validation plus latest checkpoint retention for one model."""
+
+    def __init__(self, model: art.TrainableModel, keep_best: int = KEEP_BEST_CHECKPOINTS):
+        self.model = model
+        self.keep_best = keep_best
+        self.scores: Dict[int, float] = {}  # Validation score of each step's checkpoint
+        self.kept: List[int] = []
+        self.prunes = 0
+        self.prune_seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, model: art.TrainableModel) -> "CheckpointRetention":
+        return cls(model, keep_best=KEEP_BEST_CHECKPOINTS)
+
+    def load_history(self) -> int:
+        """Seed scores from val/reward in the model's history.jsonl, so a
+        restarted run does not prune the best checkpoints of earlier runs.
+
+        Returns the number of steps found.
+        """
+        path = f"{self.model._get_output_dir()}/history.jsonl"
+        rewards: Dict[int, List[float]] = {}
+        try:
+            with open(path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if "val/reward" in entry:
+                        rewards.setdefault(entry["step"], []).append(entry["val/reward"])
+        except FileNotFoundError:
+            return 0
+        for step, values in rewards.items():
+            self.scores.setdefault(step, sum(values) / len(values))
+        return len(rewards)
+
+    def record(self, step: int, score: float) -> None:
+        """Record the validation score of the checkpoint at `step`."""
+        self.scores[step] = score
+
+    async def record_current(self, score: float) -> int:
+        """Record `score` for the checkpoint the model serves now, the one
+        validation rolled out with, and return its step.
+
+        Call it before model.train. The training loop's own counter drifts
+        from the model's step whenever a step skips training.
+        """
+        step = await self.model.get_step()
+        self.record(step, score)
+        return step
+
+    @property
+    def best_step(self) -> Optional[int]:
+        return max(self.scores, key=self.scores.get) if self.scores else None
+
+    def steps_to_keep(self, latest: int) -> List[int]:
+        best = sorted(self.scores, key=lambda step: (self.scores[step], step), reverse=True)
+        return sorted(set(best[: self.keep_best]) | {latest})
+
+    def prune(self, latest: int) -> None:
+        """Start deleting every checkpoint but the best ones and `latest`."""
+        if self._task is not None and not self._task.done():
+            # Still pruning; the next prune covers whatever this one misses
+            return
+        self._task = asyncio.ensure_future(self._prune(self.steps_to_keep(latest)))
+
+    async def _prune(self, steps: List[int]) -> None:
+        start = time.monotonic()
+        try:
+            await self.model.backend()._delete_checkpoint_files(self.model, steps)
+        except Exception as e:
+            # A failed prune only costs disk space, retry on the next step
+            print(f"Error deleting checkpoints: {e}")
+            return
+        self.kept = steps
+        self.prunes += 1
+        self.prune_seconds += time.monotonic() - start
+
+    async def wait(self) -> None:
+        """Wait for a running prune, e.g. before the next checkpoint is written."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    def step_metrics(self) -> Dict[str, float]:
+        return {
+            "checkpoints/kept": len(self.kept),
+            "checkpoints/best_step": self.best_step if self.best_step is not None else -1,
+            "checkpoints/prune_seconds": self.prune_seconds,
+        }
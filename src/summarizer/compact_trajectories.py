@@ -0,0 +1,86 @@
+"""Keep trajectories small on the training client.
+
+A step holds a couple hundred trajectories until model.train returns, and
+most of their memory goes to things training never reads:
+- per-token `bytes` lists and `top_logprobs` in the policy's Choice;
+- a fresh copy of the same token strings ("token_id:1234") in every trajectory;
+- a fresh copy of the system prompt (and of the user prompt of each
+  context) in every trajectory.
+
+compact_choice keeps what ART's tokenizer uses: the message content and
+tool calls, and per token its string, logprob, extra logprobs, and the first
+token's bytes (checked for a leading <think>). Token strings and prompts are
+interned, so each distinct one is stored once per process.
+"""
+
+import os
+import resource
+import sys
+from typing import List, Optional
+
+from openai.types.chat.chat_completion import Choice, ChoiceLogprobs
+from openai.types.chat.chat_completion_message import ChatCompletionMessage
+from openai.types.chat.chat_completion_token_logprob import ChatCompletionTokenLogprob
+
+COMPACT_TRAJECTORIES = os.getenv("COMPACT_TRAJECTORIES", "1") == "1"
+
+
+def compact_choice(choice: Choice) -> Choice:
+    """A copy of `choice` with only the fields training needs."""
+    logprobs = None
+    if choice.logprobs is not None:
+        logprobs = ChoiceLogprobs.model_construct(
+            content=_compact_tokens(choice.logprobs.content),
+            refusal=_compact_tokens(choice.logprobs.refusal),
+        )
+    message = ChatCompletionMessage.model_construct(
+        role="assistant",
+        content=choice.message.content,
+        tool_calls=choice.message.tool_calls,
+    )
+    return Choice.model_construct(
+        finish_reason=choice.finish_reason,
+        index=choice.index,
+        logprobs=logprobs,
+        message=message,
+    )
+
+
+def _compact_tokens(tokens: Optional[List[ChatCompletionTokenLogprob]]) -> Optional[List[ChatCompletionTokenLogprob]]:
+    if tokens is None:
+        return None
+    return [
+        ChatCompletionTokenLogprob.model_construct(
+            token=sys.intern(token.token),
+            logprob=token.logprob,
+            bytes=token.bytes if i == 0 else None,
+            top_logprobs=[],
+            **(token.model_extra or {}),
+        )
+        for i, token in enumerate(tokens)
+    ]
+
+
+def restore_choices(trajectory) -> None:
+    """Turn choices parsed from JSON back into Choice objects, in place.
+
+    They validate as message dicts otherwise, and training needs the Choice
+    to find the logprobs of the generated tokens.
+    """
+    for history in [trajectory, *trajectory.additional_histories]:
+        history.messages_and_choices = [
+            Choice.model_validate(m) if isinstance(m, dict) and "finish_reason" in m else m
+            for m in history.messages_and_choices
+        ]
+
+
+def intern_prompt(text: str) -> str:
+    """The process-wide copy of a prompt, so trajectories share one string."""
+    return sys.intern(text) if COMPACT_TRAJECTORIES else text
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
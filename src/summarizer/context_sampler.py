@@ -0,0 +1,168 @@
+"""Prioritized sampling of training contexts by learning progress.
+
+Walking the shuffled training contexts spends as many rollouts on contexts
+the policy already solves (all rewards equal, zero advantage) as on the
+ones it is still learning. ContextSampler keeps, per context, moving
+averages of the group's mean reward and of its reward standard deviation:
+
+    priority = (|fast mean - slow mean| + std + PRIORITY_EPSILON) ** PRIORITY_ALPHA
+
+- |fast - slow| is learning progress: the reward is still moving.
+- std is uncertainty: the group's rollouts disagree, so there is signal.
+
+Contexts never visited get the priority of the largest possible reward
+standard deviation, so every context is tried early. The statistics are
+numpy arrays indexed by context, and draws go through a sum tree, so a draw
+and an update are O(log n).
+"""
+
+import os
+import random
+from typing import Dict, List, Optional
+
+import art
+import numpy as np
+
+from load_documents import JobContext, context_id
+
+PRIORITIZED_SAMPLING = os.getenv("PRIORITIZED_SAMPLING", "0") == "1"
+PRIORITY_ALPHA = float(os.getenv("PRIORITY_ALPHA", "1.0"))
+PRIORITY_EPSILON = float(os.getenv("PRIORITY_EPSILON", "0.05"))
+# Moving average weights of the newest group reward
+FAST_RATE = 0.5
+SLOW_RATE = 0.1
+# Rollout rewards are in [0, 10]
+MAX_REWARD = 10.0
+
+
+class SumTree:
+    """Array-backed binary tree whose internal nodes hold the sum of their leaves."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.capacity = 1
+        while self.capacity < size:
+            self.capacity *= 2
+        self.nodes = np.zeros(2 * self.capacity)
+
+    @property
+    def total(self) -> float:
+        return float(self.nodes[1])
+
+    def get(self, index: int) -> float:
+        return float(self.nodes[self.capacity + index])
+
+    def set(self, index: int, value: float) -> None:
+        node = self.capacity + index
+        delta = value - self.nodes[node]
+        while node:
+            self.nodes[node] += delta
+            node //= 2
+
+    def find(self, mass: float) -> int:
+        """Index of the leaf where the cumulative sum of leaves exceeds `mass`."""
+        node = 1
+        while node < self.capacity:
+            left = 2 * node
+            if mass < self.nodes[left] or self.nodes[left + 1] <= 0:
+                node = left
+            else:
+                mass -= self.nodes[left]
+                node = left + 1
+        return min(node - self.capacity, self.size - 1)
+
+
+class ContextSampler:
+    """Samples training contexts in proportion to their learning progress and uncertainty."""
+
+    def __init__(
+        self,
+        contexts: List[JobContext],
+        alpha: float = PRIORITY_ALPHA,
+        epsilon: float = PRIORITY_EPSILON,
+    ):
+        self.contexts = contexts
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.index: Dict[str, int] = {}
+        for i, context in enumerate(contexts):
+            self.index.setdefault(context_id(context), i)
+        n = len(contexts)
+        self.visits = np.zeros(n, dtype=np.int64)
+        self.fast_mean = np.zeros(n)
+        self.slow_mean = np.zeros(n)
+        self.std = np.zeros(n)
+        self.tree = SumTree(n)
+        unvisited = (MAX_REWARD / 2 + epsilon) ** alpha
+        # Duplicates of a context keep priority 0 and are never drawn
+        for i in set(self.index.values()):
+            self.tree.set(i, unvisited)
+
+    def priority(self, i: int) -> float:
+        progress = abs(self.fast_mean[i] - self.slow_mean[i])
+        return float((progress + self.std[i] + self.epsilon) ** self.alpha)
+
+    def sample(self, count: int, rng: Optional[random.Random] = None) -> List[JobContext]:
+        """`count` distinct contexts, drawn in proportion to their priority."""
+        rng = rng or random
+        drawn = []
+        while len(drawn) < count and self.tree.total > 0:
+            i = self.tree.find(rng.random() * self.tree.total)
+            drawn.append((i, self.tree.get(i)))
+            # Without replacement within a batch
+            self.tree.set(i, 0.0)
+        for i, priority in drawn:
+            self.tree.set(i, priority)
+        return [self.contexts[i] for i, _ in drawn]
+
+    def update(self, groups: List[art.TrajectoryGroup]) -> int:
+        """Fold the rewards of finished groups into their contexts' statistics.
+
+        Returns the number of groups whose context is known.
+        """
+        updated = 0
+        for group in groups:
+            rewards = np.array([t.reward for t in group], dtype=np.float64)
+            i = self.index.get(group.trajectories[0].metadata.get("context_id")) if len(rewards) else None
+            if i is None:
+                continue
+            mean, std = rewards.mean(), rewards.std()
+            if self.visits[i]:
+                self.fast_mean[i] += FAST_RATE * (mean - self.fast_mean[i])
+                self.slow_mean[i] += SLOW_RATE * (mean - self.slow_mean[i])
+                self.std[i] += FAST_RATE * (std - self.std[i])
+            else:
+                self.fast_mean[i] = self.slow_mean[i] = mean
+                self.std[i] = std
+            self.visits[i] += 1
+            self.tree.set(i, self.priority(i))
+            updated += 1
+        return updated
+
+    def state_dict(self) -> Dict[str, List[float]]:
+        """Statistics of the visited contexts by context id, for RunState."""
+        return {
+            cid: [int(self.visits[i]), float(self.fast_mean[i]), float(self.slow_mean[i]), float(self.std[i])]
+            for cid, i in self.index.items()
+            if self.visits[i]
+        }
+
+    def load_state_dict(self, state: Dict[str, List[float]]) -> int:
+        """Restore statistics saved by state_dict; returns the number of contexts found."""
+        restored = 0
+        for cid, (visits, fast_mean, slow_mean, std) in state.items():
+            i = self.index.get(cid)
+            if i is None:
+                continue
+            self.visits[i], self.fast_mean[i], self.slow_mean[i], self.std[i] = visits, fast_mean, slow_mean, std
+            self.tree.set(i, self.priority(i))
+            restored += 1
+        return restored
+
+    def step_metrics(self) -> Dict[str, float]:
+        visited = self.visits > 0
+        return {
+            "sampler/contexts_visited": int(visited.sum()),
+            "sampler/solved_contexts": int((visited & (self.std <= 1e-6)).sum()),
+            "sampler/mean_priority": self.tree.total / max(len(self.index), 1),
+        }
@@ -0,0 +1,164 @@
+"""Per-job-title essential skills, fetched from the judge once and persisted.
+
+The skill-completeness criterion only depends on the job title and language,
+so instead of asking the judge to re-derive the essential skills for every
+offer, the weighted list is requested once per (job_title, language), saved
+to ESSENTIAL_SKILLS_PATH, and each offer is scored locally by set difference.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from get_judge_completion import clean_json_response, get_judge_completion
+from skill_matcher import match_skills
+
+ESSENTIAL_SKILLS_PATH = os.getenv("ESSENTIAL_SKILLS_PATH", "essential_skills.json")
+# After a failed fetch, fall back to the per-offer judge prompt for this long
+RETRY_FAILED_AFTER = 300.0
+
+LANGUAGE_NAMES = {"en": "English", "fr": "French"}
+
+
+class EssentialSkill(BaseModel):
+    skill: str
+    importance: float  # 1.0 critical, 0.5 important, 0.25 nice-to-have
+
+
+def cache_key(job_title: str, language: str) -> str:
+    return f"{language}|{' '.join(job_title.lower().split())}"
+
+
+async def ask_judge(job_title: str, language: str) -> Optional[List[EssentialSkill]]:
+    """Ask the judge for the weighted essential skills of a role."""
+    prompt = f"""List the essential skills for a {job_title} position.
+Essential = skills that 80%+ of {job_title} job postings would include.
+Write the skill names in {LANGUAGE_NAMES.get(language, language)}.
+
+Rate each skill's importance: 1.0 (critical), 0.5 (important), 0.25 (nice-to-have)
+
+Respond ONLY in JSON format:
+{{
+  "essential_skills": [
+    {{"skill": "Git", "importance": 1.0}},
+    {{"skill": "Testing", "importance": 0.5}}
+  ]
+}}"""
+    response = await get_judge_completion(prompt, max_tokens=400, criterion="essential_skills")
+    try:
+        result = json.loads(clean_json_response(response))
+        return [EssentialSkill.model_validate(item) for item in result["essential_skills"]]
+    except Exception:
+        return None
+
+
+class EssentialSkillsCache:
+    """Essential skills per (job_title, language), backed by a JSON file."""
+
+    def __init__(
+        self,
+        path: Optional[str] = ESSENTIAL_SKILLS_PATH,
+        fetch: Callable[[str, str], Awaitable[Optional[List[EssentialSkill]]]] = ask_judge,
+    ):
+        self.path = path
+        self.fetch = fetch
+        self.entries: Dict[str, List[EssentialSkill]] = {}
+        self.fetches = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._failed_at: Dict[str, float] = {}
+        self.reload()
+
+    async def get(self, job_title: str, language: str) -> Optional[List[EssentialSkill]]:
+        """Cached essential skills, or None if the judge could not provide them."""
+        key = cache_key(job_title, language)
+        if key in self.entries:
+            return self.entries[key]
+        if time.monotonic() - self._failed_at.get(key, -RETRY_FAILED_AFTER) < RETRY_FAILED_AFTER:
+            return None
+        if key not in self._pending:
+            self._pending[key] = asyncio.ensure_future(self._fetch(key, job_title, language))
+        # Rollouts of the same context share a single fetch, which a cancelled
+        # rollout does not cancel for the others
+        return await asyncio.shield(self._pending[key])
+
+    async def _fetch(self, key: str, job_title: str, language: str) -> Optional[List[EssentialSkill]]:
+        self.fetches += 1
+        try:
+            skills = await self.fetch(job_title, language)
+        except Exception as e:
+            print(f"Essential skills fetch failed for {job_title} ({language}): {e}")
+            skills = None
+        finally:
+            del self._pending[key]
+        if not skills:
+            self._failed_at[key] = time.monotonic()
+            return None
+        self.entries[key] = skills
+        self.save()
+        return skills
+
+    def clear(self) -> None:
+        """Forget cached entries and failures (the file is left untouched)."""
+        self.entries.clear()
+        self._failed_at.clear()
+
+    def reload(self) -> int:
+        """Add the entries other processes saved to the file; returns how many were new."""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            saved = json.load(f)
+        new = 0
+        for key, skills in saved.items():
+            if key not in self.entries:
+                self.entries[key] = [EssentialSkill.model_validate(s) for s in skills]
+                new += 1
+        return new
+
+    def dump(self) -> Dict[str, list]:
+        return {k: [s.model_dump() for s in v] for k, v in self.entries.items()}
+
+    def snapshot_id(self) -> str:
+        """Short content hash of the cached entries, including those saved by rollout workers."""
+        self.reload()
+        data = json.dumps(self.dump(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        # Rollout worker processes save to the same file: merge their entries
+        # under the lock so the last writer does not drop the others'
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.reload()
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.dump(), f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+
+
+essential_skills = EssentialSkillsCache()
+
+
+def completeness_score(essentials: List[EssentialSkill], extracted: List[str]) -> dict:
+    """Score an offer against the essential skills, as the judge prompt does.
+
+    penalty = sum(importance of missing essentials) / 10, capped at 1.0
+    """
+    _, missing = match_skills([e.skill for e in essentials], extracted)
+    missing = set(missing)
+    missing_essentials = [e for e in essentials if e.skill in missing]
+    penalty = min(sum(e.importance for e in missing_essentials) / 10, 1.0)
+    return {
+        "skills_present": list(extracted),
+        "missing_essentials": [e.model_dump() for e in missing_essentials],
+        "total_penalty": penalty,
+        "final_score": 1.0 - penalty,
+    }
@@ -1,41 +1,60 @@
 from async_lru import alru_cache
 import asyncio
-from openai import AsyncAzureOpenAI
-import os
 from dotenv import load_dotenv
 
+from judge_pool import judge_pool_from_env
+from usage import budget_guard, usage_tracker
+
 load_dotenv()
 
-semaphore = asyncio.Semaphore(20)
+# Azure OpenAI configuration: one or more deployments, see judge_pool_from_env
+judge_pool = judge_pool_from_env()
+
 
-# Azure OpenAI configuration
-client = AsyncAzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),  # e.g., "https://your-resource.openai.azure.com/"
-    api_version="2024-02-01",  # Azure API version
-)
+def clean_json_response(response: str) -> str:
+    """Clean JSON response from markdown code blocks."""
+    clean = response.strip()
+    if clean.startswith("```json"):
+        clean = clean[7:]
+    elif clean.startswith("```"):
+        clean = clean[3:]
+    if clean.endswith("```"):
+        clean = clean[:-3]
+    return clean.strip()
 
 
 @alru_cache(maxsize=1024)
 async def get_judge_completion(
-    prompt, temperature=0.0, max_tokens=600, retries=3, timeout=10
+    prompt, temperature=0.0, max_tokens=600, retries=3, timeout=10, criterion="other"
 ) -> str:
+    messages = [{"role": "user", "content": prompt}]
+    tried = set()
+    await budget_guard.wait()
     for attempt in range(1, retries + 1):
         try:
-            async with semaphore:
-                completion = await client.chat.completions.create(
-                    messages=[{"role": "user", "content": prompt}],
-                    model=os.getenv("AZURE_DEPLOYMENT_NAME", "gpt-35-turbo"),  # Your Azure deployment name
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
+            cancelled = []
+            # Failed endpoints are added to `tried` so the next attempt fails over
+            completion = await judge_pool.complete(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                tried=tried,
+                cancelled=cancelled,
+            )
+            # Cache hits never get here, so only billed calls are counted
+            usage_tracker.record_completion(criterion, completion)
+            for _ in cancelled:
+                usage_tracker.record_cancelled(criterion, completion)
             return completion.choices[0].message.content.strip()
         except Exception as e:
             if attempt < retries:
                 print(
                     f"[Retry {attempt}/{retries}] get_judge_completion failed: {e}. Retrying..."
                 )
-                await asyncio.sleep(3)
+                # Fail over immediately if another healthy endpoint is available
+                if not judge_pool.has_untried_healthy(tried):
+                    await asyncio.sleep(3)
             else:
                 print(
                     f"[Failure] get_judge_completion failed after {retries} attempts: {e}"
@@ -43,6 +62,16 @@ async def get_judge_completion(
                 return "ERROR: Get judge completion failed"
 
 
+def get_judge_stats() -> dict:
+    """Per-endpoint request, error and latency stats for the judge pool."""
+    return judge_pool.stats()
+
+
+def get_judge_hedge_stats() -> dict:
+    """Hedged-request counts and p99 latency with vs. without hedging."""
+    return judge_pool.hedge_stats()
+
+
 def clear_judge_cache():
     """Clear the cache for get_judge_completion."""
     get_judge_completion.cache_clear()
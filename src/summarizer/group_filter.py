@@ -0,0 +1,39 @@
+import math
+from typing import List, Tuple
+
+import art
+
+
+def reward_std(group: art.TrajectoryGroup) -> float:
+    """Population standard deviation of the rewards in a group."""
+    rewards = [trajectory.reward for trajectory in group]
+    if len(rewards) < 2:
+        return 0.0
+    mean = sum(rewards) / len(rewards)
+    return math.sqrt(sum((r - mean) ** 2 for r in rewards) / len(rewards))
+
+
+def trajectory_tokens(trajectory: art.Trajectory) -> int:
+    """Prompt + completion tokens of a trajectory, as recorded by rollout."""
+    return int(
+        trajectory.metrics.get("prompt_tokens", 0)
+        + trajectory.metrics.get("completion_tokens", 0)
+    )
+
+
+def filter_degenerate_groups(
+    groups: List[art.TrajectoryGroup], min_std: float = 1e-6
+) -> Tuple[List[art.TrajectoryGroup], List[art.TrajectoryGroup]]:
+    """Split groups into (kept, skipped).
+
+    With group-relative advantages, a group whose rewards are all equal has zero
+    advantage for every trajectory and contributes no gradient, so it is skipped.
+    """
+    kept = []
+    skipped = []
+    for group in groups:
+        if reward_std(group) > min_std:
+            kept.append(group)
+        else:
+            skipped.append(group)
+    return kept, skipped
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from openai import AsyncAzureOpenAI
+
+
+class JudgeEndpoint:
+    """One Azure OpenAI deployment that judge requests can be routed to."""
+
+    def __init__(
+        self,
+        name: str,
+        client,
+        deployment: str,
+        weight: float = 1.0,
+        max_concurrency: int = 20,
+        cooldown: float = 30.0,
+    ):
+        self.name = name
+        self.client = client
+        self.deployment = deployment
+        self.weight = max(float(weight), 1e-6)
+        self.cooldown = cooldown
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+        # Routing state
+        self.outstanding = 0
+        self.consecutive_errors = 0
+        self.unhealthy_until = 0.0
+
+        # Stats
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=2000)
+
+    def is_healthy(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.monotonic()) >= self.unhealthy_until
+
+    def load(self) -> float:
+        """Outstanding requests normalized by weight (lower is better)."""
+        return self.outstanding / self.weight
+
+    async def complete(self, messages, temperature: float, max_tokens: int, timeout: float):
+        self.outstanding += 1
+        self.requests += 1
+        start = time.monotonic()
+        try:
+            async with self.semaphore:
+                completion = await self.client.chat.completions.create(
+                    messages=messages,
+                    model=self.deployment,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=timeout,
+                )
+        except Exception:
+            self.errors += 1
+            self.consecutive_errors += 1
+            # Back off exponentially on repeated failures, capped at 8x cooldown
+            backoff = self.cooldown * min(2 ** (self.consecutive_errors - 1), 8)
+            self.unhealthy_until = time.monotonic() + backoff
+            raise
+        else:
+            self.consecutive_errors = 0
+            self.latencies.append(time.monotonic() - start)
+            return completion
+        finally:
+            self.outstanding -= 1
+
+    def stats(self) -> Dict[str, float]:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else 0.0,
+            "outstanding": self.outstanding,
+            "healthy": self.is_healthy(),
+            "latency_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p99": percentile(latencies, 99),
+        }
+
+
+class JudgePool:
+    """Routes judge requests across endpoints by least outstanding requests."""
+
+    def __init__(
+        self,
+        endpoints: List[JudgeEndpoint],
+        hedge_percentile: Optional[float] = None,
+        hedge_budget: float = 0.1,
+        hedge_min_samples: int = 50,
+    ):
+        if not endpoints:
+            raise ValueError("JudgePool needs at least one endpoint")
+        self.endpoints = endpoints
+
+        # Hedging: after the hedge_percentile latency has elapsed, send a duplicate
+        # request to another endpoint and keep whichever answers first. At most
+        # hedge_budget extra requests per primary request are allowed.
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = hedge_min_samples
+        self._hedge_delay = None
+        self._hedge_delay_age = 0
+
+        # End-to-end stats (what the caller sees, hedged or not)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latencies = deque(maxlen=5000)
+
+    def pick(self, exclude=()) -> JudgeEndpoint:
+        """Pick the healthy endpoint with the lowest weighted load.
+
+        Endpoints in `exclude` (names) are skipped unless nothing else is left.
+        Unhealthy endpoints are only used when every endpoint is unhealthy.
+        """
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e.name not in exclude] or self.endpoints
+        healthy = [e for e in candidates if e.is_healthy(now)]
+        if not healthy:
+            # Everything is cooling down: use whichever recovers first
+            return min(candidates, key=lambda e: e.unhealthy_until)
+        lowest = min(e.load() for e in healthy)
+        return random.choice([e for e in healthy if e.load() == lowest])
+
+    def has_untried_healthy(self, tried) -> bool:
+        now = time.monotonic()
+        return any(e.name not in tried and e.is_healthy(now) for e in self.endpoints)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Current hedge delay, or None while hedging is off or still warming up."""
+        if not self.hedge_percentile:
+            return None
+        # Re-estimating the percentile needs a sort, so only do it every 50 requests
+        if self._hedge_delay is None or self._hedge_delay_age >= 50:
+            samples = sorted(l for e in self.endpoints for l in e.latencies)
+            if len(samples) < self.hedge_min_samples:
+                return None
+            self._hedge_delay = percentile(samples, self.hedge_percentile)
+            self._hedge_delay_age = 0
+        self._hedge_delay_age += 1
+        return self._hedge_delay
+
+    async def complete(
+        self, messages, temperature: float, max_tokens: int, timeout: float, tried=None, cancelled=None
+    ):
+        """Send one judge request, hedged if enabled.
+
+        Names of endpoints that fail are added to `tried` so the caller's retry
+        loop can fail over to a different endpoint. Names of endpoints whose
+        request was cancelled after being sent (losing hedges) are appended to
+        `cancelled`, so the caller can account for them.
+        """
+        tried = tried if tried is not None else set()
+        self.requests += 1
+        start = time.monotonic()
+
+        primary = self.pick(exclude=tried)
+        tasks = {
+            asyncio.create_task(primary.complete(messages, temperature, max_tokens, timeout)): primary
+        }
+        pending = set(tasks)
+        error = None
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self.hedges < self.hedge_budget * self.requests:
+                    self.hedges += 1
+                    secondary = self.pick(exclude=tried | {primary.name})
+                    hedge = asyncio.create_task(
+                        secondary.complete(messages, temperature, max_tokens, timeout)
+                    )
+                    tasks[hedge] = secondary
+                    pending.add(hedge)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        tried.add(tasks[task].name)
+                        error = error or task.exception()
+                        continue
+                    if tasks[task] is not primary:
+                        self.hedge_wins += 1
+                    self.latencies.append(time.monotonic() - start)
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if cancelled is not None:
+                cancelled.extend(tasks[task].name for task in pending)
+        raise error
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {e.name: e.stats() for e in self.endpoints}
+
+    def hedge_stats(self) -> Dict[str, float]:
+        """Tail latency with hedging vs. the extra requests it costs."""
+        latencies = sorted(self.latencies)
+        attempts = sorted(l for e in self.endpoints for l in e.latencies)
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            # Extra judge requests paid per caller request
+            "extra_cost_ratio": self.hedges / self.requests if self.requests else 0.0,
+            "hedge_delay": self._hedge_delay or 0.0,
+            # End-to-end p99 vs. p99 of completed single attempts. Cancelled
+            # hedge losers are not counted, so the latter is a lower bound.
+            "latency_p99": percentile(latencies, 99),
+            "attempt_latency_p99": percentile(attempts, 99),
+        }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def judge_pool_from_env() -> JudgePool:
+    """Build the judge pool from environment variables.
+
+    AZURE_JUDGE_ENDPOINTS may hold a JSON list of endpoints, e.g.
+    [{"endpoint": "https://eastus.openai.azure.com/", "deployment": "gpt-4o", "weight": 2},
+     {"endpoint": "https://westeu.openai.azure.com/", "deployment": "gpt-4o", "api_key": "..."}]
+    Missing api_key/deployment fall back to AZURE_OPENAI_API_KEY/AZURE_DEPLOYMENT_NAME.
+    Without it, a single endpoint is built from AZURE_OPENAI_ENDPOINT.
+    JUDGE_HEDGE_PERCENTILE (e.g. 95) turns on hedged requests, limited to
+    JUDGE_HEDGE_BUDGET extra requests per request (default 0.1).
+    """
+    default_key = os.getenv("AZURE_OPENAI_API_KEY")
+    default_deployment = os.getenv("AZURE_DEPLOYMENT_NAME", "gpt-35-turbo")
+    default_concurrency = int(os.getenv("JUDGE_MAX_CONCURRENCY", "20"))
+
+    configs = json.loads(os.getenv("AZURE_JUDGE_ENDPOINTS", "[]"))
+    if not configs:
+        configs = [{"endpoint": os.getenv("AZURE_OPENAI_ENDPOINT")}]
+
+    endpoints = []
+    for i, config in enumerate(configs):
+        client = AsyncAzureOpenAI(
+            api_key=config.get("api_key", default_key),
+            azure_endpoint=config["endpoint"],  # e.g., "https://your-resource.openai.azure.com/"
+            api_version=config.get("api_version", "2024-02-01"),
+        )
+        endpoints.append(
+            JudgeEndpoint(
+                name=config.get("name", f"judge-{i}"),
+                client=client,
+                deployment=config.get("deployment", default_deployment),
+                weight=config.get("weight", 1.0),
+                max_concurrency=config.get("max_concurrency", default_concurrency),
+            )
+        )
+    hedge_percentile = float(os.getenv("JUDGE_HEDGE_PERCENTILE", "0")) or None
+    hedge_budget = float(os.getenv("JUDGE_HEDGE_BUDGET", "0.1"))
+    return JudgePool(endpoints, hedge_percentile=hedge_percentile, hedge_budget=hedge_budget)
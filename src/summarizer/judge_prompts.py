@@ -0,0 +1,239 @@
+"""Judge prompts for the 5 scoring criteria.
+
+Each criterion only needs part of the offer: the skill criteria look at the
+title and skill sections, the language check at the prose. offer_view()
+builds that slice, whitespace-collapsed, so judge input tokens scale with
+what the criterion reads rather than with the whole offer. The XML check
+always gets the full text, and the language check gets the prose without
+the English section labels, which would read as English in a French offer.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+from get_judge_completion import clean_json_response
+from load_documents import JobContext
+from offer_parser import ParsedOffer, collapse_whitespace
+
+PROMPT_SLICING = os.getenv("JUDGE_PROMPT_SLICING", "1") == "1"
+
+# The language check only reads the start of its view
+LANGUAGE_CHARS = 300
+
+# Sections each criterion's prompt needs (None = the full offer)
+CRITERION_SECTIONS: Dict[str, Optional[List[str]]] = {
+    "language_consistency": ["overview", "responsibilities"],
+    "xml_format": None,
+    "context_inclusion": ["skills", "nice_to_have"],
+    "skill_relevance": ["title", "skills", "nice_to_have"],
+    "skill_completeness": ["title", "skills", "nice_to_have"],
+}
+
+# Judge completion budget per criterion
+MAX_TOKENS = {
+    "language_consistency": 50,
+    "xml_format": 100,
+    "context_inclusion": 400,
+    "skill_relevance": 300,
+    "skill_completeness": 300,
+}
+
+# Score used when the judge's answer cannot be parsed
+DEFAULT_SCORES = {
+    "language_consistency": 0.0,
+    "xml_format": 0.0,
+    "context_inclusion": 0.0,
+    "skill_relevance": 0.5,
+    "skill_completeness": 0.5,
+}
+
+# Criteria whose view is the bare section text, without SECTION_LABELS
+UNLABELED_CRITERIA = {"language_consistency"}
+
+SECTION_LABELS = {
+    "title": "Title",
+    "overview": "Overview",
+    "responsibilities": "Key Responsibilities",
+    "skills": "Required Skills",
+    "nice_to_have": "Nice-to-Have",
+}
+
+
+def offer_view(criterion: str, offer: str, parsed: ParsedOffer, slicing: bool = PROMPT_SLICING) -> str:
+    """The part of the offer a criterion's prompt should embed."""
+    sections = CRITERION_SECTIONS[criterion]
+    if not slicing or sections is None:
+        return offer
+    if not parsed.all_skills and not parsed.overview:
+        # Nothing could be parsed, let the judge read the raw text
+        return collapse_whitespace(offer)
+    lines = []
+    for section in sections:
+        value = getattr(parsed, section)
+        if isinstance(value, list):
+            value = "; ".join(value)
+        if value and criterion in UNLABELED_CRITERIA:
+            lines.append(value)
+        elif value:
+            lines.append(f"{SECTION_LABELS[section]}: {value}")
+    return "\n".join(lines) or collapse_whitespace(offer)
+
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Judge input tokens, with a 4 characters per token estimate if tiktoken is unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4
+
+
+def language_prompt(context: JobContext, offer_text: str) -> str:
+    return f"""Is this text written in {context.language.upper()} language?
+
+Text to check: {offer_text[:LANGUAGE_CHARS]}
+
+Expected language: {context.language} ({'English' if context.language == 'en' else 'French' if context.language == 'fr' else context.language})
+
+Respond ONLY in JSON format:
+{{"answer": "YES" or "NO"}}"""
+
+
+def xml_prompt(context: JobContext, offer_text: str) -> str:
+    return f"""Is this valid XML format? Check if it has proper opening/closing tags.
+
+Text to check:
+{offer_text}
+
+Respond ONLY in JSON format:
+{{"valid_xml": true or false, "has_required_tags": true or false}}"""
+
+
+def context_inclusion_prompt(context: JobContext, offer_text: str) -> str:
+    return f"""Evaluate skill inclusion with deduplication penalty.
+
+Required skills that MUST be included: {', '.join(context.skills)}
+
+Generated job offer:
+{offer_text}
+
+Instructions:
+1. Extract ALL skills mentioned in the job offer (from all sections)
+2. For each required skill, check if it's present (exact or fuzzy match)
+3. Identify duplicate/redundant skills (e.g., "Python" and "Python Programming", "ML" and "Machine Learning")
+4. Calculate base_score = matched_required_skills / total_required_skills
+5. Calculate deduplication_factor = 1 - (duplicate_count / total_extracted_skills)
+6. Calculate final_score = base_score * deduplication_factor
+
+Example of duplicates to detect:
+- "Python" + "Python" = duplicate
+- "Python" + "Python Programming" = duplicate
+- "Machine Learning" + "ML" = duplicate
+- "Data Analysis" + "Data Analytics" = duplicate
+- "Communication" + "Communication Skills" = duplicate
+
+Respond ONLY in JSON format:
+{{
+  "required_skills": ["skill1", "skill2"],
+  "extracted_skills": ["skill1", "skill2", ...],
+  "matched_skills": ["skill1", "skill2"],
+  "missing_skills": [],
+  "duplicate_groups": [["Python", "Python Programming"], ["ML", "Machine Learning"]],
+  "duplicate_count": number,
+  "base_score": 0.0-1.0,
+  "deduplication_factor": 0.0-1.0,
+  "final_score": 0.0-1.0
+}}"""
+
+
+def skill_relevance_prompt(context: JobContext, offer_text: str) -> str:
+    provided_skills_str = ', '.join(context.skills) if context.skills else 'None'
+    return f"""For a {context.job_title} position:
+
+1. Extract ALL skills mentioned in the job offer (both in Required Skills and Nice-to-Have sections)
+2. EXCLUDE these provided skills from evaluation: {provided_skills_str}
+3. For each NEW skill added by the model, score it:
+   - 1 if relevant to {context.job_title}
+   - 0 if not relevant
+4. Calculate final score = sum(skill_scores) / total_new_skills
+
+Generated job offer:
+{offer_text}
+
+Respond ONLY in JSON format:
+{{
+  "provided_skills": ["skill1", "skill2"],
+  "all_extracted_skills": ["skill1", "skill2", ...],
+  "new_skills_evaluation": [
+    {{"skill": "skill_name", "relevant": 1}},
+    {{"skill": "skill_name", "relevant": 0}}
+  ],
+  "total_new_skills": number,
+  "relevant_count": number,
+  "final_score": 0.0-1.0
+}}"""
+
+
+def completeness_prompt(context: JobContext, offer_text: str) -> str:
+    return f"""Evaluate skill completeness for {context.job_title} position.
+
+Review the generated job offer and identify essential skills that are missing.
+Essential = skills that 80%+ of {context.job_title} job postings would include.
+
+Generated job offer:
+{offer_text}
+
+For each missing essential skill:
+1. Explain why it's essential for this role
+2. Rate its importance: 1.0 (critical), 0.5 (important), 0.25 (nice-to-have)
+
+Calculate penalty = sum(importance_scores) / 10 (capped at 1.0)
+Final score = 1.0 - penalty
+
+Respond ONLY in JSON format:
+{{
+  "skills_present": ["skill1", "skill2", ...],
+  "missing_essentials": [
+    {{"skill": "Git", "importance": 1.0, "reason": "Version control is critical for any developer role"}},
+    {{"skill": "Testing", "importance": 0.5, "reason": "Most positions require testing knowledge"}}
+  ],
+  "total_penalty": 0.0-1.0,
+  "final_score": 0.0-1.0
+}}"""
+
+
+PROMPTS = {
+    "language_consistency": language_prompt,
+    "xml_format": xml_prompt,
+    "context_inclusion": context_inclusion_prompt,
+    "skill_relevance": skill_relevance_prompt,
+    "skill_completeness": completeness_prompt,
+}
+
+
+def build_prompt(criterion: str, context: JobContext, offer: str, parsed: ParsedOffer, slicing: bool = PROMPT_SLICING) -> str:
+    """Judge prompt for one criterion, embedding only the sections it needs."""
+    return PROMPTS[criterion](context, offer_view(criterion, offer, parsed, slicing))
+
+
+def parse_verdict(criterion: str, response: str) -> float:
+    """Criterion score from the judge's JSON answer."""
+    try:
+        result = json.loads(clean_json_response(response))
+        if criterion == "language_consistency":
+            return 1.0 if result["answer"] == "YES" else 0.0
+        if criterion == "xml_format":
+            return 1.0 if result.get("valid_xml", False) else 0.0
+        return result.get("final_score", DEFAULT_SCORES[criterion])
+    except Exception:
+        return DEFAULT_SCORES[criterion]
@@ -1,4 +1,5 @@
 import boto3
+import hashlib
 import json
 import random
 from pydantic import BaseModel
@@ -15,6 +16,11 @@ class JobContext(BaseModel):
     skills: Optional[List[str]] = []
 
 
+def context_id(context: JobContext) -> str:
+    """Stable id of a context; identical contexts (same prompt) share it"""
+    return hashlib.sha1(context.model_dump_json().encode()).hexdigest()[:12]
+
+
 def load_job_contexts_from_s3(bucket_name: str, file_key: str) -> List[JobContext]:
     """Load job contexts dataset from S3"""
     # Boto3 will automatically use credentials from AWS CLI, environment, or IAM role
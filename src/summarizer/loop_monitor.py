@@ -0,0 +1,160 @@
+"""Event-loop lag monitor, and the opt-in uvloop event loop.
+
+The monitor measures scheduling delay: a task sleeps `interval` seconds over
+and over and records how late it wakes up, in a histogram. Lag comes from
+synchronous work on the loop (op_client.report, prints, boto3, JSON parsing
+of many verdicts at once).
+
+To find that work, a watchdog thread checks that the sampler keeps waking
+up. When it has not run for `slow_callback_seconds`, whatever is running on
+the loop thread is blocking it. The watchdog then grabs that thread's stack,
+so the report names the slow callback.
+
+EVENT_LOOP=uvloop runs train.main on uvloop when it is installed
+(pip install uvloop).
+"""
+
+import asyncio
+import bisect
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "1") == "1"
+LOOP_SLOW_CALLBACK_MS = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "100"))
+EVENT_LOOP = os.getenv("EVENT_LOOP", "asyncio")
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is open-ended)
+LAG_BUCKETS_MS = [0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class SlowCallback(BaseModel):
+    seconds: float  # How long the loop was blocked, to within a quarter of the threshold
+    stack: List[str]  # Stack of the loop thread while it was blocked
+
+
+class LoopLagMonitor:
+    """Scheduling-delay histogram of the running loop, plus stacks of callbacks that block it."""
+
+    def __init__(
+        self,
+        interval: float = 0.01,
+        slow_callback_seconds: float = LOOP_SLOW_CALLBACK_MS / 1000,
+        max_samples: int = 100_000,
+        max_slow_callbacks: int = 20,
+    ):
+        self.interval = interval
+        self.slow_callback_seconds = slow_callback_seconds
+        self.max_slow_callbacks = max_slow_callbacks
+        self.samples = deque(maxlen=max_samples)
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.slow_callbacks: List[SlowCallback] = []
+        self.slow_callback_count = 0
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "LoopLagMonitor":
+        return cls(slow_callback_seconds=LOOP_SLOW_CALLBACK_MS / 1000)
+
+    def start(self) -> "LoopLagMonitor":
+        """Start sampling the running loop."""
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, daemon=True, name="loop-lag-watchdog")
+        self._watchdog.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _sample(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(time.perf_counter() - start - self.interval)
+            self._heartbeat = time.monotonic()
+
+    def record(self, lag: float) -> None:
+        lag = max(lag, 0.0)
+        self.samples.append(lag)
+        self.histogram[bisect.bisect_left(LAG_BUCKETS_MS, lag * 1000)] += 1
+
+    def _watch(self) -> None:
+        current = None
+        while not self._stopped.wait(self.slow_callback_seconds / 4):
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled < self.slow_callback_seconds:
+                current = None
+                continue
+            if current is None:
+                # A new stall: whatever runs on the loop thread now is the culprit
+                frame = sys._current_frames().get(self._loop_thread)
+                current = SlowCallback(seconds=stalled, stack=traceback.format_stack(frame) if frame else [])
+                self.slow_callback_count += 1
+                self.slow_callbacks = (self.slow_callbacks + [current])[-self.max_slow_callbacks :]
+            current.seconds = stalled
+
+    def stats(self) -> Dict[str, float]:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"lag_mean_ms": 0.0, "lag_p50_ms": 0.0, "lag_p99_ms": 0.0, "lag_max_ms": 0.0, "slow_callbacks": 0}
+        return {
+            "lag_mean_ms": 1000 * sum(samples) / len(samples),
+            "lag_p50_ms": 1000 * samples[len(samples) // 2],
+            "lag_p99_ms": 1000 * samples[int(0.99 * (len(samples) - 1))],
+            "lag_max_ms": 1000 * samples[-1],
+            "slow_callbacks": self.slow_callback_count,
+        }
+
+    def step_metrics(self) -> Dict[str, float]:
+        """Flat metrics for model.log, e.g. loop/lag_p99_ms."""
+        return {f"loop/{key}": value for key, value in self.stats().items()}
+
+    def histogram_lines(self) -> List[str]:
+        lines = []
+        lower = 0.0
+        for upper, count in zip(LAG_BUCKETS_MS + [float("inf")], self.histogram):
+            if count:
+                label = f"<= {upper:g}ms" if upper != float("inf") else f"> {lower:g}ms"
+                lines.append(f"{label:>10s}: {count}")
+            lower = upper
+        return lines
+
+    def report_slow_callbacks(self, frames: int = 6) -> None:
+        """Print the innermost frames of the slow callbacks seen since the last reset."""
+        for slow in self.slow_callbacks:
+            print(f"🐢 Event loop blocked for {slow.seconds * 1000:.0f}ms in:")
+            for line in slow.stack[-frames:]:
+                print("   " + line.rstrip().replace("\n", "\n   "))
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.slow_callbacks = []
+        self.slow_callback_count = 0
+
+
+def install_event_loop(name: str = EVENT_LOOP) -> str:
+    """Use uvloop for new event loops if asked for and installed; returns the loop in use."""
+    if name != "uvloop":
+        return "asyncio"
+    try:
+        import uvloop
+    except ImportError:
+        print("EVENT_LOOP=uvloop but uvloop is not installed, using the asyncio event loop")
+        return "asyncio"
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return "uvloop"
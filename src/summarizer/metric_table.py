@@ -0,0 +1,103 @@
+"""Columnar table of trajectory rewards and metrics, with per-slice aggregates.
+
+train_step used to walk groups and trajectories in Python loops for every
+number it needed, and had no breakdown by language or criterion. MetricTable
+reads a list of TrajectoryGroups once into numpy columns (reward, group
+index, language, and one column per metric, NaN where a trajectory lacks
+it; polars builds the metric columns). Every aggregate after that is
+vectorized: means and variances, group reward spreads, and per-language
+and per-criterion slices.
+
+The language comes from the trajectory metadata set by rollout.
+"""
+
+from typing import Dict, List
+
+import art
+import numpy as np
+import polars as pl
+
+from reward_model import CRITERIA
+
+
+class MetricTable:
+    def __init__(
+        self,
+        reward: np.ndarray,
+        group: np.ndarray,
+        language: np.ndarray,
+        languages: List[str],
+        metrics: Dict[str, np.ndarray],
+    ):
+        self.reward = reward
+        self.group = group  # Index of each trajectory's group
+        self.language = language  # Index into `languages` of each trajectory's language
+        self.languages = languages
+        self.metrics = metrics
+
+    @classmethod
+    def from_groups(cls, groups: List[art.TrajectoryGroup]) -> "MetricTable":
+        trajectories = [t for group in groups for t in group]
+        n = len(trajectories)
+        reward = np.fromiter((t.reward for t in trajectories), dtype=np.float64, count=n)
+        group = np.repeat(np.arange(len(groups)), [len(g.trajectories) for g in groups]).astype(np.int64)
+        languages, language = np.unique(
+            np.array([t.metadata.get("language", "unknown") for t in trajectories], dtype=str), return_inverse=True
+        )
+        # Polars builds all metric columns in one native pass over the dicts
+        frame = pl.from_dicts([t.metrics for t in trajectories], infer_schema_length=None) if n else pl.DataFrame()
+        metrics = {
+            name: frame[name].cast(pl.Float64).fill_null(np.nan).to_numpy()
+            for name in sorted(frame.columns)
+        }
+        return cls(reward, group, language.reshape(-1), [str(l) for l in languages], metrics)
+
+    def __len__(self) -> int:
+        return len(self.reward)
+
+    def mean_reward(self) -> float:
+        return float(self.reward.mean()) if len(self) else 0.0
+
+    def reward_variance(self) -> float:
+        return float(self.reward.var()) if len(self) else 0.0
+
+    def metric_sum(self, name: str) -> float:
+        column = self.metrics.get(name)
+        return float(np.nansum(column)) if column is not None else 0.0
+
+    def group_reward_std(self) -> np.ndarray:
+        """Population standard deviation of the rewards of each group."""
+        counts = np.maximum(np.bincount(self.group), 1)
+        mean = np.bincount(self.group, weights=self.reward) / counts
+        # Centered, so groups with equal rewards get exactly 0
+        deviation = self.reward - mean[self.group]
+        return np.sqrt(np.bincount(self.group, weights=deviation**2) / counts)
+
+    def _slice_means(self, column: np.ndarray) -> np.ndarray:
+        """Mean of `column` per language, ignoring NaN."""
+        present = ~np.isnan(column)
+        total = np.bincount(self.language[present], weights=column[present], minlength=len(self.languages))
+        count = np.bincount(self.language[present], minlength=len(self.languages))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return total / count
+
+    def slice_metrics(self) -> Dict[str, float]:
+        """Flat metrics for model.log: reward spread and per-criterion / per-language means."""
+        if not len(self):
+            return {}
+        metrics = {
+            "reward_variance": self.reward_variance(),
+            "group_reward_std": float(self.group_reward_std().mean()),
+        }
+        for criterion in CRITERIA:
+            if criterion in self.metrics:
+                metrics[f"criteria/{criterion}"] = float(np.nanmean(self.metrics[criterion]))
+        columns = {"reward": self.reward, **{c: self.metrics[c] for c in CRITERIA if c in self.metrics}}
+        counts = np.bincount(self.language, minlength=len(self.languages))
+        for name, column in columns.items():
+            for language, value in zip(self.languages, self._slice_means(column)):
+                if not np.isnan(value):
+                    metrics[f"language/{language}/{name}"] = float(value)
+        for language, count in zip(self.languages, counts):
+            metrics[f"language/{language}/trajectories"] = int(count)
+        return metrics
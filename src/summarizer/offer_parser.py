@@ -0,0 +1,62 @@
+"""Split a generated job offer into its XML sections.
+
+Parsing is regex based so malformed offers (missing closing tags, text
+after </job_offer>) still yield whatever sections can be recovered.
+"""
+
+import re
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+SECTIONS = ["title", "overview", "responsibilities", "skills", "nice_to_have"]
+
+# Entries are usually <item> tags, but the prompt only asks for "its own tag",
+# so <skill>, <responsibility> etc. count too
+ITEM_RE = re.compile(r"<(\w+)[^>]*>(.*?)</\1>", re.S)
+TAG_RE = re.compile(r"<[^>]+>")
+# A section ends at its closing tag, or at the next section if the closing tag is missing
+SECTION_RE = {
+    tag: re.compile(rf"<{tag}>(.*?)(?:</{tag}>|(?=<(?:{'|'.join(SECTIONS)})>|</job_offer>)|\Z)", re.S)
+    for tag in SECTIONS
+}
+
+
+class ParsedOffer(BaseModel):
+    title: Optional[str] = None
+    overview: Optional[str] = None
+    responsibilities: List[str] = []
+    skills: List[str] = []
+    nice_to_have: List[str] = []
+
+    @property
+    def all_skills(self) -> List[str]:
+        """Skills from both the required and nice-to-have sections."""
+        return self.skills + self.nice_to_have
+
+
+def collapse_whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _items(section: str) -> List[str]:
+    # Tags nested inside an entry are dropped, keeping their text
+    items = [collapse_whitespace(TAG_RE.sub(" ", item)) for _, item in ITEM_RE.findall(section)]
+    if not items:
+        # Some offers list one entry per line or use "*" bullets instead of <item> tags
+        items = [collapse_whitespace(line.lstrip("*-• ")) for line in section.splitlines()]
+    return [item for item in items if item]
+
+
+def parse_offer(offer: Optional[str]) -> ParsedOffer:
+    """Extract the sections of a generated offer."""
+    offer = offer or ""
+    found = {tag: SECTION_RE[tag].search(offer) for tag in SECTIONS}
+    text = {tag: match.group(1) if match else None for tag, match in found.items()}
+    return ParsedOffer(
+        title=collapse_whitespace(text["title"]) if text["title"] is not None else None,
+        overview=collapse_whitespace(text["overview"]) if text["overview"] is not None else None,
+        responsibilities=_items(text["responsibilities"] or ""),
+        skills=_items(text["skills"] or ""),
+        nice_to_have=_items(text["nice_to_have"] or ""),
+    )
@@ -0,0 +1,128 @@
+"""Replay recent training groups that still carry learning signal.
+
+Every step used to train on fresh groups only and drop them afterwards.
+The buffer keeps the groups of the last steps whose rewards disagree
+(nonzero group-relative advantage), and each step replays up to
+REPLAY_FRACTION of its batch from them, so that many fewer fresh contexts
+have to be rolled out and judged.
+
+Replayed trajectories come from an older policy, so groups older than
+REPLAY_MAX_AGE steps are evicted, and a group is replayed at most
+REPLAY_MAX_USES times. The buffer holds at most REPLAY_CAPACITY groups.
+"""
+
+import os
+from collections import deque
+from typing import Dict, List
+
+import art
+
+from compact_trajectories import restore_choices
+from group_filter import reward_std
+
+REPLAY_FRACTION = float(os.getenv("REPLAY_FRACTION", "0"))
+REPLAY_MAX_AGE = int(os.getenv("REPLAY_MAX_AGE", "2"))
+REPLAY_MAX_USES = int(os.getenv("REPLAY_MAX_USES", "1"))
+REPLAY_CAPACITY = int(os.getenv("REPLAY_CAPACITY", "50"))
+
+
+class ReplayEntry:
+    __slots__ = ("group", "step", "std", "uses")
+
+    def __init__(self, group: art.TrajectoryGroup, step: int, std: float):
+        self.group = group
+        self.step = step  # Step whose policy generated the group
+        self.std = std
+        self.uses = 0
+
+
+class ReplayBuffer:
+    """Bounded buffer of recent trajectory groups with nonzero advantage."""
+
+    def __init__(
+        self,
+        fraction: float = REPLAY_FRACTION,
+        max_age: int = REPLAY_MAX_AGE,
+        max_uses: int = REPLAY_MAX_USES,
+        capacity: int = REPLAY_CAPACITY,
+        min_std: float = 1e-6,
+    ):
+        self.fraction = fraction
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.min_std = min_std
+        # The oldest groups are dropped first once full
+        self.entries = deque(maxlen=capacity)
+        self.replayed = 0
+
+    @classmethod
+    def from_env(cls) -> "ReplayBuffer":
+        return cls(
+            fraction=REPLAY_FRACTION,
+            max_age=REPLAY_MAX_AGE,
+            max_uses=REPLAY_MAX_USES,
+            capacity=REPLAY_CAPACITY,
+            min_std=float(os.getenv("MIN_GROUP_REWARD_STD", "1e-6")),
+        )
+
+    def add(self, groups: List[art.TrajectoryGroup], step: int) -> int:
+        """Keep the groups of `step` that carry signal; returns how many were kept."""
+        kept = 0
+        for group in groups:
+            std = reward_std(group)
+            if std > self.min_std:
+                self.entries.append(ReplayEntry(group, step, std))
+                kept += 1
+        return kept
+
+    def evict(self, step: int) -> None:
+        """Drop groups too old or replayed too often to be used at `step`."""
+        self.entries = deque(
+            (e for e in self.entries if step - e.step <= self.max_age and e.uses < self.max_uses),
+            maxlen=self.entries.maxlen,
+        )
+
+    def quota(self, batch_size: int, step: int) -> int:
+        """How many groups of a `batch_size` batch to replay at `step`."""
+        self.evict(step)
+        return min(int(self.fraction * batch_size), len(self.entries))
+
+    def sample(self, count: int, step: int) -> List[art.TrajectoryGroup]:
+        """The `count` least replayed groups, strongest signal and newest first."""
+        self.evict(step)
+        chosen = sorted(self.entries, key=lambda e: (e.uses, -e.std, -e.step))[:count]
+        for entry in chosen:
+            entry.uses += 1
+        self.replayed += len(chosen)
+        return [entry.group for entry in chosen]
+
+    def state_dict(self) -> dict:
+        """The buffered groups and their use counts, as JSON, for RunState."""
+        return {
+            "entries": [
+                {"group": e.group.model_dump(mode="json"), "step": e.step, "std": e.std, "uses": e.uses}
+                for e in self.entries
+            ],
+            "replayed": self.replayed,
+        }
+
+    def load_state_dict(self, state: dict) -> int:
+        """Restore groups saved by state_dict; returns how many were restored."""
+        self.entries.clear()
+        for saved in state["entries"]:
+            # TrajectoryGroup.__init__ takes the trajectories positionally, so
+            # model_validate would drop them
+            trajectories = [art.Trajectory.model_validate(t) for t in saved["group"]["trajectories"]]
+            for trajectory in trajectories:
+                restore_choices(trajectory)
+            group = art.TrajectoryGroup(
+                trajectories, metadata=saved["group"]["metadata"], metrics=saved["group"]["metrics"]
+            )
+            entry = ReplayEntry(group, saved["step"], saved["std"])
+            entry.uses = saved["uses"]
+            self.entries.append(entry)
+        self.replayed = state["replayed"]
+        return len(self.entries)
+
+    def step_metrics(self) -> Dict[str, float]:
+        return {"replay/buffer_groups": len(self.entries), "replay/groups_replayed": self.replayed}
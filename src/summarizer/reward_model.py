@@ -0,0 +1,466 @@
+"""Distilled local reward model.
+
+Learns to reproduce the Azure judge's 5 criterion scores from recorded
+verdicts, so rollouts can be scored on CPU without any judge calls.
+
+1. Record verdicts while training with the judge (JUDGE_VERDICTS_PATH=verdicts.jsonl),
+   or reuse past runs: ART trajectory logs (*.parquet) and model benchmark results.
+2. Train:   python reward_model.py train --data verdicts.jsonl .art/**/trajectories/*/*.parquet
+3. Use it:  REWARD_BACKEND=local REWARD_MODEL_PATH=reward_model.npz python train.py
+
+The scorer is a multi-output ridge regression over hashed character n-grams
+and a few structural features (XML validity, skill coverage, language
+markers). Scoring a batch of offers is a single matrix multiply.
+"""
+
+import argparse
+import asyncio
+import atexit
+import fcntl
+import json
+import math
+import os
+import random
+import re
+import sys
+import zlib
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from load_documents import JobContext
+from offer_parser import ParsedOffer, parse_offer
+
+CRITERIA = [
+    "language_consistency",
+    "xml_format",
+    "context_inclusion",
+    "skill_relevance",
+    "skill_completeness",
+]
+BINARY_CRITERIA = {"language_consistency", "xml_format"}
+REQUIRED_TAGS = ["job_offer", "title", "overview", "responsibilities", "skills", "nice_to_have"]
+
+NGRAM_BUCKETS = 2048
+TITLE_SKILL_BUCKETS = 2048
+
+STOPWORDS = {
+    "en": {"the", "and", "of", "to", "with", "for", "our", "you", "we", "in", "a", "is", "are", "will"},
+    "fr": {"le", "la", "les", "et", "de", "des", "du", "pour", "avec", "nous", "vous", "un", "une", "est"},
+}
+
+VERDICTS_PATH = os.getenv("JUDGE_VERDICTS_PATH")
+MODEL_PATH = os.getenv("REWARD_MODEL_PATH", "reward_model.npz")
+# Verdicts are written in batches of this many lines, off the event loop
+VERDICTS_FLUSH_EVERY = 64
+
+
+class Verdict(BaseModel):
+    """One judged offer: the context, the offer text and the judge's scores."""
+
+    job_title: str
+    language: str
+    skills: List[str] = []
+    offer: str
+    scores: Dict[str, float]
+
+
+_pending_verdicts: List[str] = []
+_verdict_writes = set()
+
+
+def record_verdict(context: JobContext, offer: str, scores: Dict[str, float]) -> None:
+    """Append a judge verdict to JUDGE_VERDICTS_PATH, if set.
+
+    Verdicts are buffered and written VERDICTS_FLUSH_EVERY at a time in a
+    worker thread, so rollouts never wait on the file. The rest is written
+    at exit.
+    """
+    if not VERDICTS_PATH:
+        return
+    verdict = Verdict(
+        job_title=context.job_title,
+        language=context.language,
+        skills=context.skills or [],
+        offer=offer or "",
+        scores=scores,
+    )
+    _pending_verdicts.append(verdict.model_dump_json() + "\n")
+    if len(_pending_verdicts) < VERDICTS_FLUSH_EVERY:
+        return
+    lines = _pending_verdicts[:]
+    _pending_verdicts.clear()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _write_verdicts(lines)
+        return
+    write = loop.run_in_executor(None, _write_verdicts, lines)
+    _verdict_writes.add(write)
+    write.add_done_callback(_verdict_writes.discard)
+
+
+def _write_verdicts(lines: List[str]) -> None:
+    # Rollout worker processes append to the same file, and a batch is
+    # larger than an atomic write, so batches are serialized with an flock
+    data = "".join(lines).encode()
+    fd = os.open(VERDICTS_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+@atexit.register
+def flush_verdicts() -> None:
+    """Write the buffered verdicts now."""
+    if _pending_verdicts and VERDICTS_PATH:
+        lines = _pending_verdicts[:]
+        _pending_verdicts.clear()
+        _write_verdicts(lines)
+
+
+# ---------------------------------------------------------------------------
+# Harvesting verdicts from past runs
+# ---------------------------------------------------------------------------
+
+
+def _verdict_from_messages(messages: List[dict], metrics: dict) -> Optional[Verdict]:
+    """Rebuild a verdict from a logged trajectory (system, user, assistant)."""
+    if not metrics or any(c not in metrics for c in CRITERIA):
+        return None
+    user = next((m.get("content") or "" for m in messages if m.get("role") == "user"), "")
+    offer = next(
+        (m.get("content") or "" for m in messages if m.get("role") == "assistant"), None
+    )
+    title = re.search(r"Job Title: (.*)", user)
+    language = re.search(r"Language: (.*)", user)
+    skills = re.search(r"Provided Skills: (.*)", user)
+    if offer is None or not title or not language:
+        return None
+    return Verdict(
+        job_title=title.group(1).strip(),
+        language=language.group(1).strip(),
+        skills=[s.strip() for s in skills.group(1).split(",")] if skills else [],
+        offer=offer,
+        scores={c: float(metrics[c]) for c in CRITERIA},
+    )
+
+
+def harvest_verdicts(paths: List[str]) -> List[Verdict]:
+    """Load verdicts from verdict logs, benchmark results and ART trajectory logs."""
+    verdicts = []
+    for path in paths:
+        if path.endswith(".parquet"):
+            import polars as pl
+
+            for row in pl.read_parquet(path, columns=["messages", "metrics"]).iter_rows(named=True):
+                verdict = _verdict_from_messages(row["messages"] or [], json.loads(row["metrics"] or "{}"))
+                if verdict:
+                    verdicts.append(verdict)
+            continue
+
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "scores" in record:
+                    verdicts.append(Verdict.model_validate(record))
+                elif "trajectory" in record:
+                    # Cell from benchmarks/benchmark_models.py
+                    trajectory = record["trajectory"]
+                    messages = [
+                        m["message"] if "message" in m else m
+                        for m in trajectory["messages_and_choices"]
+                    ]
+                    verdict = _verdict_from_messages(messages, trajectory["metrics"])
+                    if verdict:
+                        verdicts.append(verdict)
+    return verdicts
+
+
+# ---------------------------------------------------------------------------
+# Features
+# ---------------------------------------------------------------------------
+
+
+def _structural_features(context: JobContext, offer: str, parsed: ParsedOffer) -> List[float]:
+    text = offer.lower()
+    words = re.findall(r"[a-zàâçéèêëîïôûùüÿœ]+", text)
+
+    # Language markers
+    counts = {lang: sum(1 for w in words if w in stop) for lang, stop in STOPWORDS.items()}
+    total_stop = sum(counts.values()) or 1
+    expected = counts.get(context.language, 0) / total_stop
+
+    # XML structure
+    try:
+        ET.fromstring(offer.strip())
+        parses = 1.0
+    except ET.ParseError:
+        parses = 0.0
+    root = re.search(r"<job_offer>.*</job_offer>", offer, re.S)
+    trailing = len(offer) - root.end() if root else len(offer)
+    tags = sum(1 for tag in REQUIRED_TAGS if f"<{tag}>" in offer and f"</{tag}>" in offer)
+
+    # Skills
+    skills, nice = parsed.skills, parsed.nice_to_have
+    provided = context.skills or []
+    coverage = (
+        sum(1 for s in provided if s.lower() in text) / len(provided) if provided else 1.0
+    )
+    normalized = [re.sub(r"\W+", " ", s.lower()).strip() for s in skills + nice]
+    duplicates = len(normalized) - len(set(normalized))
+
+    return [
+        1.0,  # bias
+        expected,
+        math.log1p(total_stop),
+        parses,
+        float(root is not None),
+        math.log1p(max(trailing, 0)),
+        tags / len(REQUIRED_TAGS),
+        coverage,
+        float(not provided),
+        len(skills) / 10,
+        len(nice) / 5,
+        duplicates / max(len(normalized), 1),
+        math.log1p(len(offer)),
+    ]
+
+
+N_STRUCTURAL = len(_structural_features(JobContext(job_title="", language="en"), "", ParsedOffer()))
+N_FEATURES = N_STRUCTURAL + NGRAM_BUCKETS + TITLE_SKILL_BUCKETS
+
+
+def featurize(context: JobContext, offer: str, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Feature vector for one (context, offer) pair."""
+    x = out if out is not None else np.zeros(N_FEATURES, dtype=np.float32)
+    offer = offer or ""
+    parsed = parse_offer(offer)
+    x[:N_STRUCTURAL] = _structural_features(context, offer, parsed)
+
+    # Hashed character 3-grams of the whitespace-collapsed offer
+    text = " ".join(offer.lower().split())
+    grams = np.zeros(NGRAM_BUCKETS, dtype=np.float32)
+    for i in range(len(text) - 2):
+        grams[zlib.crc32(text[i : i + 3].encode()) % NGRAM_BUCKETS] += 1.0
+    norm = np.linalg.norm(grams)
+    x[N_STRUCTURAL : N_STRUCTURAL + NGRAM_BUCKETS] = grams / norm if norm else grams
+
+    # Hashed (job title, skill) pairs, so relevance/completeness can depend on the role
+    title = " ".join(context.job_title.lower().split())
+    pairs = np.zeros(TITLE_SKILL_BUCKETS, dtype=np.float32)
+    for skill in parsed.all_skills:
+        key = f"{title}|{' '.join(skill.lower().split())}"
+        pairs[zlib.crc32(key.encode()) % TITLE_SKILL_BUCKETS] += 1.0
+    norm = np.linalg.norm(pairs)
+    x[N_STRUCTURAL + NGRAM_BUCKETS :] = pairs / norm if norm else pairs
+    return x
+
+
+def featurize_batch(contexts: List[JobContext], offers: List[str]) -> np.ndarray:
+    X = np.zeros((len(offers), N_FEATURES), dtype=np.float32)
+    for i, (context, offer) in enumerate(zip(contexts, offers)):
+        featurize(context, offer, out=X[i])
+    return X
+
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+
+
+class LocalRewardModel:
+    """Multi-output ridge regression from offer features to criterion scores."""
+
+    def __init__(self, weights: np.ndarray):
+        self.weights = weights.astype(np.float32)  # [N_FEATURES, len(CRITERIA)]
+
+    @classmethod
+    def fit(cls, verdicts: List[Verdict], l2: float = 1.0, chunk_size: int = 2000) -> "LocalRewardModel":
+        """Closed-form ridge fit, accumulating X^T X in chunks to bound memory."""
+        xtx = np.zeros((N_FEATURES, N_FEATURES), dtype=np.float64)
+        xty = np.zeros((N_FEATURES, len(CRITERIA)), dtype=np.float64)
+        for start in range(0, len(verdicts), chunk_size):
+            chunk = verdicts[start : start + chunk_size]
+            X = featurize_batch([_context(v) for v in chunk], [v.offer for v in chunk]).astype(np.float64)
+            Y = np.array([[v.scores[c] for c in CRITERIA] for v in chunk], dtype=np.float64)
+            xtx += X.T @ X
+            xty += X.T @ Y
+        xtx[np.diag_indices_from(xtx)] += l2
+        return cls(np.linalg.solve(xtx, xty))
+
+    def predict_batch(self, contexts: List[JobContext], offers: List[str]) -> np.ndarray:
+        """Scores in [0, 1], one row per offer and one column per criterion."""
+        if not offers:
+            return np.zeros((0, len(CRITERIA)), dtype=np.float32)
+        return np.clip(featurize_batch(contexts, offers) @ self.weights, 0.0, 1.0)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            criteria=np.array(CRITERIA),
+            n_features=np.array(N_FEATURES),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LocalRewardModel":
+        data = np.load(path)
+        if list(data["criteria"]) != CRITERIA or int(data["n_features"]) != N_FEATURES:
+            raise ValueError(f"{path} was trained with a different feature layout, retrain it")
+        return cls(data["weights"])
+
+
+def _context(verdict: Verdict) -> JobContext:
+    return JobContext(job_title=verdict.job_title, language=verdict.language, skills=verdict.skills)
+
+
+class _MicroBatcher:
+    """Collects concurrent score requests and runs them as one batch.
+
+    Featurizing a batch is pure Python and takes milliseconds per offer, so
+    batches are predicted in a worker thread rather than on the event loop.
+    """
+
+    def __init__(self, model: LocalRewardModel, max_batch: int = 64, max_delay: float = 0.002):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = []
+        self.batches = 0
+        self._timer = None
+        self._predictions = set()
+
+    async def score(self, context: JobContext, offer: str) -> Dict[str, float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.append((context, offer, future))
+        if len(self.queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self.queue = self.queue, []
+        if not batch:
+            return
+        self.batches += 1
+        task = asyncio.ensure_future(self._predict(batch))
+        self._predictions.add(task)
+        task.add_done_callback(self._predictions.discard)
+
+    async def _predict(self, batch) -> None:
+        try:
+            predictions = await asyncio.to_thread(
+                self.model.predict_batch, [b[0] for b in batch], [b[1] for b in batch]
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), row in zip(batch, predictions):
+            if not future.done():
+                future.set_result({c: float(v) for c, v in zip(CRITERIA, row)})
+
+
+_batcher: Optional[_MicroBatcher] = None
+
+
+async def score_with_local_model(context: JobContext, offer: str) -> Dict[str, float]:
+    """Score one offer with the local model; concurrent calls share a batch."""
+    global _batcher
+    if _batcher is None:
+        _batcher = _MicroBatcher(LocalRewardModel.load(MODEL_PATH))
+    return await _batcher.score(context, offer)
+
+
+# ---------------------------------------------------------------------------
+# Agreement with the judge
+# ---------------------------------------------------------------------------
+
+
+def agreement_report(model: LocalRewardModel, verdicts: List[Verdict]) -> Dict[str, Dict[str, float]]:
+    """Compare local predictions with the judge's scores.
+
+    agreement is the share of offers where both land on the same side of 0.5
+    for binary criteria, or within 0.25 of each other otherwise.
+    """
+    predicted = model.predict_batch([_context(v) for v in verdicts], [v.offer for v in verdicts])
+    judged = np.array([[v.scores[c] for c in CRITERIA] for v in verdicts], dtype=np.float32)
+
+    report = {}
+    for j, criterion in enumerate(CRITERIA + ["total_score"]):
+        if criterion == "total_score":
+            p, y = predicted.mean(axis=1), judged.mean(axis=1)
+        else:
+            p, y = predicted[:, j], judged[:, j]
+        if criterion in BINARY_CRITERIA:
+            agree = np.mean((p >= 0.5) == (y >= 0.5))
+        else:
+            agree = np.mean(np.abs(p - y) <= 0.25)
+        corr = np.corrcoef(p, y)[0, 1] if np.std(p) > 1e-6 and np.std(y) > 1e-6 else 0.0
+        report[criterion] = {
+            "mae": float(np.mean(np.abs(p - y))),
+            "pearson": float(corr),
+            "agreement": float(agree),
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, float]], n: int) -> None:
+    print("\n" + "=" * 60)
+    print(f"LOCAL REWARD MODEL vs JUDGE ({n} held-out offers)")
+    print("-" * 60)
+    print(f"{'Criterion':25s} {'MAE':>8s} {'Pearson':>9s} {'Agreement':>10s}")
+    for criterion, stats in report.items():
+        print(f"{criterion:25s} {stats['mae']:8.3f} {stats['pearson']:9.3f} {stats['agreement']:10.1%}")
+    print("=" * 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or evaluate the distilled reward model")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="Fit on harvested verdicts and report held-out agreement")
+    train.add_argument("--data", nargs="+", required=True, help="Verdict .jsonl, benchmark .jsonl or ART .parquet files")
+    train.add_argument("--out", default=MODEL_PATH)
+    train.add_argument("--holdout", type=float, default=0.2)
+    train.add_argument("--l2", type=float, default=1.0)
+    report = sub.add_parser("report", help="Agreement report of a trained model against verdicts")
+    report.add_argument("--data", nargs="+", required=True)
+    report.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    verdicts = harvest_verdicts(args.data)
+    print(f"Harvested {len(verdicts)} verdicts from {len(args.data)} files")
+    if not verdicts:
+        sys.exit("No verdicts found")
+
+    if args.command == "train":
+        random.Random(0).shuffle(verdicts)
+        n_holdout = int(len(verdicts) * args.holdout)
+        holdout, train_set = verdicts[:n_holdout], verdicts[n_holdout:]
+        model = LocalRewardModel.fit(train_set, l2=args.l2)
+        model.save(args.out)
+        print(f"Saved reward model trained on {len(train_set)} verdicts to {args.out}")
+        if holdout:
+            print_report(agreement_report(model, holdout), len(holdout))
+    else:
+        model = LocalRewardModel.load(args.model)
+        print_report(agreement_report(model, verdicts), len(verdicts))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,218 @@
+import asyncio
 import art
 import openai
 import random
-import json
+import re
 from pydantic import BaseModel
+from typing import Dict, Optional, Tuple
 import time
 import os
 
 from get_judge_completion import get_judge_completion
-from load_documents import JobContext
+from judge_prompts import (
+    CRITERION_SECTIONS,
+    LANGUAGE_CHARS,
+    MAX_TOKENS,
+    PROMPT_SLICING,
+    build_prompt,
+    offer_view,
+    parse_verdict,
+)
+from compact_trajectories import COMPACT_TRAJECTORIES, compact_choice, intern_prompt
+from essential_skills import completeness_score, essential_skills
+from load_documents import JobContext, context_id
+from offer_parser import SECTIONS, parse_offer
+from reward_model import CRITERIA, MODEL_PATH, record_verdict, score_with_local_model
+from skill_matcher import context_inclusion
+from streaming import OfferStream, stream_completion
+from usage import budget_guard, usage_tracker
 
 from openpipe.client import OpenPipe
 
 
 op_client = OpenPipe()
 
+# "judge" scores with Azure, "local" with the distilled model (see reward_model.py)
+REWARD_BACKEND = os.getenv("REWARD_BACKEND", "judge")
+# "judge" asks the LLM judge, "local" matches required skills with skill_matcher.py
+SKILL_MATCHING = os.getenv("SKILL_MATCHING", "judge")
+# "judge" asks the LLM judge for every offer, "cached" scores completeness
+# against per-title essential skills (essential_skills.py)
+SKILL_COMPLETENESS = os.getenv("SKILL_COMPLETENESS", "judge")
+# Stream the policy's completion and stop reading at </job_offer> (see streaming.py).
+# Off by default: it only pays for itself when offers ramble past </job_offer>
+STREAM_GENERATION = os.getenv("STREAM_GENERATION", "0") == "1"
+# Scoring cascade: once one of these criteria scores below 0.5, the remaining
+# criteria are capped at CASCADE_CAP and their judge calls are skipped
+CASCADE_GATES = [g.strip() for g in os.getenv("CASCADE_GATES", "").split(",") if g.strip()]
+CASCADE_CAP = float(os.getenv("CASCADE_CAP", "0.0"))
+
+# A partial offer is only parsed again once one of its sections has closed
+SECTION_CLOSE_RE = re.compile(rf"</(?:{'|'.join(SECTIONS)})>")
+LONGEST_SECTION_CLOSE = max(len(f"</{section}>") for section in SECTIONS)
+
 
 class JobOfferScenario(BaseModel):
     context: JobContext
     step: int = 0
 
 
-def clean_json_response(response: str) -> str:
-    """Clean JSON response from markdown code blocks."""
-    clean = response.strip()
-    if clean.startswith("```json"):
-        clean = clean[7:]
-    elif clean.startswith("```"):
-        clean = clean[3:]
-    if clean.endswith("```"):
-        clean = clean[:-3]
-    return clean.strip()
+class OfferScorer:
+    """Scores one offer on the 5 criteria, with the LLM judge or local matching.
+
+    Each criterion is scored in its own task. While the offer streams in,
+    on_text() starts the judge calls whose input is already final: the
+    language check once closed sections hold its first 300 characters, the
+    sliced skill prompts once their sections have closed. finish() starts
+    the rest on the complete offer and restarts any early call whose prompt
+    turned out different, so the scores match scoring the finished offer.
+
+    Each score's source is kept: "judge", "local" (matched without the
+    judge), "capped" (a local score capped by a cascade gate), "skipped" (the
+    judge call was skipped by a cascade gate) or "error" (the judge failed).
+    """
+
+    def __init__(self, context: JobContext):
+        self.context = context
+        # Over the hourly judge budget, use the local modes of the skill criteria
+        self.degraded = budget_guard.degraded()
+        self.sources: Dict[str, str] = {}
+        # Whether any cascade gate scored below 0.5, set by finish()
+        self.gate_fired = False
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.prompts: Dict[str, str] = {}
+        # Scores are only published to cascade gates once finish() has validated them
+        self.results: Dict[str, asyncio.Future] = {c: asyncio.get_running_loop().create_future() for c in CRITERIA}
+        self.started_early = 0
+        self.restarted = 0
+        self._seen = 0
+        self._parsed_upto = 0
+        self.essentials = None
+        if SKILL_COMPLETENESS == "cached" or self.degraded:
+            # Essential skills only depend on the title, fetch them during generation
+            self.essentials = asyncio.ensure_future(essential_skills.get(context.job_title, context.language))
+
+    def judged(self, criterion: str) -> bool:
+        """Whether the criterion needs a judge call, the only scoring worth starting early."""
+        if criterion == "context_inclusion":
+            return bool(self.context.skills) and SKILL_MATCHING != "local" and not self.degraded
+        if criterion == "skill_completeness":
+            return self.essentials is None
+        return True
+
+    def on_text(self, text: str) -> None:
+        """OfferStream listener: start the judge calls a partial offer already answers.
+
+        Called for every chunk, so the partial offer is only parsed when a
+        section has closed; every early start needs a complete section.
+        """
+        # A closing tag can span chunks, so search from just before the new text
+        search_from = max(self._parsed_upto, self._seen - LONGEST_SECTION_CLOSE + 1)
+        self._seen = len(text)
+        if len(self.tasks) == len(CRITERIA):
+            return
+        closes = list(SECTION_CLOSE_RE.finditer(text, search_from))
+        if not closes:
+            return
+        # Up to the last complete section, leaving out the one being generated
+        self._parsed_upto = closes[-1].end()
+        text = text[: self._parsed_upto]
+        parsed = parse_offer(text)
+        for criterion in CRITERIA:
+            if criterion not in self.tasks and self.judged(criterion) and self._input_complete(criterion, text, parsed):
+                self._start(criterion, text, parsed)
+                self.started_early += 1
+
+    @staticmethod
+    def _input_complete(criterion: str, text: str, parsed) -> bool:
+        if criterion == "language_consistency" and len(offer_view(criterion, text, parsed)) >= LANGUAGE_CHARS:
+            return True
+        sections = CRITERION_SECTIONS[criterion]
+        return PROMPT_SLICING and sections is not None and all(f"</{s}>" in text for s in sections)
+
+    def _start(self, criterion: str, offer: str, parsed) -> None:
+        if self.judged(criterion):
+            self.prompts[criterion] = build_prompt(criterion, self.context, offer, parsed)
+        self.tasks[criterion] = asyncio.ensure_future(self._score(criterion, offer, parsed))
+
+    async def _gate_failed(self, criterion: Optional[str] = None) -> bool:
+        """Whether a cascade gate scored before `criterion` (any gate if None) came out below 0.5."""
+        for gate in CASCADE_GATES:
+            if gate in CRITERIA and (criterion is None or CRITERIA.index(gate) < CRITERIA.index(criterion)):
+                if await self.results[gate] < 0.5:
+                    return True
+        return False
+
+    async def _local_score(self, criterion: str, parsed) -> Optional[float]:
+        """Score without the judge, or None if the criterion needs a judge call."""
+        if criterion == "context_inclusion":
+            if not self.context.skills:
+                return 1.0  # No skills to check
+            if SKILL_MATCHING == "local" or self.degraded:
+                return context_inclusion(self.context.skills, parsed.all_skills)["final_score"]
+        if criterion == "skill_completeness" and self.essentials is not None:
+            essentials = await self.essentials
+            if essentials is not None:
+                return completeness_score(essentials, parsed.all_skills)["final_score"]
+        return None
+
+    async def _score(self, criterion: str, offer: str, parsed) -> float:
+        gate_failed = await self._gate_failed(criterion)
+        score = await self._local_score(criterion, parsed)
+        if score is not None:
+            self.sources[criterion] = "capped" if gate_failed else "local"
+            return min(score, CASCADE_CAP) if gate_failed else score
+        if gate_failed:
+            self.sources[criterion] = "skipped"
+            return CASCADE_CAP
+        # Each prompt only embeds the offer sections its criterion needs
+        prompt = self.prompts.get(criterion) or build_prompt(criterion, self.context, offer, parsed)
+        response = await get_judge_completion(prompt, max_tokens=MAX_TOKENS[criterion], criterion=criterion)
+        self.sources[criterion] = "error" if response.startswith("ERROR:") else "judge"
+        return parse_verdict(criterion, response)
+
+    async def finish(self, offer: str) -> Tuple[dict, Dict[str, str]]:
+        """Score the complete offer, returning the scores and the source of each."""
+        parsed = parse_offer(offer)
+        scores = {}
+        try:
+            for criterion in CRITERIA:
+                task = self.tasks.get(criterion)
+                if task is not None and self.prompts[criterion] != build_prompt(criterion, self.context, offer, parsed):
+                    task.cancel()
+                    self.restarted += 1
+                    task = None
+                if task is None:
+                    self.prompts.pop(criterion, None)
+                    self._start(criterion, offer, parsed)
+            # Gates come before the criteria they cap, so awaiting in order cannot deadlock
+            for criterion in CRITERIA:
+                scores[criterion] = await self.tasks[criterion]
+                self.results[criterion].set_result(scores[criterion])
+            # Also when no call was left to skip, e.g. for the last criterion
+            self.gate_fired = await self._gate_failed()
+        except BaseException:
+            self.cancel()
+            raise
+        return scores, {criterion: self.sources[criterion] for criterion in CRITERIA}
+
+    def cancel(self) -> None:
+        """Stop scoring, e.g. when generation failed."""
+        for task in self.tasks.values():
+            task.cancel()
+        if self.essentials is not None:
+            self.essentials.cancel()
+        for result in self.results.values():
+            if not result.done():
+                result.cancel()
+
+
+async def judge_scores(context: JobContext, generated_offer: str) -> Tuple[dict, Dict[str, str]]:
+    """Score a generated offer on the 5 criteria, with the LLM judge or local matching.
+
+    Returns the scores and the source of each (see OfferScorer).
+    """
+    return await OfferScorer(context).finish(generated_offer)
 
 
 @art.retry(exceptions=(openai.LengthFinishReasonError,))
@@ -70,12 +253,13 @@ Guidelines:
         messages_and_choices=[
             {
                 "role": "system",
-                "content": f"""You are a specialized AI assistant that generates professional job offers in XML format.
+                # Interned so every trajectory shares one copy (see compact_trajectories.py)
+                "content": intern_prompt(f"""You are a specialized AI assistant that generates professional job offers in XML format.
 You must follow this template structure and output valid XML.
 
 Template:
 {template}
-""",
+"""),
             }
         ],
         reward=0,
@@ -87,6 +271,8 @@ Template:
             "skill_completeness": 0,
             "total_score": 0,
         },
+        # Lets per-context statistics (context_sampler.py) find the context back
+        metadata={"context_id": context_id(scenario.context), "language": scenario.context.language},
     )
 
     # Build the generation prompt
@@ -110,170 +296,77 @@ Instructions:
 Generate the job offer now:"""
 
     trajectory.messages_and_choices.append(
-        {"role": "user", "content": generation_prompt}
+        {"role": "user", "content": intern_prompt(generation_prompt)}
     )
 
     requested_at = int(time.time() * 1000)
 
+    # Score with the LLM judge, or with the distilled local reward model
+    # (also used once the hourly judge budget is spent, if one was trained)
+    use_local_model = REWARD_BACKEND == "local" or (budget_guard.degraded() and os.path.exists(MODEL_PATH))
+    scorer = None if use_local_model else OfferScorer(scenario.context)
+
     # Generate job offer
     messages = trajectory.messages()
-    completion = await client.chat.completions.create(
-        model=model.inference_model_name, messages=messages, max_tokens=1500
-    )
+    generation_start = time.monotonic()
+    try:
+        if STREAM_GENERATION:
+            # Stop reading at </job_offer> or as soon as the output is clearly broken,
+            # and start judge calls on the sections that are already complete
+            stream = OfferStream(listener=scorer.on_text if scorer else None)
+            completion = await stream_completion(
+                client, model.inference_model_name, messages, max_tokens=1500, stream=stream
+            )
+            trajectory.metrics["stream_stopped_early"] = 1.0 if stream.stop_reason else 0.0
+            trajectory.metrics["stream_aborted"] = 1.0 if stream.aborted else 0.0
+        else:
+            completion = await client.chat.completions.create(
+                model=model.inference_model_name, messages=messages, max_tokens=1500
+            )
+    except BaseException:
+        if scorer:
+            scorer.cancel()
+        raise
+    generation_end = time.monotonic()
+    trajectory.metrics["generation_seconds"] = generation_end - generation_start
     choice = completion.choices[0]
+    if completion.usage:
+        trajectory.metrics["prompt_tokens"] = completion.usage.prompt_tokens
+        trajectory.metrics["completion_tokens"] = completion.usage.completion_tokens
+        usage_tracker.record_completion("policy", completion, policy=True)
+    elif STREAM_GENERATION:
+        # A stream closed early never receives its usage chunk
+        if choice.logprobs and choice.logprobs.content:
+            completion_tokens = len(choice.logprobs.content)
+        else:
+            completion_tokens = stream.chunks
+        trajectory.metrics["completion_tokens"] = completion_tokens
+        usage_tracker.record("policy", 0, completion_tokens, policy=True)
+    generated_offer = stream.offer if STREAM_GENERATION else choice.message.content
+    if COMPACT_TRAJECTORIES:
+        # Keep only what training reads from here on, also while the offer is
+        # being scored; the OpenPipe report is the only user of the full completion
+        choice = compact_choice(choice)
+        if not os.getenv("OPENPIPE_API_KEY"):
+            completion = None
     trajectory.messages_and_choices.append(choice)
-    generated_offer = choice.message.content
-
-    # Initialize scoring
-    total_criteria = 5
-    scores = {}
-
-    # Criterion 1: Language Consistency
-    language_prompt = f"""Is this text written in {scenario.context.language.upper()} language?
-
-Text to check: {generated_offer[:300]}
-
-Expected language: {scenario.context.language} ({'English' if scenario.context.language == 'en' else 'French' if scenario.context.language == 'fr' else scenario.context.language})
-
-Respond ONLY in JSON format:
-{{"answer": "YES" or "NO"}}"""
-
-    language_response = await get_judge_completion(language_prompt, max_tokens=50)
-    try:
-        result = json.loads(clean_json_response(language_response))
-        scores["language_consistency"] = 1.0 if result["answer"] == "YES" else 0.0
-    except:
-        scores["language_consistency"] = 0.0  # Default to 0 if parsing fails
 
-    # Criterion 2: XML Format Validation
-    xml_prompt = f"""Is this valid XML format? Check if it has proper opening/closing tags.
-
-Text to check:
-{generated_offer}
-
-Respond ONLY in JSON format:
-{{"valid_xml": true or false, "has_required_tags": true or false}}"""
-
-    xml_response = await get_judge_completion(xml_prompt, max_tokens=100)
-    try:
-        result = json.loads(clean_json_response(xml_response))
-        scores["xml_format"] = 1.0 if result.get("valid_xml", False) else 0.0
-    except:
-        scores["xml_format"] = 0.0
-
-    # Criterion 3: Context Inclusion (check if provided skills are included)
-    if scenario.context.skills:
-        context_prompt = f"""Evaluate skill inclusion with deduplication penalty.
-
-Required skills that MUST be included: {', '.join(scenario.context.skills)}
-
-Generated job offer:
-{generated_offer}
-
-Instructions:
-1. Extract ALL skills mentioned in the job offer (from all sections)
-2. For each required skill, check if it's present (exact or fuzzy match)
-3. Identify duplicate/redundant skills (e.g., "Python" and "Python Programming", "ML" and "Machine Learning")
-4. Calculate base_score = matched_required_skills / total_required_skills
-5. Calculate deduplication_factor = 1 - (duplicate_count / total_extracted_skills)
-6. Calculate final_score = base_score * deduplication_factor
-
-Example of duplicates to detect:
-- "Python" + "Python" = duplicate
-- "Python" + "Python Programming" = duplicate
-- "Machine Learning" + "ML" = duplicate
-- "Data Analysis" + "Data Analytics" = duplicate
-- "Communication" + "Communication Skills" = duplicate
-
-Respond ONLY in JSON format:
-{{
-  "required_skills": ["skill1", "skill2"],
-  "extracted_skills": ["skill1", "skill2", ...],
-  "matched_skills": ["skill1", "skill2"],
-  "missing_skills": [],
-  "duplicate_groups": [["Python", "Python Programming"], ["ML", "Machine Learning"]],
-  "duplicate_count": number,
-  "base_score": 0.0-1.0,
-  "deduplication_factor": 0.0-1.0,
-  "final_score": 0.0-1.0
-}}"""
-
-        context_response = await get_judge_completion(context_prompt, max_tokens=400)
-        try:
-            result = json.loads(clean_json_response(context_response))
-            scores["context_inclusion"] = result.get("final_score", 0.0)
-        except:
-            scores["context_inclusion"] = 0.0
+    skipped = []
+    gate_fired = False
+    if scorer is None:
+        scores = await score_with_local_model(scenario.context, generated_offer)
     else:
-        scores["context_inclusion"] = 1.0  # No skills to check
-
-    # Criterion 4: Skill Relevance (only for NEW skills added by the model)
-    provided_skills_str = ', '.join(scenario.context.skills) if scenario.context.skills else 'None'
-    skill_relevance_prompt = f"""For a {scenario.context.job_title} position:
-
-1. Extract ALL skills mentioned in the job offer (both in Required Skills and Nice-to-Have sections)
-2. EXCLUDE these provided skills from evaluation: {provided_skills_str}
-3. For each NEW skill added by the model, score it:
-   - 1 if relevant to {scenario.context.job_title}
-   - 0 if not relevant
-4. Calculate final score = sum(skill_scores) / total_new_skills
-
-Generated job offer:
-{generated_offer}
-
-Respond ONLY in JSON format:
-{{
-  "provided_skills": ["skill1", "skill2"],
-  "all_extracted_skills": ["skill1", "skill2", ...],
-  "new_skills_evaluation": [
-    {{"skill": "skill_name", "relevant": 1}},
-    {{"skill": "skill_name", "relevant": 0}}
-  ],
-  "total_new_skills": number,
-  "relevant_count": number,
-  "final_score": 0.0-1.0
-}}"""
-
-    skill_relevance_response = await get_judge_completion(skill_relevance_prompt, max_tokens=300)
-    try:
-        result = json.loads(clean_json_response(skill_relevance_response))
-        scores["skill_relevance"] = result.get("final_score", 0.5)
-    except:
-        scores["skill_relevance"] = 0.5
-
-    # Criterion 5: Skill Completeness (check for missing obvious skills)
-    completeness_prompt = f"""Evaluate skill completeness for {scenario.context.job_title} position.
-
-Review the generated job offer and identify essential skills that are missing.
-Essential = skills that 80%+ of {scenario.context.job_title} job postings would include.
-
-Generated job offer:
-{generated_offer}
-
-For each missing essential skill:
-1. Explain why it's essential for this role
-2. Rate its importance: 1.0 (critical), 0.5 (important), 0.25 (nice-to-have)
-
-Calculate penalty = sum(importance_scores) / 10 (capped at 1.0)
-Final score = 1.0 - penalty
-
-Respond ONLY in JSON format:
-{{
-  "skills_present": ["skill1", "skill2", ...],
-  "missing_essentials": [
-    {{"skill": "Git", "importance": 1.0, "reason": "Version control is critical for any developer role"}},
-    {{"skill": "Testing", "importance": 0.5, "reason": "Most positions require testing knowledge"}}
-  ],
-  "total_penalty": 0.0-1.0,
-  "final_score": 0.0-1.0
-}}"""
-
-    completeness_response = await get_judge_completion(completeness_prompt, max_tokens=300)
-    try:
-        result = json.loads(clean_json_response(completeness_response))
-        scores["skill_completeness"] = result.get("final_score", 0.5)
-    except:
-        scores["skill_completeness"] = 0.5  # Default if parsing fails
+        scores, sources = await scorer.finish(generated_offer)
+        skipped = [criterion for criterion, source in sources.items() if source == "skipped"]
+        gate_fired = scorer.gate_fired
+        trajectory.metrics["judge_calls_started_early"] = scorer.started_early
+        trajectory.metrics["judge_calls_restarted"] = scorer.restarted
+        if all(source == "judge" for source in sources.values()):
+            # Local, capped and failed scores are not what the judge would have said
+            record_verdict(scenario.context, generated_offer, scores)
+    # Time spent waiting on scores after generation, and the whole trajectory
+    trajectory.metrics["scoring_seconds"] = time.monotonic() - generation_end
+    trajectory.metrics["rollout_seconds"] = time.monotonic() - generation_start
 
     # Calculate final score (weighted average)
     final_score = (
@@ -286,6 +379,8 @@ Respond ONLY in JSON format:
 
     # Update trajectory metrics
     trajectory.metrics.update(scores)
+    trajectory.metrics["cascade_gate_fired"] = 1.0 if gate_fired else 0.0
+    trajectory.metrics["judge_calls_skipped"] = len(skipped)
     trajectory.metrics["total_score"] = final_score
     trajectory.reward = final_score * 10  # Scale to 0-10
 
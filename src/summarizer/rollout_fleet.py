@@ -0,0 +1,475 @@
+"""Distributed rollouts: a work queue between the trainer and rollout workers on other hosts.
+
+The trainer (coordinator) publishes (scenario, n) work items, where the
+scenario carries the context and step, and RolloutFleet.rollout resolves
+each rollout from the trajectories a worker pushes back. Rollouts issued in
+the same event-loop tick for the same scenario become one item, so a group
+is usually run by one worker.
+
+Workers are stateless: they lease an item, run rollout.rollout n times,
+renew the lease while they work and complete it with the trajectories as
+JSON. A worker that dies stops renewing, its lease expires and the
+item is handed to another worker; a late completion of an expired lease is
+ignored. After ROLLOUT_MAX_ATTEMPTS expired leases the item's rollouts fail.
+
+The queue backend is pluggable: workers need a WorkerQueue, the trainer a
+QueueBackend. InMemoryQueue lives in the trainer process and serves tests
+and same-host workers; QueueServer exposes it over HTTP to remote workers,
+which use HttpQueue (both need the fleet extra, pip install ".[fleet]"):
+
+    python src/summarizer/rollout_fleet.py --coordinator http://trainer-host:8765 --concurrency 32
+
+Every request must carry the shared secret ROLLOUT_FLEET_TOKEN as a bearer
+token, and the server only listens on ROLLOUT_FLEET_HOST (loopback unless
+set). /setup does not hand out the inference API key: workers read it from
+ROLLOUT_INFERENCE_API_KEY in their own environment.
+"""
+
+import abc
+import argparse
+import asyncio
+import hmac
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import art
+from pydantic import BaseModel, field_validator
+
+from compact_trajectories import restore_choices
+from load_documents import JobContext
+from rollout import JobOfferScenario, rollout
+from rollout_workers import RolloutWorkerError
+from skill_matcher import set_skill_vocabulary
+from usage import usage_tracker
+
+# Port the trainer serves the work queue on (unset = no fleet)
+ROLLOUT_FLEET_PORT = os.getenv("ROLLOUT_FLEET_PORT")
+# Interface the queue server binds to, e.g. the private network's address
+ROLLOUT_FLEET_HOST = os.getenv("ROLLOUT_FLEET_HOST", "127.0.0.1")
+# Shared secret the trainer and its workers authenticate with
+ROLLOUT_FLEET_TOKEN = os.getenv("ROLLOUT_FLEET_TOKEN")
+# A worker that has not renewed its lease for this long is presumed lost
+LEASE_SECONDS = float(os.getenv("ROLLOUT_LEASE_SECONDS", "120"))
+# Leases an item may lose before its rollouts fail
+MAX_ATTEMPTS = int(os.getenv("ROLLOUT_MAX_ATTEMPTS", "3"))
+
+
+class WorkItem(BaseModel):
+    id: str
+    scenario: JobOfferScenario
+    n: int
+    attempts: int = 0
+
+
+class Lease(BaseModel):
+    item: WorkItem
+    token: str
+    worker: str
+    expires_at: float
+
+
+class WorkResult(BaseModel):
+    item_id: str
+    worker: Optional[str] = None
+    trajectories: List[art.Trajectory] = []
+    error: Optional[str] = None
+    # Usage counters recorded by the worker (see UsageTracker.merge)
+    usage: Dict[str, Dict[str, float]] = {}
+
+    @field_validator("trajectories")
+    @classmethod
+    def _restore_choices(cls, trajectories: List[art.Trajectory]) -> List[art.Trajectory]:
+        for trajectory in trajectories:
+            restore_choices(trajectory)
+        return trajectories
+
+
+class WorkerQueue(abc.ABC):
+    """Worker side of the work queue: lease items, renew the leases and complete them."""
+
+    @abc.abstractmethod
+    async def lease(self, worker: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Lease]:
+        """The next item to run, or None if there is none."""
+
+    @abc.abstractmethod
+    async def renew(self, item_id: str, token: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Extend a lease; False if it expired or the item was cancelled."""
+
+    @abc.abstractmethod
+    async def complete(self, item_id: str, token: str, result: WorkResult) -> bool:
+        """Hand back an item's trajectories; False if the lease is no longer valid."""
+
+
+class QueueBackend(WorkerQueue):
+    """Work queue with leases. The trainer puts, cancels and reads results; workers lease and complete."""
+
+    @abc.abstractmethod
+    async def put(self, item: WorkItem) -> None:
+        """Publish an item for workers to lease."""
+
+    @abc.abstractmethod
+    async def cancel(self, item_id: str) -> None:
+        """Drop an item the trainer no longer waits for; its lease can no longer be renewed."""
+
+    @abc.abstractmethod
+    async def get_result(self) -> WorkResult:
+        """The next completed or failed item."""
+
+    @abc.abstractmethod
+    async def reap(self) -> None:
+        """Requeue the items of expired leases, or fail them after too many attempts."""
+
+
+class InMemoryQueue(QueueBackend):
+    """Queue held by the trainer process."""
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.items: Dict[str, WorkItem] = {}
+        self.pending: Deque[str] = deque()
+        self.leases: Dict[str, Lease] = {}
+        self.results: asyncio.Queue = asyncio.Queue()
+        self.expired_leases = 0
+
+    async def put(self, item: WorkItem) -> None:
+        self.items[item.id] = item
+        self.pending.append(item.id)
+
+    async def cancel(self, item_id: str) -> None:
+        self.items.pop(item_id, None)
+        self.leases.pop(item_id, None)
+
+    async def get_result(self) -> WorkResult:
+        return await self.results.get()
+
+    async def reap(self) -> None:
+        now = time.monotonic()
+        for item_id, lease in list(self.leases.items()):
+            if lease.expires_at >= now:
+                continue
+            del self.leases[item_id]
+            self.expired_leases += 1
+            item = self.items.get(item_id)
+            if item is None:
+                continue
+            if item.attempts >= self.max_attempts:
+                del self.items[item_id]
+                error = f"lease expired {item.attempts} times, last held by {lease.worker}"
+                self.results.put_nowait(WorkResult(item_id=item_id, worker=lease.worker, error=error))
+            else:
+                # Retried before newer items, the trainer has waited longest for it
+                self.pending.appendleft(item_id)
+
+    async def lease(self, worker: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Lease]:
+        await self.reap()
+        while self.pending:
+            item = self.items.get(self.pending.popleft())
+            if item is None:
+                continue  # Cancelled
+            item.attempts += 1
+            lease = Lease(item=item, token=uuid.uuid4().hex, worker=worker, expires_at=time.monotonic() + lease_seconds)
+            self.leases[item.id] = lease
+            return lease
+        return None
+
+    async def renew(self, item_id: str, token: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        lease = self.leases.get(item_id)
+        if lease is None or lease.token != token:
+            return False
+        lease.expires_at = time.monotonic() + lease_seconds
+        return True
+
+    async def complete(self, item_id: str, token: str, result: WorkResult) -> bool:
+        lease = self.leases.get(item_id)
+        if lease is None or lease.token != token:
+            return False  # Expired and handed to another worker, or cancelled
+        del self.leases[item_id]
+        if self.items.pop(item_id, None) is None:
+            return False
+        self.results.put_nowait(result)
+        return True
+
+
+class RolloutFleet:
+    """Trainer side: turns rollout(scenario) calls into work items and resolves them from results."""
+
+    def __init__(self, queue: QueueBackend, reap_interval: float = 1.0):
+        self.queue = queue
+        self.reap_interval = reap_interval
+        self.items_published = 0
+        self._batch: Dict[str, tuple] = {}
+        self._waiting: Dict[str, List[asyncio.Future]] = {}
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def rollout(self, scenario: JobOfferScenario) -> art.Trajectory:
+        """Drop-in for rollout.rollout(model, scenario), run by a fleet worker."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        if not self._batch:
+            # Publish once every rollout started in this tick has joined the batch
+            asyncio.ensure_future(self._publish())
+        future = asyncio.get_running_loop().create_future()
+        self._batch.setdefault(scenario.model_dump_json(), (scenario, []))[1].append(future)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            for item_id, futures in list(self._waiting.items()):
+                if future in futures and all(f.done() for f in futures):
+                    del self._waiting[item_id]
+                    await self.queue.cancel(item_id)
+            raise
+
+    async def _publish(self) -> None:
+        batch, self._batch = self._batch, {}
+        for scenario, futures in batch.values():
+            if all(f.done() for f in futures):
+                continue  # Cancelled before it was published
+            item = WorkItem(id=uuid.uuid4().hex, scenario=scenario, n=len(futures))
+            self._waiting[item.id] = futures
+            self.items_published += 1
+            await self.queue.put(item)
+
+    async def _dispatch(self) -> None:
+        last_reap = time.monotonic()
+        while True:
+            try:
+                result = await asyncio.wait_for(self.queue.get_result(), timeout=self.reap_interval)
+            except asyncio.TimeoutError:
+                result = None
+            if time.monotonic() - last_reap >= self.reap_interval:
+                await self.queue.reap()
+                last_reap = time.monotonic()
+            if result is None:
+                continue
+            if result.usage:
+                usage_tracker.merge(result.usage)
+            for i, future in enumerate(self._waiting.pop(result.item_id, [])):
+                if future.done():
+                    continue
+                if i < len(result.trajectories):
+                    future.set_result(result.trajectories[i])
+                else:
+                    future.set_exception(
+                        RolloutWorkerError(result.error or f"{result.worker} returned {len(result.trajectories)} trajectories")
+                    )
+
+    async def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        for futures in self._waiting.values():
+            for future in futures:
+                future.cancel()
+        self._waiting.clear()
+
+
+async def _run_item(queue: WorkerQueue, model: art.Model, lease: Lease, worker: str, lease_seconds: float) -> None:
+    item = lease.item
+    work = asyncio.gather(*[rollout(model, item.scenario) for _ in range(item.n)], return_exceptions=True)
+    try:
+        while not work.done():
+            await asyncio.wait({work}, timeout=lease_seconds / 3)
+            if work.done():
+                break
+            try:
+                renewed = await queue.renew(item.id, lease.token, lease_seconds)
+            except Exception as e:
+                # The lease cannot be kept without reaching the queue, so the
+                # item will be handed to another worker
+                print(f"Renewing the lease of work item {item.id} failed: {e}")
+                renewed = False
+            if not renewed:
+                # Cancelled by the trainer, or presumed lost and handed to another worker
+                return
+    finally:
+        if not work.done():
+            work.cancel()
+            try:
+                await work
+            except asyncio.CancelledError:
+                pass
+    outcomes = work.result()
+    trajectories = [t for t in outcomes if isinstance(t, art.Trajectory)]
+    errors = [f"{type(e).__name__}: {e}" for e in outcomes if isinstance(e, BaseException)]
+    result = WorkResult(
+        item_id=item.id,
+        worker=worker,
+        trajectories=trajectories,
+        error=errors[0] if errors else None,
+        usage=usage_tracker.take_step(),
+    )
+    if not await queue.complete(item.id, lease.token, result):
+        print(f"Work item {item.id} was reassigned before {worker} finished it")
+
+
+async def run_worker(
+    queue: WorkerQueue,
+    model: art.Model,
+    worker: str,
+    concurrency: int = 16,
+    lease_seconds: float = LEASE_SECONDS,
+    poll_interval: float = 0.5,
+) -> None:
+    """Lease and run work items, at most `concurrency` at a time, until cancelled."""
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+    try:
+        while True:
+            await slots.acquire()
+            try:
+                lease = await queue.lease(worker, lease_seconds)
+            except Exception as e:
+                print(f"Leasing work failed: {e}")
+                lease = None
+            if lease is None:
+                slots.release()
+                await asyncio.sleep(poll_interval)
+                continue
+            task = asyncio.ensure_future(_run_item(queue, model, lease, worker, lease_seconds))
+            running.add(task)
+            task.add_done_callback(lambda task: (running.discard(task), slots.release()))
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def _authorization(token: Optional[str]) -> str:
+    if not token:
+        raise ValueError("The rollout fleet needs a shared token, set ROLLOUT_FLEET_TOKEN")
+    return f"Bearer {token}"
+
+
+class QueueServer:
+    """Serves an InMemoryQueue to remote workers over HTTP (aiohttp)."""
+
+    def __init__(
+        self,
+        queue: InMemoryQueue,
+        setup: dict,
+        token: Optional[str] = ROLLOUT_FLEET_TOKEN,
+        host: str = ROLLOUT_FLEET_HOST,
+        port: int = 8765,
+    ):
+        self.queue = queue
+        # Sent to workers on start: {"model": worker_model_kwargs(...) without the API key, "contexts": [...]}
+        self.setup = setup
+        self.authorization = _authorization(token)
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self) -> str:
+        from aiohttp import web
+
+        @web.middleware
+        async def authenticate(request, handler):
+            if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), self.authorization.encode()):
+                raise web.HTTPUnauthorized()
+            return await handler(request)
+
+        async def setup(request):
+            return web.json_response(self.setup)
+
+        async def lease(request):
+            body = await request.json()
+            lease = await self.queue.lease(body["worker"], body.get("lease_seconds", LEASE_SECONDS))
+            return web.json_response(lease.model_dump(mode="json") if lease else {})
+
+        async def renew(request):
+            body = await request.json()
+            ok = await self.queue.renew(body["item_id"], body["token"], body.get("lease_seconds", LEASE_SECONDS))
+            return web.json_response({"ok": ok})
+
+        async def complete(request):
+            body = await request.json()
+            result = WorkResult.model_validate(body["result"])
+            return web.json_response({"ok": await self.queue.complete(body["item_id"], body["token"], result)})
+
+        app = web.Application(client_max_size=256 * 1024 * 1024, middlewares=[authenticate])
+        app.add_routes(
+            [
+                web.get("/setup", setup),
+                web.post("/lease", lease),
+                web.post("/renew", renew),
+                web.post("/complete", complete),
+            ]
+        )
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        host = socket.gethostname() if self.host in ("", "0.0.0.0", "::") else self.host
+        return f"http://{host}:{self.port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class HttpQueue(WorkerQueue):
+    """Worker side of QueueServer."""
+
+    def __init__(self, url: str, token: Optional[str] = ROLLOUT_FLEET_TOKEN, timeout: float = 60.0):
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            base_url=url, timeout=timeout, headers={"Authorization": _authorization(token)}
+        )
+
+    async def _post(self, path: str, body: dict) -> dict:
+        response = await self.client.post(path, json=body)
+        response.raise_for_status()
+        return response.json()
+
+    async def setup(self) -> dict:
+        response = await self.client.get("/setup")
+        response.raise_for_status()
+        return response.json()
+
+    async def lease(self, worker: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Lease]:
+        body = await self._post("/lease", {"worker": worker, "lease_seconds": lease_seconds})
+        return Lease.model_validate(body) if body else None
+
+    async def renew(self, item_id: str, token: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        body = await self._post("/renew", {"item_id": item_id, "token": token, "lease_seconds": lease_seconds})
+        return body["ok"]
+
+    async def complete(self, item_id: str, token: str, result: WorkResult) -> bool:
+        body = await self._post(
+            "/complete", {"item_id": item_id, "token": token, "result": result.model_dump(mode="json")}
+        )
+        return body["ok"]
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+async def worker_main(args) -> None:
+    queue = HttpQueue(args.coordinator)
+    setup = await queue.setup()
+    set_skill_vocabulary([JobContext.model_validate(c) for c in setup["contexts"]])
+    # The trainer does not send its API key, the worker brings its own
+    model = art.Model(**setup["model"], inference_api_key=os.getenv("ROLLOUT_INFERENCE_API_KEY"))
+    worker = args.name or f"{socket.gethostname()}-{os.getpid()}"
+    print(f"🚀 Rollout worker {worker} serving {args.coordinator} ({args.concurrency} items at a time)")
+    try:
+        await run_worker(queue, model, worker, concurrency=args.concurrency, lease_seconds=args.lease_seconds)
+    finally:
+        await queue.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run rollouts for a trainer's work queue")
+    parser.add_argument("--coordinator", required=True, help="URL the trainer serves its queue on")
+    parser.add_argument("--concurrency", type=int, default=16, help="Work items run at the same time")
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS)
+    parser.add_argument("--name", help="Worker name in logs (default host-pid)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(worker_main(parse_args()))
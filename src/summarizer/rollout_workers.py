@@ -0,0 +1,211 @@
+"""Run rollouts in worker processes, each with its own event loop and judge client.
+
+On a single event loop, the CPU work of hundreds of concurrent rollouts
+(prompt formatting, JSON parsing, pydantic validation) shows up as loop lag.
+RolloutWorkerPool shards rollouts across N spawned processes. Every worker
+imports rollout.py itself, so it has its own judge pool, judge cache and
+budget guard. Scenarios go out over a per-worker queue and finished
+trajectories come back pickled (Choice objects and logprobs included) on
+a shared queue.
+
+pool.rollout(scenario) is a drop-in for rollout(model, scenario): cancelling
+it cancels the rollout in its worker. Judge and policy usage recorded in the
+workers is merged into the trainer's usage_tracker with every result.
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import art
+
+from rollout import rollout
+from usage import usage_tracker
+
+ROLLOUT_WORKERS = int(os.getenv("ROLLOUT_WORKERS", "0"))
+
+
+class RolloutWorkerError(Exception):
+    """A rollout failed in a worker process, or the worker died."""
+
+
+def worker_model_kwargs(model: art.Model) -> dict:
+    """What a worker needs to rebuild an inference-only copy of `model`."""
+    return {
+        "name": model.name,
+        "project": model.project,
+        "inference_api_key": model.inference_api_key,
+        "inference_base_url": model.inference_base_url,
+        "inference_model_name": model.inference_model_name or model.name,
+    }
+
+
+async def _serve(worker_id: int, model_kwargs: dict, inbox, outbox) -> None:
+    model = art.Model(**model_kwargs)
+    loop = asyncio.get_running_loop()
+    tasks: Dict[int, asyncio.Task] = {}
+
+    def reply(job_id: int, task: asyncio.Task) -> None:
+        tasks.pop(job_id, None)
+        if task.cancelled():
+            outbox.put(("cancelled", worker_id, job_id, None, usage_tracker.take_step()))
+        elif task.exception() is not None:
+            error = f"{type(task.exception()).__name__}: {task.exception()}"
+            outbox.put(("error", worker_id, job_id, error, usage_tracker.take_step()))
+        else:
+            outbox.put(("result", worker_id, job_id, task.result(), usage_tracker.take_step()))
+
+    outbox.put(("ready", worker_id, None, os.getpid(), None))
+    while True:
+        message = await loop.run_in_executor(None, inbox.get)
+        if message is None:
+            break
+        kind, job_id, scenario = message
+        if kind == "rollout":
+            tasks[job_id] = asyncio.ensure_future(rollout(model, scenario))
+            tasks[job_id].add_done_callback(lambda task, job_id=job_id: reply(job_id, task))
+        elif kind == "cancel" and job_id in tasks:
+            tasks[job_id].cancel()
+    for task in tasks.values():
+        task.cancel()
+
+
+def _worker_main(worker_id: int, model_kwargs: dict, inbox, outbox, initializer, initargs) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+    asyncio.run(_serve(worker_id, model_kwargs, inbox, outbox))
+
+
+class RolloutWorkerPool:
+    """Shards rollouts across worker processes, least busy worker first."""
+
+    def __init__(
+        self,
+        model_kwargs: dict,
+        workers: int,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+    ):
+        self.model_kwargs = model_kwargs
+        self.workers = workers
+        # Run in every worker before it serves, e.g. skill_matcher.set_skill_vocabulary
+        self.initializer = initializer
+        self.initargs = initargs
+        self.processes: List[multiprocessing.Process] = []
+        self.inboxes = []
+        self.in_flight: List[int] = [0] * workers
+        self.completed = 0
+        self.failed = 0
+        self._jobs: Dict[int, Tuple[asyncio.Future, int]] = {}
+        self._job_ids = itertools.count()
+        self._ready: List[asyncio.Future] = []
+        self._closing = False
+
+    async def start(self) -> "RolloutWorkerPool":
+        """Spawn the workers and wait until they all serve."""
+        self._loop = asyncio.get_running_loop()
+        # Spawn rather than fork: the trainer already runs threads and an event loop
+        context = multiprocessing.get_context("spawn")
+        self.outbox = context.Queue()
+        self._ready = [self._loop.create_future() for _ in range(self.workers)]
+        for worker_id in range(self.workers):
+            inbox = context.Queue()
+            process = context.Process(
+                target=_worker_main,
+                args=(worker_id, self.model_kwargs, inbox, self.outbox, self.initializer, self.initargs),
+                daemon=True,
+                name=f"rollout-worker-{worker_id}",
+            )
+            process.start()
+            self.inboxes.append(inbox)
+            self.processes.append(process)
+        self._reader = threading.Thread(target=self._read, daemon=True, name="rollout-worker-reader")
+        self._reader.start()
+        await asyncio.gather(*self._ready)
+        return self
+
+    def _read(self) -> None:
+        """Forward worker messages to the event loop, and notice dead workers."""
+        while not self._closing:
+            try:
+                message = self.outbox.get(timeout=1.0)
+            except queue.Empty:
+                self._loop.call_soon_threadsafe(self._check_workers)
+                continue
+            except (EOFError, OSError):
+                return
+            self._loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _dispatch(self, message) -> None:
+        kind, worker_id, job_id, payload, usage = message
+        if usage:
+            usage_tracker.merge(usage)
+        if kind == "ready":
+            if not self._ready[worker_id].done():
+                self._ready[worker_id].set_result(payload)
+            return
+        future, _ = self._jobs.pop(job_id, (None, None))
+        if future is None:
+            return  # Cancelled by the trainer, already accounted for
+        self.in_flight[worker_id] -= 1
+        if future.done():
+            return
+        if kind == "result":
+            self.completed += 1
+            future.set_result(payload)
+        elif kind == "error":
+            self.failed += 1
+            future.set_exception(RolloutWorkerError(payload))
+        else:
+            future.cancel()
+
+    def _check_workers(self) -> None:
+        for worker_id, process in enumerate(self.processes):
+            if process.is_alive() or self._closing:
+                continue
+            error = RolloutWorkerError(f"rollout worker {worker_id} exited with code {process.exitcode}")
+            if not self._ready[worker_id].done():
+                self._ready[worker_id].set_exception(error)
+            for job_id, (future, owner) in list(self._jobs.items()):
+                if owner == worker_id:
+                    del self._jobs[job_id]
+                    self.in_flight[worker_id] -= 1
+                    if not future.done():
+                        self.failed += 1
+                        future.set_exception(error)
+
+    async def rollout(self, scenario) -> art.Trajectory:
+        """Run rollout.rollout(model, scenario) in the least busy worker."""
+        alive = [i for i, process in enumerate(self.processes) if process.is_alive()]
+        if not alive:
+            raise RolloutWorkerError("no rollout worker is alive")
+        worker_id = min(alive, key=self.in_flight.__getitem__)
+        job_id = next(self._job_ids)
+        future = self._loop.create_future()
+        self._jobs[job_id] = (future, worker_id)
+        self.in_flight[worker_id] += 1
+        self.inboxes[worker_id].put(("rollout", job_id, scenario))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if self._jobs.pop(job_id, None) is not None:
+                self.in_flight[worker_id] -= 1
+                self.inboxes[worker_id].put(("cancel", job_id, None))
+            raise
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Stop the workers, cancelling their unfinished rollouts."""
+        self._closing = True
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            await self._loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+        for future, _ in self._jobs.values():
+            future.cancel()
+        self._jobs.clear()
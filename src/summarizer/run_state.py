@@ -0,0 +1,104 @@
+"""Durable loop state of train.main, so a restarted run resumes where it stopped.
+
+Without it a restart reshuffled the training contexts, recomputed the number
+of batches from the model's step and reset the best validation score to 0,
+so batches were repeated and the first step pushed to S3 again.
+
+The state is written after every step, atomically (temporary file, fsync,
+rename), so a crash leaves either the previous or the new state. A crash
+between model.train and the write repeats at most that one batch.
+
+Epoch shuffles are seeded with (seed, epoch), so a resumed epoch walks the
+contexts in the same order. Other random draws (backfill contexts) use the
+run's RNG, whose state is saved with the cursor. The statistics of the
+prioritized ContextSampler and the groups in the ReplayBuffer are saved too,
+when those are on, so they draw the same contexts and groups after a resume.
+"""
+
+import os
+import random
+import time
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+RUN_STATE_PATH = os.getenv("RUN_STATE_PATH", "run_state.json")
+RUN_SEED = os.getenv("RUN_SEED")
+
+
+class RunState(BaseModel):
+    model: str
+    seed: int
+    start_step: int  # Model step the run started at; batches are numbered from it
+    epoch: int = 0
+    batch: int = 0  # Next batch of `epoch` to train on
+    rng_state: Optional[list] = None
+    best_val_score: float = 0.0
+    judge_cache_snapshot: Optional[str] = None  # Essential skills the rewards were computed with
+    sampler_state: Optional[dict] = None  # ContextSampler.state_dict()
+    replay_state: Optional[dict] = None  # ReplayBuffer.state_dict()
+    updated_at: float = 0.0
+
+    @classmethod
+    def new(cls, model: str, start_step: int) -> "RunState":
+        seed = int(RUN_SEED) if RUN_SEED else random.SystemRandom().randrange(2**32)
+        return cls(model=model, seed=seed, start_step=start_step)
+
+    @classmethod
+    def load(cls, path: str = RUN_STATE_PATH, model: Optional[str] = None) -> Optional["RunState"]:
+        """The saved state, or None if there is none (or it belongs to another model)."""
+        if not path or not os.path.exists(path):
+            return None
+        with open(path) as f:
+            state = cls.model_validate_json(f.read())
+        if model is not None and state.model != model:
+            print(f"Ignoring run state in {path}, it belongs to model {state.model}")
+            return None
+        return state
+
+    def save(self, path: str = RUN_STATE_PATH) -> None:
+        if not path:
+            return
+        self.updated_at = time.time()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.model_dump_json(indent=1))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def rng(self) -> random.Random:
+        """The run's RNG, at the state it was saved with."""
+        rng = random.Random(self.seed)
+        if self.rng_state is not None:
+            version, internal, gauss_next = self.rng_state
+            rng.setstate((version, tuple(internal), gauss_next))
+        return rng
+
+    def epoch_order(self, contexts: List, epoch: int) -> List:
+        """The contexts in the order `epoch` walks them."""
+        order = list(contexts)
+        random.Random(f"{self.seed}:{epoch}").shuffle(order)
+        return order
+
+    def first_batch(self, epoch: int) -> int:
+        return self.batch if epoch == self.epoch else 0
+
+    def advance(
+        self,
+        epoch: int,
+        batch: int,
+        rng: random.Random,
+        best_val_score: float,
+        judge_cache_snapshot: str,
+        sampler_state: Optional[dict] = None,
+        replay_state: Optional[dict] = None,
+    ) -> None:
+        """Record that `batch` of `epoch` is done."""
+        self.epoch = epoch
+        self.batch = batch + 1
+        self.rng_state = list(rng.getstate())
+        self.best_val_score = best_val_score
+        self.judge_cache_snapshot = judge_cache_snapshot
+        self.sampler_state = sampler_state
+        self.replay_state = replay_state
@@ -0,0 +1,134 @@
+"""Sequential validation: stop once it is clear whether the step beat the best score.
+
+Validation only decides whether to save the checkpoint, i.e. whether the
+mean validation score beats the best so far. SequentialValidator rolls out
+the validation contexts in random order, VAL_ROUND_CONTEXTS at a time, and
+after each round computes a confidence interval for the mean over the whole
+validation set. It stops early when the interval lies entirely below the
+best score (don't save). When the interval lies entirely above it, the step
+will be saved, and validation runs to the end: the score of a saved step
+becomes the best score later steps are compared with, and a mean that
+stopped because it looked high is biased upwards. Saves are the rarer
+outcome, so most of the savings remain.
+
+The interval is normal with a finite-population correction, so it shrinks
+to the exact mean once every context is in: the decision is then the same
+as full validation's. VAL_ERROR_RATE is split evenly over the rounds
+(Bonferroni), which keeps the chance of a wrong early decision below it.
+
+With a straggler deadline, the rounds share it: each round gets the time
+left of the step's deadline, and no round starts once it has passed.
+"""
+
+import math
+import os
+import random
+import time
+from statistics import NormalDist
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import art
+
+from load_documents import JobContext
+from straggler import StragglerPolicy, gather_groups_with_deadline
+
+SEQUENTIAL_VALIDATION = os.getenv("SEQUENTIAL_VALIDATION", "0") == "1"
+VAL_ERROR_RATE = float(os.getenv("VAL_ERROR_RATE", "0.05"))
+VAL_ROUND_CONTEXTS = int(os.getenv("VAL_ROUND_CONTEXTS", "10"))
+# Rollouts per validation context, as in full validation
+VAL_ROLLOUTS = 2
+
+
+def confidence_interval(scores: List[float], population: int, z: float) -> Tuple[float, float, float]:
+    """(mean, low, high) of the population mean, from a sample without replacement."""
+    n = len(scores)
+    mean = sum(scores) / n
+    if n >= population:
+        return mean, mean, mean
+    if n < 2:
+        return mean, -math.inf, math.inf
+    variance = sum((s - mean) ** 2 for s in scores) / (n - 1)
+    half_width = z * math.sqrt(variance / n * (population - n) / (population - 1))
+    return mean, mean - half_width, mean + half_width
+
+
+class SequentialValidator:
+    """Validation that stops as soon as the save decision is statistically clear."""
+
+    def __init__(
+        self,
+        error_rate: float = VAL_ERROR_RATE,
+        round_contexts: int = VAL_ROUND_CONTEXTS,
+        rollouts: int = VAL_ROLLOUTS,
+    ):
+        self.error_rate = error_rate
+        self.round_contexts = round_contexts
+        self.rollouts = rollouts
+
+    @classmethod
+    def from_env(cls) -> "SequentialValidator":
+        return cls(error_rate=VAL_ERROR_RATE, round_contexts=VAL_ROUND_CONTEXTS)
+
+    async def validate(
+        self,
+        contexts: List[JobContext],
+        make_rollout: Callable[[JobContext], Awaitable[art.Trajectory]],
+        best_score: float,
+        straggler_policy: StragglerPolicy,
+        rng: Optional[random.Random] = None,
+        pbar_desc: Optional[str] = "gather val",
+    ) -> Tuple[List[art.TrajectoryGroup], Dict[str, float]]:
+        """Validate until the mean is clearly below `best_score`, or to the end.
+
+        Scores are the mean trajectory reward of each group. Returns the
+        validation groups, and the straggler stats of all rounds summed with
+        the estimated score ("score"), the decision and the contexts used.
+        """
+        order = list(contexts)
+        (rng or random).shuffle(order)
+        rounds = max(math.ceil(len(order) / self.round_contexts), 1)
+        z = NormalDist().inv_cdf(1 - self.error_rate / (2 * rounds))
+
+        groups: List[art.TrajectoryGroup] = []
+        scores: List[float] = []
+        stats: Dict[str, float] = {}
+        mean, low, high = 0.0, -math.inf, math.inf
+        evaluated = 0
+        start = time.monotonic()
+        while evaluated < len(order):
+            round_policy = straggler_policy
+            if straggler_policy.deadline is not None:
+                # The deadline bounds the whole step, not each round
+                remaining = straggler_policy.deadline - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+                round_policy = straggler_policy.model_copy(update={"deadline": remaining})
+            batch = order[evaluated : evaluated + self.round_contexts]
+            evaluated += len(batch)
+            round_groups, round_stats = await gather_groups_with_deadline(
+                [[make_rollout(context) for _ in range(self.rollouts)] for context in batch],
+                round_policy,
+                pbar_desc=pbar_desc,
+            )
+            for key, value in round_stats.items():
+                stats[key] = stats.get(key, 0) + value
+            groups.extend(round_groups)
+            scores.extend(sum(t.reward for t in group) / len(group.trajectories) for group in round_groups)
+            if not scores:
+                continue
+            # Groups dropped as stragglers are not in the sample, but their contexts are used up
+            population = len(order) - (evaluated - len(scores))
+            mean, low, high = confidence_interval(scores, population, z)
+            if high <= best_score:
+                break
+
+        # Once every context is in, the interval is the exact mean
+        return groups, {
+            **stats,
+            "score": mean,
+            "ci_low": low,
+            "ci_high": high,
+            "improved": low > best_score,
+            "contexts": evaluated,
+            "contexts_saved": len(order) - evaluated,
+        }
@@ -0,0 +1,251 @@
+"""Local skill matching for the context-inclusion criterion.
+
+Skills are normalized (case, punctuation, filler words such as
+"programming" or "compétences") and mapped through an alias table, then
+compared with TF-IDF weighted character n-grams. The IDF weights come from
+the dataset's skill vocabulary, so frequent fragments like "ing" count less
+than distinctive ones.
+
+N-gram similarity alone confuses skills that share most characters but
+differ in one word ("Project Management" vs "Product Management"), so a
+fuzzy match also needs the words to agree: the same words up to spacing,
+plurals or a one-letter typo.
+
+Scoring mirrors the judge prompt it replaces:
+final_score = matched_required / total_required * (1 - duplicates / total_extracted)
+"""
+
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from load_documents import JobContext
+
+NGRAM_BUCKETS = 1024
+MATCH_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", "0.75"))
+# Words that qualify a skill without naming a different one ("Python 3", "ES2015")
+QUALIFIER = re.compile(r"^(v?\d[\w.]*|es\d+)$")
+
+# Canonical skill -> aliases; aliases are normalized like any other skill
+ALIASES = {
+    "machine learning": ["ml", "apprentissage automatique"],
+    "deep learning": ["dl", "apprentissage profond"],
+    "artificial intelligence": ["ai", "ia", "intelligence artificielle"],
+    "natural language processing": ["nlp", "traitement du langage naturel"],
+    "data analysis": ["data analytics", "analyse de données", "analyse des données"],
+    "javascript": ["js", "ecmascript"],
+    "typescript": ["ts"],
+    "node js": ["node", "nodejs"],
+    "react": ["react js", "reactjs"],
+    "postgresql": ["postgres"],
+    "kubernetes": ["k8s"],
+    "amazon web services": ["aws"],
+    "google cloud platform": ["gcp", "google cloud"],
+    "microsoft azure": ["azure"],
+    "continuous integration": ["ci", "ci cd", "cicd"],
+    "user experience": ["ux", "ux design"],
+    "user interface": ["ui", "ui design"],
+    "project management": ["gestion de projet", "gestion des projets"],
+    "version control": ["gestion de version", "contrôle de version"],
+    "communication": ["communication écrite et orale", "written and verbal communication"],
+    "teamwork": ["team player", "travail en équipe", "esprit d équipe"],
+    "problem solving": ["résolution de problèmes"],
+    "microsoft excel": ["excel", "ms excel"],
+}
+
+# Words that qualify a skill without changing it ("Python Programming" == "Python")
+FILLER_WORDS = {
+    "skill", "skills", "programming", "language", "languages", "experience", "knowledge",
+    "proficiency", "proficient", "strong", "solid", "good", "excellent", "basic", "advanced",
+    "in", "of", "with",
+    "compétence", "compétences", "maîtrise", "connaissance", "connaissances", "programmation",
+    "langage", "expérience", "bonne", "bonnes", "solide", "solides", "de", "du", "des", "en",
+}
+
+
+@lru_cache(maxsize=65536)
+def normalize_skill(skill: str) -> str:
+    """Lowercase, strip punctuation and filler words, and resolve aliases."""
+    text = re.sub(r"[^\w+#]+", " ", skill.lower()).strip()
+    text = ALIAS_INDEX.get(text, text)
+    words = [w for w in text.split() if w not in FILLER_WORDS]
+    core = " ".join(words) if words else text
+    return ALIAS_INDEX.get(core, core)
+
+
+def _build_alias_index() -> Dict[str, str]:
+    index = {}
+    for canonical, aliases in ALIASES.items():
+        for alias in aliases:
+            index[re.sub(r"[^\w+#]+", " ", alias.lower()).strip()] = canonical
+    return index
+
+
+ALIAS_INDEX = _build_alias_index()
+
+
+@lru_cache(maxsize=65536)
+def _ngram_buckets(normalized: str) -> tuple:
+    padded = f" {normalized} "
+    return tuple(zlib.crc32(padded[i : i + 3].encode()) % NGRAM_BUCKETS for i in range(len(padded) - 2))
+
+
+class SkillIndex:
+    """IDF weights over character n-grams of a skill vocabulary."""
+
+    def __init__(self, vocabulary: Iterable[str] = ()):
+        skills = {normalize_skill(s) for s in vocabulary} | set(ALIASES)
+        df = np.zeros(NGRAM_BUCKETS, dtype=np.float32)
+        for skill in skills:
+            df[list(set(_ngram_buckets(skill)))] += 1
+        self.size = len(skills)
+        self.idf = np.log((1 + self.size) / (1 + df)) + 1
+
+    def vectors(self, normalized: List[str]) -> np.ndarray:
+        """L2-normalized TF-IDF rows, one per (already normalized) skill."""
+        X = np.zeros((len(normalized), NGRAM_BUCKETS), dtype=np.float32)
+        for i, skill in enumerate(normalized):
+            np.add.at(X[i], list(_ngram_buckets(skill)), 1.0)
+        X *= self.idf
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        return X / np.where(norms > 0, norms, 1.0)
+
+    def similarity(self, a: List[str], b: List[str]) -> np.ndarray:
+        """Cosine similarity matrix between two lists of normalized skills."""
+        if not a or not b:
+            return np.zeros((len(a), len(b)), dtype=np.float32)
+        return self.vectors(a) @ self.vectors(b).T
+
+
+skill_index = SkillIndex()
+
+
+def set_skill_vocabulary(contexts: List[JobContext]) -> None:
+    """Rebuild the shared index from the skills of the dataset's contexts."""
+    global skill_index
+    skill_index = SkillIndex(skill for context in contexts for skill in (context.skills or []))
+
+
+def _same_word(a: str, b: str) -> bool:
+    """Equal up to a plural ending or, for longer words, a one-letter typo."""
+    if a == b:
+        return True
+    short, long = sorted((a, b), key=len)
+    if long.startswith(short) and len(long) - len(short) <= 2 and len(short) >= 3:
+        return True
+    if len(short) < 5 or len(long) - len(short) > 1:
+        return False
+    # Edit distance 1: one substitution, insertion or deletion
+    i = 0
+    while i < len(short) and short[i] == long[i]:
+        i += 1
+    skip = 1 if len(long) > len(short) else 0
+    return short[i + 1 - skip :] == long[i + 1 :]
+
+
+def _words_agree(a: str, b: str) -> bool:
+    """Whether two normalized skills name the same thing word for word."""
+    if a.replace(" ", "") == b.replace(" ", ""):
+        return True
+    words_a, words_b = a.split(), b.split()
+    if len(words_a) != len(words_b):
+        return False
+    return all(any(_same_word(w, other) for other in words_b) for w in words_a) and all(
+        any(_same_word(w, other) for other in words_a) for w in words_b
+    )
+
+
+def _same_skill(a: str, b: str, similarity: float, threshold: float) -> bool:
+    return a == b or (similarity >= threshold and _words_agree(a, b))
+
+
+def _qualified(skill: str, other: str) -> bool:
+    """Whether `other` is a more specific form of `skill`.
+
+    That is `skill` after a modifier ("Unit Testing" for "Testing") or with a
+    version ("Python 3"). A word after it names a different skill ("React Native").
+    """
+    words = skill.split()
+    core = [w for w in other.split() if not QUALIFIER.match(w)]
+    return 0 < len(words) <= len(core) and core[len(core) - len(words) :] == words
+
+
+def match_skills(
+    required: List[str],
+    extracted: List[str],
+    index: Optional[SkillIndex] = None,
+    threshold: float = MATCH_THRESHOLD,
+) -> Tuple[List[str], List[str]]:
+    """Split required skills into those found among the extracted ones and the rest.
+
+    A skill is found on an exact canonical match, a fuzzy match whose words
+    agree or a more specific form ("Testing" is covered by "Unit Testing" and
+    "Python" by "Python 3", but "React" is not covered by "React Native").
+    """
+    index = index or skill_index
+    required_norm = [normalize_skill(s) for s in required]
+    extracted_norm = [normalize_skill(s) for s in extracted]
+    cross = index.similarity(required_norm, extracted_norm)
+    matched, missing = [], []
+    for i, skill in enumerate(required):
+        if any(
+            _same_skill(required_norm[i], other, cross[i, j], threshold) or _qualified(required_norm[i], other)
+            for j, other in enumerate(extracted_norm)
+        ):
+            matched.append(skill)
+        else:
+            missing.append(skill)
+    return matched, missing
+
+
+def context_inclusion(
+    required: List[str],
+    extracted: List[str],
+    index: Optional[SkillIndex] = None,
+    threshold: float = MATCH_THRESHOLD,
+) -> dict:
+    """Score how many required skills the offer includes, penalizing duplicates.
+
+    Returns the same fields as the judge's context-inclusion verdict.
+    """
+    index = index or skill_index
+    matched, missing = match_skills(required, extracted, index, threshold)
+    extracted_norm = [normalize_skill(s) for s in extracted]
+
+    # Duplicates among the extracted skills, grouped with union-find
+    parent = list(range(len(extracted)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    pairwise = index.similarity(extracted_norm, extracted_norm)
+    for i in range(len(extracted)):
+        for j in range(i + 1, len(extracted)):
+            if _same_skill(extracted_norm[i], extracted_norm[j], pairwise[i, j], threshold):
+                parent[find(j)] = find(i)
+    groups: Dict[int, List[str]] = {}
+    for i, skill in enumerate(extracted):
+        groups.setdefault(find(i), []).append(skill)
+    duplicate_groups = [group for group in groups.values() if len(group) > 1]
+    duplicate_count = sum(len(group) - 1 for group in duplicate_groups)
+
+    base_score = len(matched) / len(required) if required else 1.0
+    deduplication_factor = 1 - duplicate_count / len(extracted) if extracted else 1.0
+    return {
+        "required_skills": list(required),
+        "extracted_skills": list(extracted),
+        "matched_skills": matched,
+        "missing_skills": missing,
+        "duplicate_groups": duplicate_groups,
+        "duplicate_count": duplicate_count,
+        "base_score": base_score,
+        "deduplication_factor": deduplication_factor,
+        "final_score": base_score * deduplication_factor,
+    }
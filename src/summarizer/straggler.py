@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import art
+from pydantic import BaseModel
+from tqdm import auto as tqdm
+
+
+class StragglerPolicy(BaseModel):
+    """When to stop waiting for slow rollouts in a step.
+
+    The step ends at the earlier of:
+    - `deadline` seconds after it started (hard limit), and
+    - `slack` x the time it took for a `quantile` fraction of rollouts to finish.
+    Unfinished rollouts are cancelled. Groups with fewer than `min_trajectories`
+    finished trajectories are dropped.
+
+    A failed rollout fails the step, as before, unless a cutoff is configured
+    or `tolerate_failures` is set: only then are failures recorded and the
+    groups that lost too many trajectories dropped.
+    """
+
+    deadline: Optional[float] = None
+    quantile: float = 1.0
+    slack: float = 1.5
+    min_trajectories: int = 2
+    tolerate_failures: bool = False
+
+    @property
+    def tolerant(self) -> bool:
+        """Whether failed rollouts are recorded instead of raised."""
+        return self.tolerate_failures or self.deadline is not None or self.quantile < 1.0
+
+    @classmethod
+    def from_env(cls) -> "StragglerPolicy":
+        deadline = os.getenv("STEP_DEADLINE_SECONDS")
+        return cls(
+            deadline=float(deadline) if deadline else None,
+            quantile=float(os.getenv("STRAGGLER_QUANTILE", "1.0")),
+            slack=float(os.getenv("STRAGGLER_SLACK", "1.5")),
+            min_trajectories=int(os.getenv("MIN_GROUP_TRAJECTORIES", "2")),
+            tolerate_failures=os.getenv("TOLERATE_ROLLOUT_FAILURES", "0") == "1",
+        )
+
+
+async def gather_groups_with_deadline(
+    groups: List[List[Awaitable[art.Trajectory]]],
+    policy: StragglerPolicy,
+    pbar_desc: Optional[str] = "gather",
+    expand: Optional[
+        Callable[[int, List[art.Trajectory], int], List[Awaitable[art.Trajectory]]]
+    ] = None,
+) -> Tuple[List[art.TrajectoryGroup], Dict[str, float]]:
+    """Gather trajectory groups, cancelling stragglers according to `policy`.
+
+    If given, `expand(group_index, finished_trajectories, issued_count)` is
+    called whenever all rollouts issued for a group are done and may return
+    more rollouts to add to that group.
+
+    Returns the kept groups and a dict of completed/cancelled/dropped counts.
+    Raises the first rollout exception unless `policy` tolerates failures.
+    """
+    start = time.monotonic()
+    owner = {}
+    outstanding = {i: len(rollouts) for i, rollouts in enumerate(groups)}
+    issued = dict(outstanding)
+    for group_idx, rollouts in enumerate(groups):
+        for coro in rollouts:
+            owner[asyncio.ensure_future(coro)] = group_idx
+
+    total = len(owner)
+    finished = {i: [] for i in range(len(groups))}
+    exceptions = {i: [] for i in range(len(groups))}
+    hard_cutoff = start + policy.deadline if policy.deadline is not None else None
+    soft_cutoff = None
+
+    pbar = tqdm.tqdm(desc=pbar_desc, total=total)
+    pending = set(owner)
+    try:
+        while pending:
+            cutoffs = [c for c in (hard_cutoff, soft_cutoff) if c is not None]
+            timeout = max(0.0, min(cutoffs) - time.monotonic()) if cutoffs else None
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break  # Cutoff reached
+
+            for task in done:
+                group_idx = owner[task]
+                if task.exception() is not None:
+                    if not policy.tolerant:
+                        raise task.exception()
+                    exceptions[group_idx].append(task.exception())
+                else:
+                    finished[group_idx].append(task.result())
+                outstanding[group_idx] -= 1
+                if outstanding[group_idx] == 0 and expand is not None:
+                    for coro in expand(group_idx, finished[group_idx], issued[group_idx]):
+                        new_task = asyncio.ensure_future(coro)
+                        owner[new_task] = group_idx
+                        pending.add(new_task)
+                        outstanding[group_idx] += 1
+                        issued[group_idx] += 1
+                        total += 1
+                        pbar.total = total
+            pbar.update(len(done))
+
+            completed = total - len(pending)
+            if soft_cutoff is None and policy.quantile < 1.0 and completed >= policy.quantile * total:
+                soft_cutoff = start + policy.slack * (time.monotonic() - start)
+    finally:
+        pbar.close()
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    kept = []
+    partial = 0
+    dropped = 0
+    for i in range(len(groups)):
+        if len(finished[i]) < policy.min_trajectories:
+            dropped += 1
+            continue
+        if len(finished[i]) < issued[i]:
+            partial += 1
+        kept.append(art.TrajectoryGroup(finished[i], exceptions=exceptions[i]))
+
+    stats = {
+        "rollouts": total,
+        "completed": sum(len(f) for f in finished.values()),
+        "failed": sum(len(e) for e in exceptions.values()),
+        "cancelled": len(pending),
+        "partial_groups": partial,
+        "dropped_groups": dropped,
+        "duration": time.monotonic() - start,
+    }
+    return kept, stats
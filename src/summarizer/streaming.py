@@ -0,0 +1,169 @@
+"""Streamed policy generation with early stop.
+
+The offer is read chunk by chunk. Reading stops (and the request is closed,
+which aborts it server-side) as soon as </job_offer> arrives, or once the
+output is clearly broken: no <job_offer> root near the start, or the same
+line repeated over and over. The ChatCompletion is assembled from the
+chunks, so the choice keeps its logprobs for training.
+
+Chunks are decoded with json.loads and the ChatCompletion is validated once
+at the end. Going through the SDK's AsyncStream builds a pydantic
+ChatCompletionChunk for every token, which cost more CPU on the event loop
+than the rest of the rollout and made streamed steps slower than
+non-streamed ones (benchmarks/offline_step_benchmark.py).
+"""
+
+import json
+import os
+from typing import Callable, List, Optional
+
+import openai
+from openai.types.chat.chat_completion import ChatCompletion
+
+ROOT_OPEN = "<job_offer>"
+ROOT_CLOSE = "</job_offer>"
+
+# Abort if the root tag has not opened after this many characters
+ABORT_WITHOUT_ROOT_CHARS = int(os.getenv("STREAM_ABORT_WITHOUT_ROOT_CHARS", "300"))
+# Abort when the last N non-empty lines are identical
+ABORT_REPEATED_LINES = int(os.getenv("STREAM_ABORT_REPEATED_LINES", "5"))
+
+
+class OfferStream:
+    """Accumulates a streamed offer and decides when to stop reading it."""
+
+    def __init__(
+        self,
+        abort_without_root_chars: int = ABORT_WITHOUT_ROOT_CHARS,
+        abort_repeated_lines: int = ABORT_REPEATED_LINES,
+        listener: Optional[Callable[[str], None]] = None,
+    ):
+        self.abort_without_root_chars = abort_without_root_chars
+        self.abort_repeated_lines = abort_repeated_lines
+        # Called with the text so far after every chunk (see rollout.OfferScorer.on_text)
+        self.listener = listener
+        self.text = ""
+        self.chunks = 0
+        self.root_opened = False
+        self.closed_at: Optional[int] = None
+        # "closed" (root tag closed), "no_root", "repetition", or None if the model finished
+        self.stop_reason: Optional[str] = None
+        self._lines: List[str] = []  # Complete non-empty lines, stripped
+        self._line_start = 0
+        # Parts of the completion besides the text
+        self._first: Optional[dict] = None
+        self._logprobs: List[dict] = []
+        self._finish_reason: Optional[str] = None
+        self._usage: Optional[dict] = None
+
+    @property
+    def offer(self) -> str:
+        """The generated offer, ending at </job_offer> when it was closed."""
+        return self.text[: self.closed_at] if self.closed_at is not None else self.text
+
+    @property
+    def aborted(self) -> bool:
+        return self.stop_reason in ("no_root", "repetition")
+
+    def on_chunk(self, chunk: dict) -> None:
+        """Take one decoded chat.completion.chunk; StopIteration ends the stream."""
+        if self._first is None:
+            self._first = chunk
+        if chunk.get("usage"):
+            # Sent as a last chunk without choices when the stream runs to the end
+            self._usage = chunk["usage"]
+        if not chunk.get("choices"):
+            return
+        choice = chunk["choices"][0]
+        self._finish_reason = choice.get("finish_reason") or self._finish_reason
+        logprobs = choice.get("logprobs")
+        if logprobs and logprobs.get("content"):
+            self._logprobs.extend(logprobs["content"])
+        content = (choice.get("delta") or {}).get("content")
+        if not content:
+            return
+        self.chunks += 1
+        start = len(self.text)
+        self.text += content
+        if self.listener:
+            self.listener(self.text)
+        self.feed(start)
+
+    def completion(self) -> ChatCompletion:
+        """The completion read so far, as a non-streamed request would return it."""
+        first = self._first or {}
+        return ChatCompletion.model_validate(
+            {
+                "id": first.get("id", ""),
+                "object": "chat.completion",
+                "created": first.get("created", 0),
+                "model": first.get("model", ""),
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": self._finish_reason or "stop",
+                        "message": {"role": "assistant", "content": self.text},
+                        "logprobs": {"content": self._logprobs} if self._logprobs else None,
+                    }
+                ],
+                "usage": self._usage,
+            }
+        )
+
+    def feed(self, start: int) -> None:
+        """Check the text appended since `start`, raising StopIteration to stop reading."""
+        # Tags can span chunks, so search from just before the new text
+        search_from = max(0, start - len(ROOT_CLOSE))
+        if not self.root_opened:
+            self.root_opened = ROOT_OPEN in self.text[max(0, start - len(ROOT_OPEN)) :]
+            if not self.root_opened and len(self.text) > self.abort_without_root_chars:
+                self.stop("no_root")
+        close = self.text.find(ROOT_CLOSE, search_from)
+        if close != -1:
+            self.closed_at = close + len(ROOT_CLOSE)
+            self.stop("closed")
+        end = self.text.rfind("\n", start)
+        if end != -1:
+            self._check_repetition(end)
+
+    def _check_repetition(self, end: int) -> None:
+        # Only the lines completed by this chunk are split
+        lines = self.text[self._line_start : end].split("\n")
+        self._line_start = end + 1
+        self._lines.extend(line.strip() for line in lines if line.strip())
+        del self._lines[: -self.abort_repeated_lines]
+        if len(self._lines) == self.abort_repeated_lines and len(set(self._lines)) == 1:
+            self.stop("repetition")
+
+    def stop(self, reason: str) -> None:
+        self.stop_reason = reason
+        raise StopIteration
+
+
+async def stream_completion(client, model: str, messages, max_tokens: int, stream: OfferStream) -> ChatCompletion:
+    """Stream a chat completion through `stream`, stopping early when it says so.
+
+    Leaving the response early closes the connection, which aborts the
+    generation server-side.
+    """
+    async with client.chat.completions.with_streaming_response.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True},
+    ) as response:
+        async for line in response.iter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("error"):
+                raise openai.APIError(str(chunk["error"]), response.http_request, body=chunk["error"])
+            try:
+                stream.on_chunk(chunk)
+            except StopIteration:
+                break
+    return stream.completion()
@@ -2,7 +2,7 @@ print("🔄 Starting imports...")
 
 import asyncio
 import os
-import random
+from typing import Awaitable, Callable, List, Optional, Tuple
 from dotenv import load_dotenv
 print("✓ Basic imports loaded")
 
@@ -18,26 +18,283 @@ print("🔄 Loading ART (this may take a while)...")
 import art
 print("✓ ART loaded")
 
-print("🔄 Loading backend modules...")
-#from art.local import LocalBackend
-from art.skypilot import SkyPilotBackend
-print("✓ Backend modules loaded")
-
 print("🔄 Loading custom modules...")
-from rollout import rollout, JobOfferScenario
-from load_documents import load_documents
+from rollout import rollout, JobOfferScenario, CASCADE_GATES, REWARD_BACKEND, SKILL_COMPLETENESS, SKILL_MATCHING
+from load_documents import load_documents, JobContext
+from get_judge_completion import get_judge_stats, get_judge_hedge_stats
+from straggler import StragglerPolicy, gather_groups_with_deadline
+from group_filter import filter_degenerate_groups, trajectory_tokens
+from adaptive_sampler import AdaptiveRolloutPolicy
+from skill_matcher import set_skill_vocabulary
+from usage import budget_guard, usage_tracker
+from rollout_workers import ROLLOUT_WORKERS, RolloutWorkerPool, worker_model_kwargs
+from rollout_fleet import ROLLOUT_FLEET_PORT, InMemoryQueue, QueueServer, RolloutFleet
+from loop_monitor import LOOP_MONITOR, LoopLagMonitor, install_event_loop
+from compact_trajectories import peak_rss_mb
+from checkpoint_retention import CheckpointRetention
+from essential_skills import essential_skills
+from run_state import RUN_STATE_PATH, RunState
+from replay_buffer import REPLAY_FRACTION, ReplayBuffer
+from context_sampler import PRIORITIZED_SAMPLING, ContextSampler
+from sequential_validation import SEQUENTIAL_VALIDATION, SequentialValidator
+from metric_table import MetricTable
 print("✓ All imports complete")
 
 AGENT_NAME = "job-offer-agent"
 PROJECT_NAME = "job-offer-generation"
 CLUSTER_NAME = "job-offer-art"
 
+# Groups whose rewards are all equal have zero advantage and are not trained on
+MIN_GROUP_REWARD_STD = float(os.getenv("MIN_GROUP_REWARD_STD", "1e-6"))
+# Extra random training contexts rolled out per step to backfill skipped groups
+OVERSAMPLE_CONTEXTS = int(os.getenv("OVERSAMPLE_CONTEXTS", "0"))
+
+
+async def train_step(
+    model: art.TrainableModel,
+    val_contexts: List[JobContext],
+    step_contexts: List[JobContext],
+    batch_size: int,
+    current_step: int,
+    straggler_policy: StragglerPolicy,
+    adaptive_policy: AdaptiveRolloutPolicy,
+    pbar_suffix: str = "",
+    rollout_fn: Optional[Callable[[JobOfferScenario], Awaitable[art.Trajectory]]] = None,
+    checkpoints: Optional[CheckpointRetention] = None,
+    replay: Optional[ReplayBuffer] = None,
+    sampler: Optional[ContextSampler] = None,
+    validator: Optional[SequentialValidator] = None,
+    best_val_score: float = 0.0,
+) -> Tuple[float, bool]:
+    """Gather validation and training groups, log them and train on one batch.
+
+    Rollouts run on this event loop unless `rollout_fn` is given, e.g. a
+    RolloutWorkerPool's rollout method. With `checkpoints`, the validation
+    score is recorded for the current checkpoint and old checkpoints are
+    pruned in the background after training. With `replay`, part of the
+    batch is replayed from earlier steps and fewer contexts are rolled out.
+    With `sampler`, the training groups update the per-context statistics.
+    With `validator`, validation stops early once the score is clearly below
+    `best_val_score`, and the returned score is its estimate.
+
+    Returns the validation score for the step and whether it beats
+    `best_val_score`.
+    """
+    if rollout_fn is None:
+        rollout_fn = lambda scenario: rollout(model, scenario)
+
+    # Replayed groups take the place of the last contexts (backfill first)
+    replay_count = replay.quota(batch_size, current_step) if replay else 0
+    if replay_count:
+        step_contexts = step_contexts[: len(step_contexts) - replay_count]
+
+    def train_rollout(context):
+        return rollout_fn(JobOfferScenario(context=context))
+
+    if validator:
+        # Only as many validation contexts as it takes to tell whether this step beats the best
+        validation = validator.validate(
+            val_contexts,
+            lambda context: rollout_fn(JobOfferScenario(context=context, step=current_step)),
+            best_val_score,
+            straggler_policy,
+            pbar_desc=f"gather val ({pbar_suffix})",
+        )
+    else:
+        validation = gather_groups_with_deadline(
+            [
+                [
+                    rollout_fn(JobOfferScenario(context=context, step=current_step))
+                    for _ in range(2)
+                ]
+                for context in val_contexts
+            ],
+            straggler_policy,
+            pbar_desc=f"gather val ({pbar_suffix})",
+        )
+
+    (val_groups, val_stats), (train_groups, train_stats) = await asyncio.gather(
+        validation,
+        gather_groups_with_deadline(
+            adaptive_policy.initial_groups(step_contexts, train_rollout),
+            straggler_policy,
+            pbar_desc=f"gather train ({pbar_suffix})",
+            expand=adaptive_policy.expander(step_contexts, train_rollout),
+        ),
+    )
+
+    for split, stats in (("val", val_stats), ("train", train_stats)):
+        if stats["cancelled"] or stats["failed"] or stats["dropped_groups"]:
+            print(
+                f"Stragglers ({split}): {stats['completed']}/{stats['rollouts']} rollouts completed, "
+                f"{stats['cancelled']} cancelled, {stats['failed']} failed, "
+                f"{stats['partial_groups']} partial groups, {stats['dropped_groups']} dropped groups "
+                f"in {stats['duration']:.1f}s"
+            )
+    if val_stats["dropped_groups"]:
+        # The score only covers the contexts left, so make the gap visible
+        print(
+            f"⚠️ {val_stats['dropped_groups']}/{val_stats.get('contexts', len(val_contexts))} "
+            f"validation contexts dropped, they are not in the validation score"
+        )
+    await model.log(metrics={"contexts_dropped": val_stats["dropped_groups"]}, split="val")
+
+    if adaptive_policy.initial_rollouts < adaptive_policy.max_rollouts:
+        savings = adaptive_policy.savings(len(step_contexts), train_stats["rollouts"])
+        print(
+            f"Adaptive rollouts: {savings['rollouts_issued']} issued, "
+            f"{savings['rollouts_saved']} rollouts and ~{savings['judge_calls_saved']} judge calls saved"
+        )
+        await model.log(metrics=savings, split="train")
+
+    # Rewards and metrics as columns, read once for every aggregate below
+    val_table = MetricTable.from_groups(val_groups)
+    train_table = MetricTable.from_groups(train_groups)
+
+    if CASCADE_GATES:
+        tables = (val_table, train_table)
+        gates_fired = sum(table.metric_sum("cascade_gate_fired") for table in tables)
+        judge_calls_saved = sum(table.metric_sum("judge_calls_skipped") for table in tables)
+        print(
+            f"Scoring cascade: gates fired on {gates_fired:.0f}/{len(val_table) + len(train_table)} trajectories, "
+            f"{judge_calls_saved:.0f} judge calls saved"
+        )
+        await model.log(
+            metrics={"cascade_gates_fired": gates_fired, "cascade_judge_calls_saved": judge_calls_saved},
+            split="train",
+        )
+
+    if sampler:
+        # Zero-variance groups too: they mark contexts that are solved (or hopeless)
+        sampler.update(train_groups)
+        await model.log(metrics=sampler.step_metrics(), split="train")
+
+    # Skip groups without learning signal, backfilling from the extra contexts
+    train_groups, skipped_groups = filter_degenerate_groups(
+        train_groups, min_std=MIN_GROUP_REWARD_STD
+    )
+    fresh_groups = train_groups
+    train_groups = train_groups[: batch_size - replay_count]
+    replay_groups = []
+    if replay:
+        # Also fills the places of fresh groups that were skipped
+        replay_groups = replay.sample(batch_size - len(train_groups), current_step)
+        train_groups = train_groups + replay_groups
+    effective_tokens = sum(
+        trajectory_tokens(trajectory)
+        for group in train_groups
+        for trajectory in group
+    )
+    print(
+        f"Training on {len(train_groups)} groups ({len(replay_groups)} replayed, "
+        f"{len(skipped_groups)} zero-variance groups skipped), {effective_tokens} tokens"
+    )
+    await model.log(
+        metrics={
+            "skipped_groups": len(skipped_groups),
+            "effective_tokens": effective_tokens,
+            **(replay.step_metrics() if replay else {}),
+        },
+        split="train",
+    )
+
+    # Calculate validation score (average reward across validation set)
+    current_val_score = val_table.mean_reward()
+    improved = current_val_score > best_val_score
+    if validator:
+        current_val_score = val_stats["score"]
+        improved = val_stats["improved"]
+        print(
+            f"Sequential validation: {val_stats['contexts']}/{len(val_contexts)} contexts, "
+            f"score {current_val_score:.3f} in [{val_stats['ci_low']:.3f}, {val_stats['ci_high']:.3f}], "
+            f"{'above' if val_stats['improved'] else 'not above'} best {best_val_score:.3f}"
+        )
+        await model.log(
+            metrics={
+                "val_contexts": val_stats["contexts"],
+                "val_contexts_saved": val_stats["contexts_saved"],
+            },
+            split="train",
+        )
+
+    await model.log(val_groups)
+    # Per-language and per-criterion breakdowns
+    await model.log(metrics=val_table.slice_metrics(), split="val")
+    await model.log(metrics=train_table.slice_metrics(), split="train")
+
+    for name, stats in get_judge_stats().items():
+        print(
+            f"Judge {name}: {stats['requests']} requests, {stats['errors']} errors, "
+            f"p50 {stats['latency_p50']:.2f}s, p99 {stats['latency_p99']:.2f}s"
+        )
+    hedge_stats = get_judge_hedge_stats()
+    if hedge_stats["hedges"]:
+        print(
+            f"Judge hedging: p99 {hedge_stats['latency_p99']:.2f}s "
+            f"(unhedged attempts {hedge_stats['attempt_latency_p99']:.2f}s), "
+            f"extra cost {hedge_stats['extra_cost_ratio']:.1%}"
+        )
+
+    usage_metrics = usage_tracker.step_metrics()
+    judge_costs = {c: e["cost"] for c, e in usage_tracker.step.items() if c != "policy"}
+    if judge_costs:
+        top = max(judge_costs, key=judge_costs.get)
+        print(
+            f"💰 Step cost ${usage_metrics['usage/total_cost']:.4f} "
+            f"(judge ${usage_metrics['usage/judge_cost']:.4f}, most expensive: {top} ${judge_costs[top]:.4f}), "
+            f"run total ${usage_metrics['usage/run_cost']:.2f}"
+        )
+    if budget_guard.over_budget():
+        print(f"💸 Hourly judge budget reached, scoring is {'degraded' if budget_guard.action == 'degrade' else 'paused'}")
+    await model.log(metrics=usage_metrics, split="train")
+    usage_tracker.reset_step()
+
+    if checkpoints:
+        await checkpoints.record_current(current_val_score)
+        # The last prune ran next to this step's rollouts; it must be done before
+        # training writes the next checkpoint
+        await checkpoints.wait()
+
+    # Train on the batch
+    if train_groups:
+        await model.train(
+            train_groups,
+            config=art.TrainConfig(learning_rate=5e-5),
+        )
+    else:
+        print("No groups with reward variance in this batch, skipping training")
+
+    if replay:
+        # Added after training, so a group is never replayed in its own step
+        replay.add(fresh_groups, current_step)
+
+    if checkpoints:
+        checkpoints.prune(latest=await model.get_step())
+        await model.log(metrics=checkpoints.step_metrics(), split="train")
+
+    # Peak client memory so far; the step's groups are all alive during train
+    peak_rss = peak_rss_mb()
+    print(f"🧠 Peak client RSS {peak_rss:.0f} MB")
+    await model.log(metrics={"memory/peak_rss_mb": peak_rss}, split="train")
+
+    return current_val_score, improved
+
 
 async def main():
+    # Imported here so train_step can be reused (e.g. by benchmarks) without SkyPilot
+    #from art.local import LocalBackend
+    from art.skypilot import SkyPilotBackend
+
     print("🚀 Starting ART training...")
     print("Loading documents from S3...")
     val_contexts, train_contexts = load_documents()
     print(f"Loaded {len(train_contexts)} training contexts, {len(val_contexts)} validation contexts")
+    # The reward definition depends on these, so keep them in the run's log
+    print(
+        f"Scoring with {REWARD_BACKEND}: context inclusion by {SKILL_MATCHING}, "
+        f"skill completeness by {SKILL_COMPLETENESS}"
+    )
+    set_skill_vocabulary(val_contexts + train_contexts)
 
     backend = await SkyPilotBackend.initialize_cluster(
         cluster_name=CLUSTER_NAME,
@@ -67,22 +324,87 @@ async def main():
 
     start_step = await model.get_step()
     max_steps = 1000
-    
+
+    # Resume the epoch, batch cursor, RNG and best score of an interrupted run
+    run_state = RunState.load(RUN_STATE_PATH, model=AGENT_NAME)
+    if run_state:
+        print(
+            f"♻️ Resuming at epoch {run_state.epoch + 1}, batch {run_state.batch + 1} "
+            f"(best validation score {run_state.best_val_score:.3f})"
+        )
+        if run_state.judge_cache_snapshot not in (None, essential_skills.snapshot_id()):
+            print("⚠️ Essential skills changed since the run state was saved, rewards may shift")
+    else:
+        run_state = RunState.new(model=AGENT_NAME, start_step=start_step)
+    rng = run_state.rng()
+
     # Tracking for validation-based saving
-    best_val_score = 0.0
+    best_val_score = run_state.best_val_score
+    # Sample training contexts by learning progress instead of walking the shuffled list
+    sampler = ContextSampler(train_contexts) if PRIORITIZED_SAMPLING else None
+    # Stop validating once the save decision is clear
+    validator = SequentialValidator.from_env() if SEQUENTIAL_VALIDATION else None
+    # Replay part of each batch from recent groups with learning signal
+    replay = ReplayBuffer.from_env() if REPLAY_FRACTION > 0 else None
+    if sampler and run_state.sampler_state:
+        print(f"♻️ Restored sampling statistics of {sampler.load_state_dict(run_state.sampler_state)} contexts")
+    if replay and run_state.replay_state:
+        print(f"♻️ Restored {replay.load_state_dict(run_state.replay_state)} replay groups")
+    # Keep the best checkpoints by validation score and the latest one
+    checkpoints = CheckpointRetention.from_env(model)
+    checkpoints.load_history()
+
+    # Bound step time: cancel rollouts that are still running after the deadline
+    straggler_policy = StragglerPolicy.from_env()
+    # Start each training context with a few rollouts, expand to 10 if rewards disagree
+    adaptive_policy = AdaptiveRolloutPolicy.from_env(max_rollouts=10)
+
+    # Optionally shard rollouts across processes, each with its own event loop and judge client
+    worker_pool = None
+    if ROLLOUT_WORKERS:
+        print(f"🔄 Starting {ROLLOUT_WORKERS} rollout worker processes...")
+        worker_pool = await RolloutWorkerPool(
+            worker_model_kwargs(model),
+            ROLLOUT_WORKERS,
+            initializer=set_skill_vocabulary,
+            initargs=(val_contexts + train_contexts,),
+        ).start()
+        print("✓ Rollout workers ready")
 
-    for epoch in range(num_epochs):
+    # Or hand rollouts to worker hosts through a work queue served by this process
+    fleet = queue_server = None
+    if ROLLOUT_FLEET_PORT:
+        fleet_queue = InMemoryQueue()
+        queue_server = QueueServer(
+            fleet_queue,
+            setup={
+                # Workers bring their own inference API key (ROLLOUT_INFERENCE_API_KEY)
+                "model": {k: v for k, v in worker_model_kwargs(model).items() if k != "inference_api_key"},
+                "contexts": [c.model_dump() for c in val_contexts + train_contexts],
+            },
+            port=int(ROLLOUT_FLEET_PORT),
+        )
+        url = await queue_server.start()
+        fleet = RolloutFleet(fleet_queue)
+        print(f"🌐 Serving rollout work on {url}")
+        print(f"   Start workers with: python src/summarizer/rollout_fleet.py --coordinator {url}")
+    rollout_fn = fleet.rollout if fleet else worker_pool.rollout if worker_pool else None
+
+    # Watch for synchronous work that stalls the event loop (see loop_monitor.py)
+    loop_monitor = LoopLagMonitor.from_env().start() if LOOP_MONITOR else None
+
+    for epoch in range(run_state.epoch, num_epochs):
         print(f"Starting epoch {epoch + 1}/{num_epochs}")
-        # Shuffle training data at the beginning of each epoch
-        random.shuffle(train_contexts)
+        # Shuffle training data at the beginning of each epoch (the same way on resume)
+        epoch_contexts = run_state.epoch_order(train_contexts, epoch)
 
         # Calculate how many batches we can process in this epoch
         num_batches = min(
-            len(train_contexts) // batch_size, (max_steps - start_step) // num_epochs
+            len(epoch_contexts) // batch_size, (max_steps - run_state.start_step) // num_epochs
         )
 
-        for batch in range(num_batches):
-            current_step = start_step + epoch * num_batches + batch
+        for batch in range(run_state.first_batch(epoch), num_batches):
+            current_step = run_state.start_step + epoch * num_batches + batch
             if current_step >= max_steps:
                 break
 
@@ -90,56 +412,50 @@ async def main():
                 f"Epoch {epoch + 1}, Batch {batch + 1}/{num_batches}, Step {current_step}"
             )
 
-            batch_start_idx = batch * batch_size
-            batch_end_idx = (batch + 1) * batch_size
-
-            val_groups, train_groups = await asyncio.gather(
-                art.gather_trajectory_groups(
-                    (
-                        art.TrajectoryGroup(
-                            rollout(
-                                model,
-                                JobOfferScenario(context=context, step=current_step),
-                            )
-                            for _ in range(2)
-                        )
-                        for context in val_contexts
-                    ),
-                    pbar_desc=f"gather val (epoch {epoch + 1})",
-                ),
-                art.gather_trajectory_groups(
-                    (
-                        art.TrajectoryGroup(
-                            rollout(model, JobOfferScenario(context=context))
-                            for _ in range(10)
-                        )
-                        for context in train_contexts[batch_start_idx:batch_end_idx]
-                    ),
-                    pbar_desc=f"gather train (epoch {epoch + 1}, batch {batch + 1})",
-                ),
-            )
+            if sampler:
+                # Contexts whose reward is still moving or uncertain, backfill included
+                step_contexts = sampler.sample(batch_size + OVERSAMPLE_CONTEXTS, rng)
+            else:
+                batch_start_idx = batch * batch_size
+                batch_end_idx = (batch + 1) * batch_size
+                batch_contexts = epoch_contexts[batch_start_idx:batch_end_idx]
+                other_contexts = epoch_contexts[:batch_start_idx] + epoch_contexts[batch_end_idx:]
+                backfill_contexts = rng.sample(
+                    other_contexts, min(OVERSAMPLE_CONTEXTS, len(other_contexts))
+                )
+                step_contexts = batch_contexts + backfill_contexts
 
-            # Calculate validation score (average reward across validation set)
-            val_rewards = []
-            for group in val_groups:
-                for trajectory in group:
-                    val_rewards.append(trajectory.reward)
-            
-            current_val_score = sum(val_rewards) / len(val_rewards) if val_rewards else 0
-            
-            print(f"Validation score: {current_val_score:.3f} (Best: {best_val_score:.3f})")
-            
-            await model.log(val_groups)
-            await model.delete_checkpoints()
-            
-            # Train on the batch
-            await model.train(
-                train_groups,
-                config=art.TrainConfig(learning_rate=5e-5),
+            current_val_score, improved = await train_step(
+                model,
+                val_contexts,
+                step_contexts,
+                batch_size=batch_size,
+                current_step=current_step,
+                straggler_policy=straggler_policy,
+                adaptive_policy=adaptive_policy,
+                pbar_suffix=f"epoch {epoch + 1}, batch {batch + 1}",
+                rollout_fn=rollout_fn,
+                checkpoints=checkpoints,
+                replay=replay,
+                sampler=sampler,
+                validator=validator,
+                best_val_score=best_val_score,
             )
-            
+            print(f"Validation score: {current_val_score:.3f} (Best: {best_val_score:.3f})")
+
+            if loop_monitor:
+                loop_metrics = loop_monitor.step_metrics()
+                print(
+                    f"⏱️ Event loop lag: p99 {loop_metrics['loop/lag_p99_ms']:.1f}ms, "
+                    f"max {loop_metrics['loop/lag_max_ms']:.1f}ms, {loop_metrics['loop/slow_callbacks']} slow callbacks"
+                )
+                loop_monitor.report_slow_callbacks()
+                await model.log(metrics=loop_metrics, split="train")
+                loop_monitor.reset()
+
             # Only save to S3 if validation improved
-            if current_val_score > best_val_score:
+            if improved:
+                # Not an early-stopped estimate: a step that beats the best is validated to the end
                 best_val_score = current_val_score
                 print(f"🎉 New best model! Score: {current_val_score:.3f}")
                 print(f"Pushing model weights to S3...")
@@ -147,14 +463,36 @@ async def main():
                 print(f"Model weights saved to S3 successfully")
             else:
                 print(f"No improvement. Current: {current_val_score:.3f}, Best: {best_val_score:.3f}")
+
+            run_state.advance(
+                epoch,
+                batch,
+                rng,
+                best_val_score,
+                essential_skills.snapshot_id(),
+                sampler_state=sampler.state_dict() if sampler else None,
+                replay_state=replay.state_dict() if replay else None,
+            )
+            run_state.save(RUN_STATE_PATH)
     
+    await checkpoints.wait()
+    if loop_monitor:
+        loop_monitor.stop()
+    if worker_pool:
+        await worker_pool.close()
+    if fleet:
+        await fleet.close()
+        await queue_server.stop()
+
     # Training complete summary
     print("\n" + "="*50)
     print("🏁 TRAINING COMPLETE")
     print(f"Final best validation score: {best_val_score:.3f}")
     print(f"Best model saved to S3: job-offer-generation/{AGENT_NAME}")
+    print(f"Best local checkpoint: step {checkpoints.best_step}, kept steps {checkpoints.kept}")
     print("="*50)
 
 
 if __name__ == "__main__":
+    install_event_loop()
     asyncio.run(main())
@@ -0,0 +1,177 @@
+"""Token and cost accounting for judge and policy calls, plus an hourly budget guard.
+
+Every judge completion is recorded under the criterion it scored, and every
+policy completion under "policy". Counters are kept per step (reset by
+train_step after logging them) and per run.
+
+With BUDGET_JUDGE_TOKENS_PER_HOUR or BUDGET_USD_PER_HOUR set, the guard
+watches a rolling one-hour window. Once a ceiling is reached it either
+degrades scoring to local modes (BUDGET_ACTION=degrade) or holds new judge
+calls until the window has room again (BUDGET_ACTION=pause).
+"""
+
+import asyncio
+import os
+import time
+from collections import defaultdict, deque
+from typing import Dict, Optional
+
+# USD per 1M tokens (input, output); defaults to gpt-4o list prices for the judge
+# and zero for the self-hosted policy
+JUDGE_PRICES = (
+    float(os.getenv("JUDGE_INPUT_PRICE", "2.50")),
+    float(os.getenv("JUDGE_OUTPUT_PRICE", "10.00")),
+)
+POLICY_PRICES = (
+    float(os.getenv("POLICY_INPUT_PRICE", "0")),
+    float(os.getenv("POLICY_OUTPUT_PRICE", "0")),
+)
+
+BUDGET_JUDGE_TOKENS_PER_HOUR = os.getenv("BUDGET_JUDGE_TOKENS_PER_HOUR")
+BUDGET_USD_PER_HOUR = os.getenv("BUDGET_USD_PER_HOUR")
+BUDGET_ACTION = os.getenv("BUDGET_ACTION", "degrade")
+
+
+class UsageTracker:
+    """Per-step and per-run token and cost counters, keyed by criterion."""
+
+    def __init__(self):
+        self.step = self._empty()
+        self.run = self._empty()
+
+    @staticmethod
+    def _empty() -> Dict[str, Dict[str, float]]:
+        return defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0})
+
+    def record(self, criterion: str, prompt_tokens: int, completion_tokens: int, policy: bool = False) -> float:
+        """Add one completion's usage and return its cost in USD."""
+        input_price, output_price = POLICY_PRICES if policy else JUDGE_PRICES
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+        for counters in (self.step, self.run):
+            entry = counters[criterion]
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["cost"] += cost
+        if not policy:
+            budget_guard.add(prompt_tokens + completion_tokens, cost)
+        return cost
+
+    def record_completion(self, criterion: str, completion, policy: bool = False) -> float:
+        """Record an OpenAI-style completion's usage, if it reports any."""
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return 0.0
+        return self.record(criterion, usage.prompt_tokens or 0, usage.completion_tokens or 0, policy=policy)
+
+    def record_cancelled(self, criterion: str, completion) -> float:
+        """Record a request cancelled after it was sent, e.g. a losing hedge.
+
+        The endpoint has already read its prompt, the same one as
+        `completion`'s, so it is billed for those tokens at least.
+        """
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return 0.0
+        return self.record(criterion, usage.prompt_tokens or 0, 0)
+
+    def merge(self, counters: Dict[str, Dict[str, float]]) -> None:
+        """Add counters recorded elsewhere, e.g. the `step` of a rollout worker process."""
+        for criterion, entry in counters.items():
+            for totals in (self.step, self.run):
+                for key, value in entry.items():
+                    totals[criterion][key] += value
+
+    def take_step(self) -> Dict[str, Dict[str, float]]:
+        """The step counters as plain dicts, then reset them (for a worker to send to the trainer)."""
+        step = {criterion: dict(entry) for criterion, entry in self.step.items()}
+        self.reset_step()
+        return step
+
+    def step_metrics(self) -> Dict[str, float]:
+        """Flat metrics for model.log, e.g. usage/skill_relevance/prompt_tokens."""
+        metrics = {}
+        for criterion, entry in self.step.items():
+            for key, value in entry.items():
+                metrics[f"usage/{criterion}/{key}"] = value
+        metrics["usage/judge_cost"] = sum(e["cost"] for c, e in self.step.items() if c != "policy")
+        metrics["usage/total_cost"] = sum(e["cost"] for e in self.step.values())
+        metrics["usage/run_cost"] = sum(e["cost"] for e in self.run.values())
+        return metrics
+
+    def reset_step(self) -> None:
+        self.step = self._empty()
+
+
+class BudgetGuard:
+    """Rolling one-hour window of judge tokens and cost."""
+
+    def __init__(
+        self,
+        tokens_per_hour: Optional[float] = None,
+        usd_per_hour: Optional[float] = None,
+        action: str = "degrade",
+        window: float = 3600.0,
+    ):
+        for name, ceiling in (("tokens_per_hour", tokens_per_hour), ("usd_per_hour", usd_per_hour)):
+            if ceiling is not None and ceiling <= 0:
+                raise ValueError(f"Budget {name} must be positive, got {ceiling} (unset it to disable the guard)")
+        self.tokens_per_hour = tokens_per_hour
+        self.usd_per_hour = usd_per_hour
+        self.action = action
+        self.window = window
+        self.events = deque()  # (timestamp, tokens, cost)
+        self.tokens = 0
+        self.cost = 0.0
+        self.paused = False
+
+    @classmethod
+    def from_env(cls) -> "BudgetGuard":
+        return cls(
+            tokens_per_hour=float(BUDGET_JUDGE_TOKENS_PER_HOUR) if BUDGET_JUDGE_TOKENS_PER_HOUR else None,
+            usd_per_hour=float(BUDGET_USD_PER_HOUR) if BUDGET_USD_PER_HOUR else None,
+            action=BUDGET_ACTION,
+        )
+
+    def add(self, tokens: int, cost: float) -> None:
+        if self.tokens_per_hour is None and self.usd_per_hour is None:
+            return
+        self.events.append((time.monotonic(), tokens, cost))
+        self.tokens += tokens
+        self.cost += cost
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.window
+        while self.events and self.events[0][0] < cutoff:
+            _, tokens, cost = self.events.popleft()
+            self.tokens -= tokens
+            self.cost -= cost
+        if not self.events:
+            # No float drift left behind once the window is empty
+            self.tokens, self.cost = 0, 0.0
+
+    def over_budget(self) -> bool:
+        self._expire()
+        return (self.tokens_per_hour is not None and self.tokens >= self.tokens_per_hour) or (
+            self.usd_per_hour is not None and self.cost >= self.usd_per_hour
+        )
+
+    def degraded(self) -> bool:
+        """Whether scoring should switch to its cheaper local modes."""
+        return self.action == "degrade" and self.over_budget()
+
+    async def wait(self) -> None:
+        """In pause mode, hold a judge call until the window has room again."""
+        if self.action != "pause" or not self.over_budget():
+            return
+        if not self.paused:
+            self.paused = True
+            print(f"💸 Judge budget reached ({self.tokens} tokens, ${self.cost:.2f} in the last hour), pausing judge calls")
+        # Without events the window cannot drain any further
+        while self.over_budget() and self.events:
+            await asyncio.sleep(max(min(self.events[0][0] + self.window - time.monotonic(), 60.0), 0.1))
+        self.paused = False
+
+
+budget_guard = BudgetGuard.from_env()
+usage_tracker = UsageTracker()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test file for checkpoint retention
+Uses a fake model whose backend records which checkpoints it was told to keep
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+sys.path.append('src/summarizer')
+
+from checkpoint_retention import CheckpointRetention
+
+
+class FakeModel:
+    def __init__(self, output_dir=None, delete_seconds=0.0, fail=False):
+        self.output_dir = output_dir
+        self.delete_seconds = delete_seconds
+        self.fail = fail
+        self.checkpoints = set(range(6))
+        self.step = 5
+
+    async def get_step(self):
+        return self.step
+
+    async def train(self):
+        self.step += 1
+        self.checkpoints.add(self.step)
+
+    def backend(self):
+        return self
+
+    def _get_output_dir(self):
+        return self.output_dir
+
+    async def _delete_checkpoint_files(self, model, steps_to_keep):
+        await asyncio.sleep(self.delete_seconds)
+        if self.fail:
+            raise OSError("disk unavailable")
+        self.checkpoints &= set(steps_to_keep)
+
+
+def test_keeps_best_and_latest():
+    """The best K steps by validation score and the latest step are kept"""
+    print("Testing retained steps...")
+    retention = CheckpointRetention(FakeModel(), keep_best=2)
+    for step, score in enumerate([5.0, 7.0, 6.0, 4.0, 7.5]):
+        retention.record(step, score)
+    assert retention.steps_to_keep(latest=5) == [1, 4, 5]
+    assert retention.best_step == 4
+    print("✓ Best 2 and latest kept")
+
+
+def test_scores_follow_the_model_step():
+    """A step that skips training scores the same checkpoint again, not a new one"""
+    print("Testing scores after a skipped training step...")
+
+    async def run():
+        model = FakeModel()
+        retention = CheckpointRetention(model, keep_best=1)
+        recorded = []
+        # The loop counter says 5, 6, 7 but the middle step had nothing to train on
+        for score, trains in [(6.0, True), (9.0, False), (7.0, True)]:
+            recorded.append(await retention.record_current(score))
+            if trains:
+                await model.train()
+        retention.prune(latest=await model.get_step())
+        await retention.wait()
+        return model, retention, recorded
+
+    model, retention, recorded = asyncio.run(run())
+    print(f"   recorded at steps {recorded}, scores {retention.scores}")
+    assert recorded == [5, 6, 6]
+    assert retention.scores == {5: 6.0, 6: 7.0}
+    # The latest validation of checkpoint 6 decides; step 7 exists and is kept as latest
+    assert retention.best_step == 6
+    assert model.checkpoints == {6, 7}
+    print("✓ Scores follow the model step")
+
+
+def test_prunes_in_background():
+    """prune() returns at once; wait() returns once the files are gone"""
+    print("Testing background pruning...")
+
+    async def run():
+        model = FakeModel(delete_seconds=0.05)
+        retention = CheckpointRetention(model, keep_best=1)
+        retention.record(2, 8.0)
+        retention.prune(latest=5)
+        assert model.checkpoints == set(range(6))
+        retention.prune(latest=5)  # Coalesced with the running prune
+        await retention.wait()
+        return model, retention
+
+    model, retention = asyncio.run(run())
+    assert model.checkpoints == {2, 5}
+    assert retention.prunes == 1 and retention.kept == [2, 5]
+    print("✓ Pruned in the background")
+
+
+def test_failed_prune_is_not_fatal():
+    """A failing backend keeps every checkpoint and does not stop training"""
+    print("Testing failed prune...")
+
+    async def run():
+        model = FakeModel(fail=True)
+        retention = CheckpointRetention(model, keep_best=1)
+        retention.prune(latest=5)
+        await retention.wait()
+        return model, retention
+
+    model, retention = asyncio.run(run())
+    assert model.checkpoints == set(range(6)) and retention.prunes == 0
+    print("✓ Failed prune ignored")
+
+
+def test_load_history():
+    """Scores of earlier runs come from val/reward in history.jsonl"""
+    print("Testing history...")
+    with tempfile.TemporaryDirectory() as output_dir:
+        with open(os.path.join(output_dir, "history.jsonl"), "w") as f:
+            for entry in [
+                {"step": 1, "val/reward": 6.0},
+                {"step": 1, "val/reward": 8.0},
+                {"step": 1, "train/loss": 0.1},
+                {"step": 2, "val/reward": 5.0},
+            ]:
+                f.write(json.dumps(entry) + "\n")
+        retention = CheckpointRetention(FakeModel(output_dir), keep_best=1)
+        assert retention.load_history() == 2
+    assert retention.scores == {1: 7.0, 2: 5.0}
+    assert CheckpointRetention(FakeModel("/nonexistent")).load_history() == 0
+    print("✓ History loaded")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING CHECKPOINT RETENTION")
+    print("="*50)
+    test_keeps_best_and_latest()
+    test_scores_follow_the_model_step()
+    test_prunes_in_background()
+    test_failed_prune_is_not_fatal()
+    test_load_history()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
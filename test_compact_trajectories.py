@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test file for compact trajectory choices
+Checks that compaction keeps what ART's tokenizer reads and drops the rest
+"""
+
+import pickle
+import sys
+sys.path.append('src/summarizer')
+
+import art
+from openai.types.chat.chat_completion import Choice
+
+from compact_trajectories import compact_choice, intern_prompt, peak_rss_mb
+
+
+def vllm_choice(tokens):
+    """A Choice shaped like the ones ART's vLLM server returns"""
+    return Choice.model_validate({
+        "finish_reason": "stop",
+        "index": 0,
+        "message": {"role": "assistant", "content": "".join(tokens)},
+        "logprobs": {
+            "content": [
+                {
+                    "token": f"token_id:{i}",
+                    "logprob": -0.5,
+                    "bytes": list(token.encode()),
+                    "top_logprobs": [{"token": "token_id:99", "logprob": -2.0, "bytes": [120]}],
+                    "extra_logprobs": {"ref": [-0.25]},
+                }
+                for i, token in enumerate(tokens)
+            ]
+        },
+    })
+
+
+def test_keeps_tokenizer_fields():
+    """Content, token ids, logprobs, extra logprobs and the first token's bytes survive"""
+    print("Testing compacted fields...")
+    compact = compact_choice(vllm_choice(["<job", "_offer>", "ok"]))
+    tokens = compact.logprobs.content
+    assert compact.message.content == "<job_offer>ok"
+    assert compact.message.tool_calls is None
+    assert [t.token for t in tokens] == ["token_id:0", "token_id:1", "token_id:2"]
+    assert all(t.logprob == -0.5 for t in tokens)
+    assert all(t.model_extra["extra_logprobs"] == {"ref": [-0.25]} for t in tokens)
+    assert tokens[0].bytes == list(b"<job")
+    assert tokens[1].bytes is None and all(t.top_logprobs == [] for t in tokens)
+    print("✓ Tokenizer fields kept, bytes and top logprobs dropped")
+
+
+def test_shared_strings():
+    """Token strings and prompts are stored once"""
+    print("Testing interning...")
+    first = compact_choice(vllm_choice(["a", "b"]))
+    second = compact_choice(vllm_choice(["c", "d"]))
+    assert first.logprobs.content[1].token is second.logprobs.content[1].token
+    prompt = "".join(["Generate a ", "job offer"])
+    assert intern_prompt(prompt) is intern_prompt("".join(["Generate a ", "job ", "offer"]))
+    print("✓ Strings are shared")
+
+
+def test_trajectory_round_trip():
+    """Compact choices survive pickling in a trajectory (rollout workers and fleet)"""
+    print("Testing pickling...")
+    trajectory = art.Trajectory(
+        messages_and_choices=[{"role": "user", "content": "Generate"}],
+        reward=1.0,
+    )
+    trajectory.messages_and_choices.append(compact_choice(vllm_choice(["hi"])))
+    restored = pickle.loads(pickle.dumps(trajectory))
+    assert restored.messages()[-1]["content"] == "hi"
+    assert restored.messages_and_choices[-1].logprobs.content[0].model_extra["extra_logprobs"] == {"ref": [-0.25]}
+    assert peak_rss_mb() > 0
+    print("✓ Compact trajectories pickle")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING COMPACT TRAJECTORIES")
+    print("="*50)
+    test_keeps_tokenizer_fields()
+    test_shared_strings()
+    test_trajectory_round_trip()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test file for the prioritized context sampler
+"""
+
+import random
+import sys
+sys.path.append('src/summarizer')
+
+import art
+from context_sampler import ContextSampler, SumTree
+from load_documents import JobContext, context_id
+
+CONTEXTS = [JobContext(job_title=f"Job {i}", language="en", skills=["Python"]) for i in range(8)]
+
+
+def group(context, *rewards):
+    return art.TrajectoryGroup([
+        art.Trajectory(messages_and_choices=[], reward=r, metadata={"context_id": context_id(context)})
+        for r in rewards
+    ])
+
+
+def test_sum_tree():
+    """find() walks to the leaf covering a given cumulative mass"""
+    print("Testing sum tree...")
+    tree = SumTree(5)
+    for i, value in enumerate([1.0, 0.0, 2.0, 3.0, 4.0]):
+        tree.set(i, value)
+    assert tree.total == 10.0
+    assert [tree.find(m) for m in (0.5, 1.0, 2.9, 3.0, 5.9, 6.0, 9.99)] == [0, 2, 2, 3, 3, 4, 4]
+    tree.set(4, 0.0)
+    assert tree.total == 6.0 and tree.find(5.99) == 3
+    print("✓ Sum tree works")
+
+
+def test_sample_is_without_replacement():
+    """A batch never repeats a context, and duplicates of a context share one slot"""
+    print("Testing sampling...")
+    sampler = ContextSampler(CONTEXTS + [CONTEXTS[0].model_copy()])
+    batch = sampler.sample(20, random.Random(0))
+    assert sorted(c.job_title for c in batch) == sorted(c.job_title for c in CONTEXTS)
+    assert len(batch) == len(CONTEXTS)
+    print("✓ Distinct contexts per batch")
+
+
+def test_solved_contexts_are_deprioritized():
+    """Contexts with equal rewards are drawn far less often than uncertain ones"""
+    print("Testing priorities...")
+    sampler = ContextSampler(CONTEXTS)
+    solved = [group(c, 10.0, 10.0, 10.0) for c in CONTEXTS[:4]]
+    uncertain = [group(c, 2.0, 8.0, 5.0) for c in CONTEXTS[4:]]
+    assert sampler.update(solved + uncertain + [group(JobContext(job_title="Unknown", language="en"), 1.0)]) == 8
+    rng = random.Random(0)
+    counts = {c.job_title: 0 for c in CONTEXTS}
+    for _ in range(500):
+        counts[sampler.sample(1, rng)[0].job_title] += 1
+    solved_draws = sum(counts[c.job_title] for c in CONTEXTS[:4])
+    print(f"   Solved contexts drawn {solved_draws}/500 times")
+    assert solved_draws < 50
+    assert sampler.step_metrics()["sampler/solved_contexts"] == 4
+    print("✓ Solved contexts deprioritized")
+
+
+def test_progress_raises_priority():
+    """A context whose reward keeps moving outranks one that is stable"""
+    print("Testing learning progress...")
+    sampler = ContextSampler(CONTEXTS[:2])
+    for reward in (2.0, 4.0, 6.0):
+        sampler.update([group(CONTEXTS[0], reward, reward), group(CONTEXTS[1], 5.0, 5.0)])
+    assert sampler.priority(0) > 10 * sampler.priority(1)
+    print("✓ Improving contexts are prioritized")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING CONTEXT SAMPLER")
+    print("="*50)
+    test_sum_tree()
+    test_sample_is_without_replacement()
+    test_solved_contexts_are_deprioritized()
+    test_progress_raises_priority()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test file for the per-job-title essential skills cache
+Uses a fake fetch function instead of the judge
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+sys.path.append('src/summarizer')
+
+from essential_skills import EssentialSkill, EssentialSkillsCache, completeness_score
+
+ESSENTIALS = [
+    EssentialSkill(skill="Python", importance=1.0),
+    EssentialSkill(skill="Git", importance=1.0),
+    EssentialSkill(skill="Testing", importance=0.5),
+]
+
+
+def test_one_fetch_per_title():
+    """Concurrent rollouts of one title share a fetch, and entries persist"""
+    print("Testing essential skills cache...")
+    calls = []
+
+    async def fake_fetch(job_title, language):
+        calls.append((job_title, language))
+        await asyncio.sleep(0.05)
+        return ESSENTIALS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "essential_skills.json")
+        cache = EssentialSkillsCache(path=path, fetch=fake_fetch)
+
+        async def run():
+            return await asyncio.gather(
+                *[cache.get("Backend Developer", "en") for _ in range(10)],
+                cache.get("backend  developer", "en"),
+                cache.get("Backend Developer", "fr"),
+            )
+
+        results = asyncio.run(run())
+        assert all(r == ESSENTIALS for r in results)
+        assert calls == [("Backend Developer", "en"), ("Backend Developer", "fr")]
+
+        reloaded = EssentialSkillsCache(path=path, fetch=fake_fetch)
+        assert asyncio.run(reloaded.get("Backend Developer", "en")) == ESSENTIALS
+        assert len(calls) == 2
+    print("✓ One fetch per (job title, language)")
+
+
+def test_failed_fetch_falls_back():
+    """A failed fetch returns None and is not retried immediately"""
+    print("Testing failed fetch...")
+    calls = []
+
+    async def failing_fetch(job_title, language):
+        calls.append(job_title)
+        return None
+
+    cache = EssentialSkillsCache(path=None, fetch=failing_fetch)
+    assert asyncio.run(cache.get("Chef", "fr")) is None
+    assert asyncio.run(cache.get("Chef", "fr")) is None
+    assert len(calls) == 1
+    print("✓ Failed fetches fall back to the judge")
+
+
+def test_workers_share_the_file():
+    """Saves from several worker processes merge instead of overwriting each other"""
+    print("Testing saves from several workers...")
+
+    async def fetch(job_title, language):
+        return ESSENTIALS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "essential_skills.json")
+        trainer = EssentialSkillsCache(path=path, fetch=fetch)
+        empty = trainer.snapshot_id()
+        workers = [EssentialSkillsCache(path=path, fetch=fetch) for _ in range(2)]
+        asyncio.run(workers[0].get("Chef", "fr"))
+        asyncio.run(workers[1].get("Nurse", "en"))
+
+        assert set(EssentialSkillsCache(path=path, fetch=fetch).entries) == {"fr|chef", "en|nurse"}
+        # The trainer never fetched, but its snapshot covers the workers' entries
+        assert trainer.snapshot_id() != empty
+        assert trainer.snapshot_id() == workers[1].snapshot_id()
+    print("✓ Worker saves are merged")
+
+
+def test_completeness_score():
+    """Penalty is the summed importance of missing essentials / 10"""
+    print("Testing completeness score...")
+    result = completeness_score(ESSENTIALS, ["Python Programming", "Unit Testing", "Docker"])
+    print(f"   {result}")
+    assert [m["skill"] for m in result["missing_essentials"]] == ["Git"]
+    assert abs(result["final_score"] - 0.9) < 1e-9
+    assert completeness_score(ESSENTIALS, [])["final_score"] == 0.75
+    print("✓ Completeness score works")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING ESSENTIAL SKILLS")
+    print("="*50)
+    test_one_fetch_per_title()
+    test_failed_fetch_falls_back()
+    test_workers_share_the_file()
+    test_completeness_score()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test file for skipping zero-variance groups and backfilling the batch
+Uses fake rollouts with known rewards and a fake model, so no policy or judge is needed
+"""
+
+import asyncio
+import sys
+sys.path.append('src/summarizer')
+
+import art
+from adaptive_sampler import AdaptiveRolloutPolicy
+from group_filter import filter_degenerate_groups, reward_std
+from load_documents import JobContext
+from straggler import StragglerPolicy
+from train import train_step
+
+SOLVED = [JobContext(job_title=f"Solved {i}", language="en", skills=[]) for i in range(3)]
+LEARNING = [JobContext(job_title=f"Learning {i}", language="en", skills=[]) for i in range(3)]
+
+
+def group(*rewards):
+    return art.TrajectoryGroup([art.Trajectory(messages_and_choices=[], reward=r) for r in rewards])
+
+
+class FakeModel:
+    """Records the groups it is trained on; logging is a no-op."""
+
+    def __init__(self):
+        self.trained = []
+
+    async def log(self, trajectories=None, split="val", *, metrics=None, step=None):
+        pass
+
+    async def train(self, trajectory_groups, config=None):
+        self.trained.append(trajectory_groups)
+
+    async def get_step(self):
+        return len(self.trained)
+
+
+counts = {}
+
+
+async def fake_rollout(scenario):
+    """Solved contexts always get the same reward, the others alternate"""
+    title = scenario.context.job_title
+    counts[title] = counts.get(title, 0) + 1
+    reward = 10.0 if title.startswith("Solved") else float(counts[title] % 2)
+    return art.Trajectory(messages_and_choices=[], reward=reward, metadata={"context": title})
+
+
+def run_step(step_contexts, batch_size):
+    counts.clear()
+    model = FakeModel()
+    asyncio.run(
+        train_step(
+            model,
+            SOLVED[:1],
+            step_contexts,
+            batch_size=batch_size,
+            current_step=0,
+            straggler_policy=StragglerPolicy(),
+            adaptive_policy=AdaptiveRolloutPolicy(initial_rollouts=4, max_rollouts=4),
+            rollout_fn=fake_rollout,
+        )
+    )
+    return [[g.trajectories[0].metadata["context"] for g in groups] for groups in model.trained]
+
+
+def test_zero_variance_groups_dropped():
+    """Groups whose rewards are all equal are skipped, in order"""
+    print("Testing zero-variance filter...")
+    solved, learning, single = group(10.0, 10.0, 10.0), group(0.0, 1.0, 1.0), group(5.0)
+    kept, skipped = filter_degenerate_groups([solved, learning, single])
+    assert kept == [learning]
+    assert skipped == [solved, single]
+    assert reward_std(single) == 0.0
+    assert abs(reward_std(group(0.0, 2.0)) - 1.0) < 1e-9
+    # A threshold above the group's spread skips it too
+    assert filter_degenerate_groups([learning], min_std=0.5) == ([], [learning])
+    print("✓ Zero-variance groups are dropped")
+
+
+def test_backfill_replaces_skipped_groups():
+    """Extra contexts take the places of skipped groups, up to the batch size"""
+    print("Testing backfill...")
+    trained = run_step([SOLVED[0], LEARNING[0], SOLVED[1], LEARNING[1], LEARNING[2]], batch_size=2)
+    print(f"   trained on {trained}")
+    # The second backfill context is not needed
+    assert trained == [["Learning 0", "Learning 1"]]
+    print("✓ Skipped groups are backfilled")
+
+
+def test_backfill_exhausted():
+    """Without enough contexts with signal, the step trains on a smaller batch"""
+    print("Testing backfill exhaustion...")
+    trained = run_step([SOLVED[0], LEARNING[0], SOLVED[1], SOLVED[2]], batch_size=2)
+    print(f"   trained on {trained}")
+    assert trained == [["Learning 0"]]
+    # Nothing to train on at all: training is skipped
+    assert run_step(SOLVED, batch_size=2) == []
+    print("✓ Exhausted backfill trains on fewer groups")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING GROUP FILTER")
+    print("="*50)
+    test_zero_variance_groups_dropped()
+    test_backfill_replaces_skipped_groups()
+    test_backfill_exhausted()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
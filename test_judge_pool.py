@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test file for the multi-endpoint judge pool
+Uses local mock endpoints instead of Azure deployments
+"""
+
+import asyncio
+import random
+import sys
+from types import SimpleNamespace
+sys.path.append('src/summarizer')
+
+import judge_pool
+from judge_pool import JudgeEndpoint, JudgePool
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock jumps straight to the next timer instead of sleeping.
+
+    Latencies measured on it depend only on the mock delays, never on how
+    busy the machine running the tests is.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+        select = self._selector.select
+
+        def fast_forward(timeout=None):
+            if timeout:
+                self.now += timeout
+            return select(0)
+
+        self._selector.select = fast_forward
+
+    def time(self):
+        return self.now
+
+
+def run_virtual(coro):
+    """Run `coro` on a VirtualClockLoop, with judge_pool reading the same clock."""
+    loop = VirtualClockLoop()
+    real_time = judge_pool.time
+    judge_pool.time = SimpleNamespace(monotonic=loop.time)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        judge_pool.time = real_time
+        loop.close()
+
+
+class MockJudgeClient:
+    """Mimics AsyncAzureOpenAI.chat.completions with a fixed quota and latency"""
+
+    def __init__(self, latency=0.02, capacity=5, fail=False):
+        self.latency = latency
+        self.quota = asyncio.Semaphore(capacity)
+        self.fail = fail
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, model, temperature, max_tokens, timeout):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("503 Service Unavailable")
+        async with self.quota:
+            await asyncio.sleep(self.latency)
+        message = SimpleNamespace(content='{"answer": "YES"}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class TailLatencyClient(MockJudgeClient):
+    """Mostly fast, but every 20th call stalls for a long time"""
+
+    async def create(self, messages, model, temperature, max_tokens, timeout):
+        self.calls += 1
+        await asyncio.sleep(0.5 if self.calls % 20 == 0 else 0.01 + 0.001 * (self.calls % 5))
+        message = SimpleNamespace(content='{"answer": "YES"}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_pool(clients):
+    return JudgePool([
+        JudgeEndpoint(name=f"mock-{i}", client=client, deployment="mock", max_concurrency=50)
+        for i, client in enumerate(clients)
+    ])
+
+
+async def run_requests(pool, n):
+    async def one():
+        endpoint = pool.pick()
+        await endpoint.complete([{"role": "user", "content": "hi"}], 0.0, 10, 10)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*[one() for _ in range(n)])
+    return n / (loop.time() - start)
+
+
+def test_throughput_scales_with_endpoints():
+    """Throughput should scale roughly linearly with the number of deployments"""
+    print("Testing throughput scaling...")
+    single = run_virtual(run_requests(make_pool([MockJudgeClient()]), 200))
+    quad = run_virtual(run_requests(make_pool([MockJudgeClient() for _ in range(4)]), 200))
+    print(f"   1 endpoint: {single:.0f} req/s, 4 endpoints: {quad:.0f} req/s")
+    assert quad / single > 3.9, f"Expected 4x scaling, got {quad / single:.2f}x"
+    print("✓ Throughput scales with endpoints")
+
+
+def test_least_outstanding_respects_weights():
+    """A weight-3 endpoint should receive about 3x the traffic of a weight-1 endpoint"""
+    print("Testing weighted routing...")
+    heavy, light = MockJudgeClient(capacity=50), MockJudgeClient(capacity=50)
+    pool = JudgePool([
+        JudgeEndpoint(name="heavy", client=heavy, deployment="mock", weight=3),
+        JudgeEndpoint(name="light", client=light, deployment="mock", weight=1),
+    ])
+    random.seed(0)
+    run_virtual(run_requests(pool, 400))
+    ratio = heavy.calls / light.calls
+    print(f"   heavy: {heavy.calls}, light: {light.calls}")
+    assert 2.0 < ratio < 4.5, f"Unexpected routing ratio {ratio:.2f}"
+    print("✓ Weighted routing works")
+
+
+def test_failover_and_stats():
+    """A failing endpoint is marked unhealthy and traffic moves elsewhere"""
+    print("Testing failover...")
+    broken, healthy = MockJudgeClient(fail=True), MockJudgeClient()
+    pool = JudgePool([
+        JudgeEndpoint(name="broken", client=broken, deployment="mock"),
+        JudgeEndpoint(name="healthy", client=healthy, deployment="mock"),
+    ])
+
+    async def with_failover():
+        tried = set()
+        while True:
+            endpoint = pool.pick(exclude=tried)
+            try:
+                return await endpoint.complete([{"role": "user", "content": "hi"}], 0.0, 10, 10)
+            except RuntimeError:
+                tried.add(endpoint.name)
+
+    async def main():
+        await asyncio.gather(*[with_failover() for _ in range(50)])
+
+    asyncio.run(main())
+    stats = pool.stats()
+    print(f"   stats: {stats}")
+    assert stats["healthy"]["requests"] == 50
+    assert stats["healthy"]["errors"] == 0
+    assert stats["broken"]["errors"] >= 1
+    assert not stats["broken"]["healthy"]
+    print("✓ Failover and stats work")
+
+
+def test_hedging_cuts_tail_latency():
+    """Hedged requests should cut p99 while staying within the hedge budget"""
+    print("Testing hedged requests...")
+    random.seed(0)
+
+    async def run(pool):
+        semaphore = asyncio.Semaphore(20)
+
+        async def one():
+            async with semaphore:
+                await pool.complete([{"role": "user", "content": "hi"}], 0.0, 10, 10)
+
+        await asyncio.gather(*[one() for _ in range(1500)])
+        return pool.hedge_stats()
+
+    clients = [TailLatencyClient(), TailLatencyClient()]
+    unhedged = run_virtual(run(make_pool(clients)))
+    hedged_pool = make_pool([TailLatencyClient(), TailLatencyClient()])
+    hedged_pool.hedge_percentile = 90
+    hedged_pool.hedge_budget = 0.15
+    hedged_pool.hedge_min_samples = 20
+    hedged = run_virtual(run(hedged_pool))
+    print(f"   p99 unhedged: {unhedged['latency_p99']:.3f}s, hedged: {hedged['latency_p99']:.3f}s")
+    print(f"   extra cost ratio: {hedged['extra_cost_ratio']:.2%}, hedge wins: {hedged['hedge_wins']}")
+    assert hedged["latency_p99"] < unhedged["latency_p99"] / 2
+    assert hedged["extra_cost_ratio"] <= 0.15
+    print("✓ Hedging cuts tail latency")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING JUDGE POOL")
+    print("="*50)
+    test_throughput_scales_with_endpoints()
+    test_least_outstanding_respects_weights()
+    test_failover_and_stats()
+    test_hedging_cuts_tail_latency()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
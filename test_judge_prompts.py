@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test file for section-aware judge prompts
+"""
+
+import sys
+sys.path.append('src/summarizer')
+
+from judge_prompts import build_prompt, count_tokens, offer_view, parse_verdict
+from load_documents import JobContext
+from offer_parser import parse_offer
+
+CONTEXT = JobContext(job_title="Data Scientist", language="en", skills=["Python", "SQL"])
+OFFER = """<job_offer>
+<title>Data Scientist</title>
+<overview>
+    We are looking for a Data Scientist to turn our data into decisions.
+</overview>
+<responsibilities>
+<item>Develop predictive models</item>
+<item>Collaborate with product teams</item>
+</responsibilities>
+<skills>
+<item>Python</item>
+<item>SQL</item>
+</skills>
+<nice_to_have>
+<item>Spark</item>
+</nice_to_have>
+</job_offer>"""
+
+
+def test_sliced_prompts():
+    """Skill prompts only embed the title and skill sections"""
+    print("Testing prompt slicing...")
+    parsed = parse_offer(OFFER)
+    for criterion in ["context_inclusion", "skill_relevance", "skill_completeness"]:
+        full = build_prompt(criterion, CONTEXT, OFFER, parsed, slicing=False)
+        sliced = build_prompt(criterion, CONTEXT, OFFER, parsed, slicing=True)
+        assert OFFER in full
+        assert "Required Skills: Python; SQL" in sliced
+        assert "Nice-to-Have: Spark" in sliced
+        assert "predictive models" not in sliced
+        assert count_tokens(sliced) < count_tokens(full)
+        print(f"   {criterion}: {count_tokens(full)} -> {count_tokens(sliced)} tokens")
+
+    assert "Title: Data Scientist" in offer_view("skill_relevance", OFFER, parsed)
+    assert offer_view("xml_format", OFFER, parsed) == OFFER
+    print("✓ Prompt slicing works")
+
+
+def test_language_view_has_no_english_labels():
+    """The language check reads the offer's own prose, not English section headers"""
+    print("Testing language view...")
+    offer = OFFER.replace(
+        "We are looking for a Data Scientist to turn our data into decisions.",
+        "Nous recherchons un Data Scientist pour transformer nos données en décisions.",
+    )
+    view = offer_view("language_consistency", offer, parse_offer(offer))
+    print(f"   {view!r}")
+    assert view.startswith("Nous recherchons")
+    assert "Overview" not in view and "Key Responsibilities" not in view
+    assert "Develop predictive models" in view
+    print("✓ Language view has no English labels")
+
+
+def test_unparseable_offer_falls_back():
+    """Offers without recognizable sections are sent whole, whitespace-collapsed"""
+    print("Testing unparseable offer...")
+    offer = "Data Scientist\n\n  Skills: Python,   SQL"
+    view = offer_view("skill_relevance", offer, parse_offer(offer))
+    assert view == "Data Scientist Skills: Python, SQL"
+    print("✓ Unparseable offers fall back to the raw text")
+
+
+def test_parse_verdict():
+    """Judge answers are parsed with the same defaults as before"""
+    print("Testing verdict parsing...")
+    assert parse_verdict("language_consistency", '```json\n{"answer": "YES"}\n```') == 1.0
+    assert parse_verdict("xml_format", '{"valid_xml": false}') == 0.0
+    assert parse_verdict("skill_relevance", '{"final_score": 0.8}') == 0.8
+    assert parse_verdict("skill_relevance", "ERROR: Get judge completion failed") == 0.5
+    assert parse_verdict("context_inclusion", "not json") == 0.0
+    print("✓ Verdict parsing works")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING JUDGE PROMPTS")
+    print("="*50)
+    test_sliced_prompts()
+    test_language_view_has_no_english_labels()
+    test_unparseable_offer_falls_back()
+    test_parse_verdict()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test file for the event-loop lag monitor
+Blocks the loop on purpose and checks the lag and the captured stack
+"""
+
+import asyncio
+import sys
+import time
+sys.path.append('src/summarizer')
+
+from loop_monitor import LoopLagMonitor, install_event_loop
+
+
+def blocking_report():
+    """Stands in for a synchronous call such as op_client.report"""
+    time.sleep(0.3)
+
+
+def test_slow_callback_is_caught():
+    """A callback that blocks the loop shows up in the lag and with its stack"""
+    print("Testing slow callback detection...")
+
+    async def run():
+        monitor = LoopLagMonitor(interval=0.005, slow_callback_seconds=0.1).start()
+        await asyncio.sleep(0.05)
+        blocking_report()
+        await asyncio.sleep(0.05)
+        monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    stats = monitor.stats()
+    print(f"   {stats}")
+    assert stats["lag_max_ms"] >= 250
+    assert stats["slow_callbacks"] == 1
+    assert 0.1 <= monitor.slow_callbacks[0].seconds <= 0.35
+    assert any("blocking_report" in line for line in monitor.slow_callbacks[0].stack)
+    assert sum(monitor.histogram) == len(monitor.samples)
+    assert monitor.step_metrics()["loop/slow_callbacks"] == 1
+
+    monitor.reset()
+    assert monitor.stats()["slow_callbacks"] == 0
+    print("✓ Slow callback caught with its stack")
+
+
+def test_event_loop_choice():
+    """The asyncio loop is the default; uvloop falls back when missing"""
+    print("Testing event loop choice...")
+    assert install_event_loop("asyncio") == "asyncio"
+    try:
+        import uvloop  # noqa: F401
+        print("   uvloop is installed, not testing the fallback")
+    except ImportError:
+        assert install_event_loop("uvloop") == "asyncio"
+    asyncio.set_event_loop_policy(None)
+    print("✓ Event loop choice works")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING LOOP MONITOR")
+    print("="*50)
+    test_slow_callback_is_caught()
+    test_event_loop_choice()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
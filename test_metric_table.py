@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test file for the columnar metric table
+"""
+
+import random
+import sys
+import time
+sys.path.append('src/summarizer')
+
+import art
+import numpy as np
+from group_filter import reward_std
+from metric_table import MetricTable
+
+
+def trajectory(reward, language="en", **metrics):
+    return art.Trajectory(
+        messages_and_choices=[], reward=reward, metrics=metrics, metadata={"language": language}
+    )
+
+
+def test_aggregates_match_loops():
+    """Means, variances and group spreads match the Python loops they replace"""
+    print("Testing aggregates...")
+    rng = random.Random(0)
+    groups = [
+        art.TrajectoryGroup([trajectory(rng.uniform(0, 10), rng.choice(["en", "fr"])) for _ in range(rng.randint(1, 5))])
+        for _ in range(30)
+    ]
+    groups.append(art.TrajectoryGroup([trajectory(7.3), trajectory(7.3)]))
+    table = MetricTable.from_groups(groups)
+    rewards = [t.reward for g in groups for t in g]
+    assert len(table) == len(rewards)
+    assert abs(table.mean_reward() - sum(rewards) / len(rewards)) < 1e-9
+    assert abs(table.reward_variance() - float(np.var(rewards))) < 1e-9
+    assert np.allclose(table.group_reward_std(), [reward_std(g) for g in groups])
+    assert table.group_reward_std()[-1] == 0.0
+    print("✓ Aggregates match")
+
+
+def test_slices():
+    """Per-language and per-criterion means, ignoring trajectories without the metric"""
+    print("Testing slices...")
+    table = MetricTable.from_groups([
+        art.TrajectoryGroup([
+            trajectory(8.0, "en", xml_format=1.0, cascade_gate_fired=1.0),
+            trajectory(6.0, "en", xml_format=0.0),
+            trajectory(4.0, "fr", xml_format=1.0),
+        ])
+    ])
+    metrics = table.slice_metrics()
+    assert metrics["language/en/reward"] == 7.0 and metrics["language/fr/reward"] == 4.0
+    assert metrics["language/en/xml_format"] == 0.5 and metrics["language/fr/xml_format"] == 1.0
+    assert metrics["language/en/trajectories"] == 2
+    assert abs(metrics["criteria/xml_format"] - 2 / 3) < 1e-9
+    assert table.metric_sum("cascade_gate_fired") == 1.0 and table.metric_sum("missing") == 0.0
+    assert MetricTable.from_groups([]).mean_reward() == 0.0 and MetricTable.from_groups([]).slice_metrics() == {}
+    print("✓ Slices computed")
+
+
+def test_scales_to_10k_trajectories():
+    """10k trajectories are aggregated into one row per group and slice (timing is printed, not asserted)"""
+    print("Testing scale...")
+    rng = random.Random(0)
+    groups = [
+        art.TrajectoryGroup([
+            trajectory(rng.uniform(0, 10), rng.choice(["en", "fr"]), language_consistency=1.0, xml_format=rng.random(),
+                       context_inclusion=rng.random(), skill_relevance=rng.random(), skill_completeness=rng.random())
+            for _ in range(10)
+        ])
+        for _ in range(1000)
+    ]
+    start = time.perf_counter()
+    table = MetricTable.from_groups(groups)
+    slices = table.slice_metrics()
+    stds = table.group_reward_std()
+    elapsed = time.perf_counter() - start
+    print(f"   {len(table)} trajectories in {elapsed * 1000:.0f}ms")
+    assert len(table) == 10_000 and len(stds) == 1000
+    assert slices["language/en/trajectories"] + slices["language/fr/trajectories"] == 10_000
+    print("✓ Scales to 10k trajectories")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING METRIC TABLE")
+    print("="*50)
+    test_aggregates_match_loops()
+    test_slices()
+    test_scales_to_10k_trajectories()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test file for scoring an offer while it streams in
+Feeds a partial offer to OfferScorer and checks which judge calls start early
+"""
+
+import asyncio
+import sys
+sys.path.append('src/summarizer')
+
+import rollout
+from load_documents import JobContext
+
+CONTEXT = JobContext(job_title="Data Scientist", language="en", skills=["Python"])
+OVERVIEW = "Join our analytics team to turn raw data into decisions. " * 4
+OFFER = (
+    "<job_offer><title>Data Scientist</title>"
+    f"<overview>{OVERVIEW}</overview>"
+    "<responsibilities><item>Build predictive models for the sales team</item>"
+    "<item>Design experiments and analyse their results</item></responsibilities>"
+    "<skills><item>Python</item><item>SQL</item></skills>"
+    "<nice_to_have><item>Spark</item></nice_to_have></job_offer>"
+)
+
+
+def run_scorer(chunks, final_offer, gates=(), judge_score=0.9):
+    """Stream `chunks` into a scorer, then finish on `final_offer`"""
+    calls = []
+
+    async def fake_judge(prompt, max_tokens=600, criterion="other", **kwargs):
+        calls.append(criterion)
+        await asyncio.sleep(0)
+        if criterion == "language_consistency":
+            return '{"answer": "YES"}'
+        if criterion == "xml_format":
+            return '{"valid_xml": true}'
+        return f'{{"final_score": {judge_score}}}'
+
+    async def stream_and_score():
+        scorer = rollout.OfferScorer(CONTEXT)
+        text = ""
+        early = []
+        for chunk in chunks:
+            text += chunk
+            scorer.on_text(text)
+            early.append(sorted(scorer.tasks))
+            await asyncio.sleep(0)  # Let started calls run, as while reading a stream
+        scores, sources = await scorer.finish(final_offer)
+        skipped = [criterion for criterion, source in sources.items() if source == "skipped"]
+        return scorer, early, scores, skipped
+
+    settings = {
+        "get_judge_completion": fake_judge,
+        "SKILL_MATCHING": "local",
+        "SKILL_COMPLETENESS": "judge",
+        "CASCADE_GATES": list(gates),
+    }
+    original = {name: getattr(rollout, name) for name in settings}
+    for name, value in settings.items():
+        setattr(rollout, name, value)
+    try:
+        scorer, early, scores, skipped = asyncio.run(stream_and_score())
+    finally:
+        for name, value in original.items():
+            setattr(rollout, name, value)
+    return scorer, early, scores, skipped, calls
+
+
+def test_calls_start_as_sections_close():
+    """Language starts once 300 characters of prose have closed, skill criteria after their sections"""
+    print("Testing early starts...")
+    chunks = [OFFER[i : i + 20] for i in range(0, len(OFFER), 20)]
+    scorer, early, scores, skipped, calls = run_scorer(chunks, OFFER)
+    language_at = next(i for i, started in enumerate(early) if "language_consistency" in started)
+    relevance_at = next(i for i, started in enumerate(early) if "skill_relevance" in started)
+    assert (language_at + 1) * 20 < OFFER.index("</skills>")  # With </responsibilities>
+    assert (relevance_at + 1) * 20 >= OFFER.index("</nice_to_have>")
+    assert "xml_format" not in early[-2]  # Needs the whole offer
+    assert scorer.started_early == 3 and scorer.restarted == 0
+    assert sorted(calls) == ["language_consistency", "skill_completeness", "skill_relevance", "xml_format"]
+    assert scores["skill_relevance"] == 0.9 and skipped == []
+    print(f"✓ Language started at chunk {language_at}, skill relevance at chunk {relevance_at}")
+
+
+def test_parses_once_per_closed_section():
+    """A partial offer is parsed when a section closes, not on every chunk"""
+    print("Testing parse count...")
+    parses = []
+    parse_offer = rollout.parse_offer
+
+    def counting_parse(offer):
+        parses.append(len(offer))
+        return parse_offer(offer)
+
+    rollout.parse_offer = counting_parse
+    try:
+        chunks = [OFFER[i : i + 3] for i in range(0, len(OFFER), 3)]
+        scorer, _, _, _, _ = run_scorer(chunks, OFFER)
+    finally:
+        rollout.parse_offer = parse_offer
+    # One parse per section close before all early calls started, one in finish()
+    print(f"   {len(parses)} parses for {len(chunks)} chunks")
+    assert len(parses) <= len(rollout.SECTIONS) + 1
+    assert scorer.started_early == 3
+    print("✓ Parsed once per closed section")
+
+
+def test_changed_prompt_is_rescored():
+    """A call started on text that later changed is restarted on the final offer"""
+    print("Testing restarts...")
+    scorer, _, _, _, calls = run_scorer([OFFER], OFFER)
+    assert scorer.restarted == 0  # Unchanged prompts are kept
+
+    scorer, _, _, _, calls = run_scorer([OFFER], OFFER.replace("SQL", "Pandas"))
+    assert scorer.restarted == 2  # Skill relevance and completeness
+    assert calls.count("skill_relevance") == 2 and calls.count("language_consistency") == 1
+    print("✓ Only changed prompts are rescored")
+
+
+def test_gates_wait_for_the_final_offer():
+    """Criteria started early still wait for their cascade gates"""
+    print("Testing gates with early starts...")
+    _, _, scores, skipped, calls = run_scorer([OFFER], OFFER, gates=["language_consistency"])
+    assert skipped == []
+    assert calls[0] == "language_consistency"
+    assert scores["language_consistency"] == 1.0
+    print("✓ Gates are respected")
+
+
+def test_gate_fired_without_skipped_calls():
+    """A failing gate is reported even when no judge call was left to skip"""
+    print("Testing gate fired on the last criterion...")
+    scorer, _, scores, skipped, _ = run_scorer([OFFER], OFFER, gates=["skill_completeness"], judge_score=0.2)
+    assert scores["skill_completeness"] == 0.2 and skipped == []
+    assert scorer.gate_fired
+    scorer, _, _, _, _ = run_scorer([OFFER], OFFER, gates=["skill_completeness"])
+    assert not scorer.gate_fired
+    print("✓ Gate reported")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING STREAMED SCORING")
+    print("="*50)
+    test_calls_start_as_sections_close()
+    test_parses_once_per_closed_section()
+    test_changed_prompt_is_rescored()
+    test_gates_wait_for_the_final_offer()
+    test_gate_fired_without_skipped_calls()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test file for the experience replay buffer
+"""
+
+import sys
+sys.path.append('src/summarizer')
+
+import art
+from replay_buffer import ReplayBuffer
+
+
+def group(*rewards):
+    return art.TrajectoryGroup(
+        [art.Trajectory(messages_and_choices=[{"role": "user", "content": "Generate"}], reward=r) for r in rewards]
+    )
+
+
+def test_keeps_groups_with_signal():
+    """Only groups whose rewards disagree are kept"""
+    print("Testing signal filter...")
+    replay = ReplayBuffer(fraction=0.5)
+    assert replay.add([group(5.0, 5.0), group(4.0, 6.0), group(1.0, 9.0)], step=0) == 2
+    assert replay.quota(batch_size=10, step=1) == 2
+    assert replay.quota(batch_size=2, step=1) == 1
+    print("✓ Zero-variance groups are not replayed")
+
+
+def test_sample_order_and_uses():
+    """Strongest signal first; a group is not replayed more than max_uses times"""
+    print("Testing sampling...")
+    replay = ReplayBuffer(fraction=1.0, max_uses=1)
+    weak, strong = group(4.0, 6.0), group(1.0, 9.0)
+    replay.add([weak, strong], step=0)
+    assert replay.sample(1, step=1) == [strong]
+    assert replay.sample(2, step=1) == [weak]
+    assert replay.sample(2, step=1) == []
+    assert replay.replayed == 2
+    print("✓ Sampled by signal, each group used once")
+
+
+def test_staleness_and_capacity():
+    """Groups older than max_age are evicted, and the buffer never exceeds its capacity"""
+    print("Testing staleness...")
+    replay = ReplayBuffer(fraction=1.0, max_age=2, capacity=3)
+    replay.add([group(0.0, 1.0)], step=0)
+    replay.add([group(0.0, 2.0), group(0.0, 3.0), group(0.0, 4.0)], step=1)
+    assert len(replay.entries) == 3  # The step 0 group was pushed out
+    assert replay.quota(batch_size=10, step=3) == 3
+    assert replay.quota(batch_size=10, step=4) == 0
+    print("✓ Stale groups evicted, buffer bounded")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING REPLAY BUFFER")
+    print("="*50)
+    test_keeps_groups_with_signal()
+    test_sample_order_and_uses()
+    test_staleness_and_capacity()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
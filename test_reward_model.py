@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Test file for the distilled local reward model
+Uses synthetic offers scored by a rule-based stand-in for the judge
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+sys.path.append('src/summarizer')
+
+import reward_model
+from load_documents import JobContext
+from reward_model import (
+    LocalRewardModel,
+    Verdict,
+    _MicroBatcher,
+    agreement_report,
+    harvest_verdicts,
+)
+
+TITLES = ["Data Scientist", "Backend Developer", "Product Manager", "DevOps Engineer"]
+SKILLS = ["Python", "SQL", "Docker", "Kubernetes", "Roadmapping", "Statistics", "Git", "Java"]
+
+
+def synthetic_verdict(rng):
+    title = rng.choice(TITLES)
+    language = rng.choice(["en", "fr"])
+    provided = rng.sample(SKILLS, 3)
+    kept = [s for s in provided if rng.random() > 0.4]
+    items = "\n".join(f"<item>{s}</item>" for s in kept + rng.sample(SKILLS, 2))
+    overview = (
+        "We are looking for a talented person to join our team and the product."
+        if language == "en"
+        else "Nous recherchons une personne pour rejoindre notre équipe et le produit."
+    )
+    offer = f"<job_offer>\n<title>{title}</title>\n<overview>{overview}</overview>\n" \
+            f"<responsibilities><item>Build</item></responsibilities>\n<skills>\n{items}\n</skills>\n" \
+            f"<nice_to_have><item>Mentoring</item></nice_to_have>\n</job_offer>"
+    valid = rng.random() > 0.3
+    if not valid:
+        offer = offer.replace("</skills>", "")
+    scores = {
+        "language_consistency": 1.0,
+        "xml_format": 1.0 if valid else 0.0,
+        "context_inclusion": sum(1 for s in provided if s in kept) / len(provided),
+        "skill_relevance": 0.8,
+        "skill_completeness": 0.7,
+    }
+    return Verdict(job_title=title, language=language, skills=provided, offer=offer, scores=scores)
+
+
+def test_fit_agrees_with_judge():
+    """The model should recover rule-based verdicts on held-out offers"""
+    print("Testing fit and agreement...")
+    rng = random.Random(0)
+    verdicts = [synthetic_verdict(rng) for _ in range(600)]
+    model = LocalRewardModel.fit(verdicts[:500])
+    report = agreement_report(model, verdicts[500:])
+    for criterion, stats in report.items():
+        print(f"   {criterion}: {stats}")
+
+    assert report["xml_format"]["agreement"] > 0.95
+    assert report["context_inclusion"]["mae"] < 0.15
+    assert report["total_score"]["pearson"] > 0.8
+    print("✓ Local model agrees with the judge")
+
+
+def test_save_load_and_harvest():
+    """Models round-trip through .npz and verdict logs are harvested"""
+    print("Testing save/load and harvesting...")
+    rng = random.Random(1)
+    verdicts = [synthetic_verdict(rng) for _ in range(50)]
+    model = LocalRewardModel.fit(verdicts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.npz")
+        model.save(path)
+        loaded = LocalRewardModel.load(path)
+
+        log = os.path.join(tmp, "verdicts.jsonl")
+        with open(log, "w") as f:
+            for verdict in verdicts:
+                f.write(verdict.model_dump_json() + "\n")
+            f.write(json.dumps({"trajectory": {
+                "messages_and_choices": [
+                    {"role": "user", "content": "Job Title: QA\nLanguage: en\nProvided Skills: Git, Java"},
+                    {"message": {"role": "assistant", "content": "<job_offer></job_offer>"}},
+                ],
+                "metrics": {c: 0.5 for c in reward_model.CRITERIA},
+            }}) + "\n")
+        harvested = harvest_verdicts([log])
+
+    contexts = [JobContext(job_title=v.job_title, language=v.language, skills=v.skills) for v in verdicts]
+    offers = [v.offer for v in verdicts]
+    assert (model.predict_batch(contexts, offers) == loaded.predict_batch(contexts, offers)).all()
+    assert len(harvested) == 51
+    assert harvested[-1].skills == ["Git", "Java"]
+    print("✓ Save/load and harvesting work")
+
+
+def test_micro_batching():
+    """Concurrent score requests are served by a single batched prediction"""
+    print("Testing micro-batching...")
+    rng = random.Random(2)
+    verdicts = [synthetic_verdict(rng) for _ in range(40)]
+    batcher = _MicroBatcher(LocalRewardModel.fit(verdicts), max_batch=64)
+
+    async def score_all():
+        return await asyncio.gather(
+            *[
+                batcher.score(JobContext(job_title=v.job_title, language=v.language, skills=v.skills), v.offer)
+                for v in verdicts
+            ]
+        )
+
+    results = asyncio.run(score_all())
+    print(f"   {len(results)} offers scored in {batcher.batches} batch(es)")
+    assert batcher.batches == 1
+    assert all(0.0 <= value <= 1.0 for scores in results for value in scores.values())
+    print("✓ Micro-batching works")
+
+
+def test_verdicts_are_buffered():
+    """Verdicts are written in batches off the event loop, and the rest on flush"""
+    print("Testing buffered verdict recording...")
+    rng = random.Random(3)
+    verdicts = [synthetic_verdict(rng) for _ in range(reward_model.VERDICTS_FLUSH_EVERY + 6)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "verdicts.jsonl")
+        reward_model.VERDICTS_PATH = path
+        try:
+            async def record_all():
+                for v in verdicts:
+                    reward_model.record_verdict(
+                        JobContext(job_title=v.job_title, language=v.language, skills=v.skills), v.offer, v.scores
+                    )
+
+            # asyncio.run waits for the executor, so the full batch is on disk
+            asyncio.run(record_all())
+            with open(path) as f:
+                assert len(f.readlines()) == reward_model.VERDICTS_FLUSH_EVERY
+            reward_model.flush_verdicts()
+            recorded = harvest_verdicts([path])
+        finally:
+            reward_model.VERDICTS_PATH = None
+    print(f"   {len(recorded)} verdicts recorded")
+    assert sorted(v.offer for v in recorded) == sorted(v.offer for v in verdicts)
+    print("✓ Verdicts are buffered")
+
+
+def write_large_batches(worker):
+    line = json.dumps({"worker": worker, "offer": "x" * 20000}) + "\n"
+    for _ in range(20):
+        reward_model._write_verdicts([line] * 8)
+
+
+def test_workers_do_not_interleave():
+    """Batches from several processes, far larger than an atomic write, stay whole"""
+    print("Testing verdict writes from several processes...")
+    with tempfile.TemporaryDirectory() as tmp:
+        reward_model.VERDICTS_PATH = os.path.join(tmp, "verdicts.jsonl")
+        try:
+            context = multiprocessing.get_context("fork")
+            workers = [context.Process(target=write_large_batches, args=(i,)) for i in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            with open(reward_model.VERDICTS_PATH) as f:
+                lines = [json.loads(line) for line in f]
+        finally:
+            reward_model.VERDICTS_PATH = None
+    assert len(lines) == 4 * 20 * 8
+    print("✓ Verdict batches do not interleave")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING LOCAL REWARD MODEL")
+    print("="*50)
+    test_fit_agrees_with_judge()
+    test_save_load_and_harvest()
+    test_micro_batching()
+    test_verdicts_are_buffered()
+    test_workers_do_not_interleave()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
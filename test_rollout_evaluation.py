@@ -10,7 +10,7 @@ import sys
 sys.path.append('src/summarizer')
 
 from load_documents import JobContext
-from rollout import clean_json_response
+from get_judge_completion import clean_json_response
 
 
 # Mock judge completion function for testing
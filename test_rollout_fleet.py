@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Test file for the distributed rollout work queue
+Uses the in-memory queue and a fake rollout, so no policy or judge is needed
+"""
+
+import asyncio
+import sys
+sys.path.append('src/summarizer')
+
+import art
+import httpx
+import rollout_fleet
+from openai.types.chat.chat_completion import Choice
+from load_documents import JobContext
+from rollout import JobOfferScenario
+from rollout_fleet import HttpQueue, InMemoryQueue, QueueBackend, QueueServer, RolloutFleet, WorkResult, run_worker
+from rollout_workers import RolloutWorkerError
+
+SCENARIO = JobOfferScenario(context=JobContext(job_title="Data Scientist", language="en", skills=["Python"]), step=3)
+
+
+TOKEN = "test-fleet-token"
+
+
+async def fake_rollout(model, scenario):
+    await asyncio.sleep(0.01)
+    choice = Choice.model_validate(
+        {
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": "<job_offer></job_offer>"},
+            "logprobs": {"content": [{"token": "<", "logprob": -0.1, "bytes": [60], "top_logprobs": []}]},
+        }
+    )
+    return art.Trajectory(
+        messages_and_choices=[{"role": "user", "content": scenario.context.job_title}, choice],
+        reward=float(scenario.step),
+    )
+
+
+def with_fake_rollout(test):
+    original = rollout_fleet.rollout
+    rollout_fleet.rollout = fake_rollout
+    try:
+        return asyncio.run(test())
+    finally:
+        rollout_fleet.rollout = original
+
+
+def test_group_is_one_work_item():
+    """Rollouts of one scenario issued together are run as one (scenario, n) item"""
+    print("Testing work items...")
+
+    async def run():
+        queue = InMemoryQueue()
+        fleet = RolloutFleet(queue)
+        worker = asyncio.ensure_future(run_worker(queue, None, "worker-1", poll_interval=0.01))
+        other = SCENARIO.model_copy(update={"step": 4})
+        trajectories = await asyncio.gather(*[fleet.rollout(SCENARIO) for _ in range(3)], fleet.rollout(other))
+        worker.cancel()
+        await fleet.close()
+        return fleet, trajectories
+
+    fleet, trajectories = with_fake_rollout(run)
+    assert fleet.items_published == 2
+    assert [t.reward for t in trajectories] == [3.0, 3.0, 3.0, 4.0]
+    print("✓ One work item per group")
+
+
+def test_lost_worker_lease_expires():
+    """An item leased by a dead worker goes to another worker; the late completion is ignored"""
+    print("Testing lease expiry...")
+
+    async def run():
+        queue = InMemoryQueue()
+        fleet = RolloutFleet(queue, reap_interval=0.02)
+        pending = asyncio.ensure_future(fleet.rollout(SCENARIO))
+        await asyncio.sleep(0.01)  # Let the item be published
+        # This worker leases the item, then dies without renewing it
+        lost = await queue.lease("lost-worker", lease_seconds=0.05)
+        assert lost is not None
+        await asyncio.sleep(0.1)
+        worker = asyncio.ensure_future(run_worker(queue, None, "worker-2", lease_seconds=0.05, poll_interval=0.01))
+        trajectory = await asyncio.wait_for(pending, timeout=5)
+        late = await queue.complete(lost.item.id, lost.token, WorkResult(item_id=lost.item.id))
+        worker.cancel()
+        await fleet.close()
+        return queue, trajectory, late
+
+    queue, trajectory, late = with_fake_rollout(run)
+    assert trajectory.reward == 3.0
+    assert queue.expired_leases == 1
+    assert late is False
+    print("✓ Expired leases are reassigned")
+
+
+def test_item_fails_after_max_attempts():
+    """Rollouts fail once every attempt lost its lease"""
+    print("Testing max attempts...")
+
+    async def run():
+        queue = InMemoryQueue(max_attempts=2)
+        fleet = RolloutFleet(queue, reap_interval=0.02)
+        pending = asyncio.ensure_future(fleet.rollout(SCENARIO))
+        await asyncio.sleep(0.01)  # Let the item be published
+        for _ in range(2):
+            assert await queue.lease("flaky-worker", lease_seconds=0.01) is not None
+            await asyncio.sleep(0.03)
+            await queue.reap()
+        try:
+            await asyncio.wait_for(pending, timeout=5)
+        except RolloutWorkerError as e:
+            return str(e)
+        finally:
+            await fleet.close()
+
+    error = asyncio.run(run())
+    print(f"   {error}")
+    assert "lease expired 2 times" in error
+    print("✓ Items fail after max attempts")
+
+
+def test_failed_renewal_cancels_the_rollouts():
+    """A renewal that raises counts as a lost lease, and the rollouts are cancelled"""
+    print("Testing failed lease renewal...")
+    started, cancelled = [], []
+
+    async def slow_rollout(model, scenario):
+        started.append(scenario.step)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(scenario.step)
+            raise
+
+    class UnreachableQueue(InMemoryQueue):
+        async def renew(self, item_id, token, lease_seconds=60):
+            raise httpx.ConnectError("queue unreachable")
+
+    async def run():
+        queue = UnreachableQueue()
+        fleet = RolloutFleet(queue)
+        pending = asyncio.gather(*[fleet.rollout(SCENARIO) for _ in range(2)])
+        await asyncio.sleep(0.01)  # Let the item be published
+        lease = await queue.lease("worker-1", lease_seconds=0.03)
+        await asyncio.wait_for(rollout_fleet._run_item(queue, None, lease, "worker-1", 0.03), timeout=5)
+        pending.cancel()
+        await fleet.close()
+
+    original = rollout_fleet.rollout
+    rollout_fleet.rollout = slow_rollout
+    try:
+        asyncio.run(run())
+    finally:
+        rollout_fleet.rollout = original
+    assert started == [3, 3]
+    assert cancelled == [3, 3]
+    print("✓ Failed renewals cancel the rollouts")
+
+
+def test_http_queue():
+    """Remote workers lease and complete through the HTTP server"""
+    print("Testing HTTP queue...")
+
+    async def run():
+        queue = InMemoryQueue()
+        server = QueueServer(queue, setup={"contexts": [SCENARIO.context.model_dump()]}, token=TOKEN, port=0)
+        url = await server.start()
+        remote = HttpQueue(url, token=TOKEN)
+        fleet = RolloutFleet(queue)
+        try:
+            setup = await remote.setup()
+            worker = asyncio.ensure_future(run_worker(remote, None, "remote-1", poll_interval=0.01))
+            trajectories = await asyncio.wait_for(asyncio.gather(fleet.rollout(SCENARIO), fleet.rollout(SCENARIO)), timeout=10)
+            worker.cancel()
+        finally:
+            await fleet.close()
+            await remote.close()
+            await server.stop()
+        return setup, trajectories
+
+    setup, trajectories = with_fake_rollout(run)
+    assert setup["contexts"][0]["job_title"] == "Data Scientist"
+    assert all(isinstance(t, art.Trajectory) and t.reward == 3.0 for t in trajectories)
+    # Sent as JSON, the choice still comes back as a Choice with its logprobs
+    choice = trajectories[0].messages_and_choices[-1]
+    assert isinstance(choice, Choice) and choice.logprobs.content[0].logprob == -0.1
+    print("✓ HTTP queue works")
+
+
+def test_http_queue_requires_token():
+    """Requests without the shared token are rejected, and the server binds to loopback by default"""
+    print("Testing HTTP queue authentication...")
+
+    async def run():
+        server = QueueServer(InMemoryQueue(), setup={"contexts": []}, token=TOKEN, port=0)
+        url = await server.start()
+        try:
+            async with httpx.AsyncClient(base_url=url) as client:
+                statuses = [
+                    (await client.get("/setup")).status_code,
+                    (await client.post("/lease", json={"worker": "intruder"}, headers={"Authorization": "Bearer wrong"})).status_code,
+                    (await client.get("/setup", headers={"Authorization": f"Bearer {TOKEN}"})).status_code,
+                ]
+        finally:
+            await server.stop()
+        return url, statuses
+
+    url, statuses = asyncio.run(run())
+    print(f"   {url}: {statuses}")
+    assert url.startswith("http://127.0.0.1:")
+    assert statuses == [401, 401, 200]
+    try:
+        QueueServer(InMemoryQueue(), setup={}, token=None)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected a server without a token to be refused")
+    print("✓ HTTP queue requires the token")
+
+
+def test_backends_must_implement_the_interface():
+    """A backend missing a queue method fails when built, not mid-run"""
+    print("Testing queue interface...")
+
+    class WorkerOnlyQueue(QueueBackend):
+        async def lease(self, worker, lease_seconds=60):
+            return None
+
+        async def renew(self, item_id, token, lease_seconds=60):
+            return False
+
+        async def complete(self, item_id, token, result):
+            return False
+
+    try:
+        WorkerOnlyQueue()
+    except TypeError as e:
+        print(f"   {e}")
+    else:
+        raise AssertionError("Expected the incomplete backend to be rejected")
+    print("✓ Queue interface is enforced")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING ROLLOUT FLEET")
+    print("="*50)
+    test_group_is_one_work_item()
+    test_lost_worker_lease_expires()
+    test_item_fails_after_max_attempts()
+    test_failed_renewal_cancels_the_rollouts()
+    test_http_queue()
+    test_http_queue_requires_token()
+    test_backends_must_implement_the_interface()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test file for rollout worker processes
+Runs real rollouts in a spawned worker against the mock policy server and mock judge
+"""
+
+import asyncio
+import os
+import sys
+sys.path.append('src/summarizer')
+sys.path.append('benchmarks')
+
+os.environ.pop("OPENPIPE_API_KEY", None)
+
+from mock_services import MockJudgeClient, MockPolicyServer, install_mock_judge
+from load_documents import JobContext
+from openai.types.chat.chat_completion import Choice
+from rollout import JobOfferScenario
+from rollout_workers import RolloutWorkerPool
+from usage import usage_tracker
+
+CONTEXT = JobContext(job_title="Data Scientist", language="en", skills=["Python", "SQL"])
+
+
+def init_worker():
+    install_mock_judge(MockJudgeClient(latency_ms=5, sigma=0.1))
+
+
+def test_worker_pool():
+    """Trajectories come back with their Choice; cancellation reaches the worker"""
+    print("Testing rollout worker pool...")
+
+    async def run():
+        server = MockPolicyServer(latency_ms=50, sigma=0.1)
+        base_url = await server.start()
+        model_kwargs = {
+            "name": "mock-policy",
+            "project": "test",
+            "inference_api_key": "mock",
+            "inference_base_url": base_url,
+            "inference_model_name": "mock-policy",
+        }
+        usage_tracker.reset_step()
+        pool = await RolloutWorkerPool(model_kwargs, 2, initializer=init_worker).start()
+        try:
+            trajectories = await asyncio.gather(*[pool.rollout(JobOfferScenario(context=CONTEXT)) for _ in range(4)])
+            assert all(isinstance(t.messages_and_choices[-1], Choice) for t in trajectories)
+            assert all(0 <= t.reward <= 10 for t in trajectories)
+            assert pool.completed == 4 and pool.in_flight == [0, 0]
+            # Judge and policy usage recorded in the workers reaches the trainer
+            assert usage_tracker.step["policy"]["calls"] == 4
+            assert usage_tracker.step["language_consistency"]["calls"] >= 1  # Repeated prompts hit the judge cache
+
+            slow = asyncio.ensure_future(pool.rollout(JobOfferScenario(context=CONTEXT)))
+            await asyncio.sleep(0.01)
+            slow.cancel()
+            try:
+                await slow
+            except asyncio.CancelledError:
+                pass
+            assert pool.in_flight == [0, 0]
+        finally:
+            await pool.close()
+            await server.stop()
+        return trajectories
+
+    trajectories = asyncio.run(run())
+    print(f"   rewards: {[round(t.reward, 2) for t in trajectories]}")
+    print("✓ Worker pool runs and cancels rollouts")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING ROLLOUT WORKERS")
+    print("="*50)
+    test_worker_pool()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test file for the durable run state
+Simulates a crash and checks that the resumed loop continues where it stopped
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('src/summarizer')
+
+import art
+from openai.types.chat.chat_completion import Choice
+
+import run_state
+from context_sampler import ContextSampler
+from essential_skills import EssentialSkill, EssentialSkillsCache
+from load_documents import JobContext, context_id
+from replay_buffer import ReplayBuffer
+from run_state import RunState
+
+CONTEXTS = list(range(20))
+BATCH_SIZE = 4
+
+
+def run_loop(path, stop_after=None):
+    """The batch loop of train.main; returns the (contexts, backfill) of each batch run"""
+    state = RunState.load(path, model="agent") or RunState.new(model="agent", start_step=0)
+    rng = state.rng()
+    batches = []
+    for epoch in range(state.epoch, 2):
+        order = state.epoch_order(CONTEXTS, epoch)
+        for batch in range(state.first_batch(epoch), len(order) // BATCH_SIZE):
+            if stop_after is not None and len(batches) == stop_after:
+                return batches  # Crash before the state of this batch is written
+            contexts = order[batch * BATCH_SIZE:(batch + 1) * BATCH_SIZE]
+            batches.append((contexts, rng.sample(order, 2)))
+            state.advance(epoch, batch, rng, best_val_score=float(len(batches)), judge_cache_snapshot="abc")
+            state.save(path)
+    return batches
+
+
+def test_resume_continues_exactly():
+    """A crashed and resumed run trains on the same batches as an uninterrupted one"""
+    print("Testing resume...")
+    run_state.RUN_SEED = "7"
+    with tempfile.TemporaryDirectory() as tmp:
+        full = run_loop(os.path.join(tmp, "full.json"))
+        path = os.path.join(tmp, "resumed.json")
+        first = run_loop(path, stop_after=7)
+        state = RunState.load(path)
+        rest = run_loop(path)
+        assert sorted(os.listdir(tmp)) == ["full.json", "resumed.json"]
+    assert first + rest == full
+    assert (state.epoch, state.batch, state.best_val_score) == (1, 2, 7.0)
+    print(f"✓ Resumed at epoch {state.epoch + 1}, batch {state.batch + 1} with identical batches")
+
+
+def test_sampler_and_replay_are_restored():
+    """Sampling statistics and replay groups survive a restart, so the next draws match"""
+    print("Testing sampler and replay state...")
+    contexts = [JobContext(job_title=f"Job {i}", language="en", skills=[]) for i in range(8)]
+    choice = Choice(index=0, finish_reason="stop", message={"role": "assistant", "content": "<job_offer/>"})
+
+    def group(context, *rewards):
+        return art.TrajectoryGroup([
+            art.Trajectory(messages_and_choices=[choice], reward=r, metadata={"context_id": context_id(context)})
+            for r in rewards
+        ])
+
+    sampler = ContextSampler(contexts)
+    sampler.update([group(contexts[0], 2.0, 8.0), group(contexts[1], 5.0, 5.0)])
+    replay = ReplayBuffer(fraction=0.5, max_uses=2)
+    replay.add([group(contexts[0], 2.0, 8.0), group(contexts[2], 1.0, 9.0)], step=0)
+    replay.sample(1, step=1)
+
+    state = RunState.new(model="agent", start_step=0)
+    rng = state.rng()
+    state.advance(0, 0, rng, 0.0, "abc", sampler_state=sampler.state_dict(), replay_state=replay.state_dict())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run_state.json")
+        state.save(path)
+        loaded = RunState.load(path)
+
+    resumed_sampler = ContextSampler(contexts)
+    assert resumed_sampler.load_state_dict(loaded.sampler_state) == 2
+    resumed_replay = ReplayBuffer(fraction=0.5, max_uses=2)
+    assert resumed_replay.load_state_dict(loaded.replay_state) == 2
+
+    assert sampler.sample(4, loaded.rng()) == resumed_sampler.sample(4, loaded.rng())
+    assert [e.uses for e in resumed_replay.entries] == [e.uses for e in replay.entries]
+    replayed = resumed_replay.sample(1, step=1)[0]
+    assert replayed.trajectories[0].reward == replay.sample(1, step=1)[0].trajectories[0].reward
+    assert isinstance(replayed.trajectories[0].messages_and_choices[0], Choice)
+    print("✓ Sampler statistics and replay groups restored")
+
+
+def test_other_model_is_ignored():
+    """A state file of another model does not resume this one"""
+    print("Testing model check...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run_state.json")
+        RunState.new(model="other-agent", start_step=3).save(path)
+        assert RunState.load(path, model="agent") is None
+        assert RunState.load(path).start_step == 3
+        assert RunState.load(os.path.join(tmp, "missing.json")) is None
+    print("✓ Other model's state ignored")
+
+
+def test_judge_cache_snapshot():
+    """The snapshot id changes when the essential skills change"""
+    print("Testing judge cache snapshot...")
+    cache = EssentialSkillsCache(path=None)
+    empty = cache.snapshot_id()
+    cache.entries["en|data scientist"] = [EssentialSkill(skill="Python", importance=1.0)]
+    assert cache.snapshot_id() != empty
+    assert cache.snapshot_id() == cache.snapshot_id()
+    print("✓ Snapshot id follows the cache contents")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING RUN STATE")
+    print("="*50)
+    test_resume_continues_exactly()
+    test_sampler_and_replay_are_restored()
+    test_other_model_is_ignored()
+    test_judge_cache_snapshot()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
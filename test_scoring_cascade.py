@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test file for the scoring cascade
+Replaces the judge with canned answers and counts the calls it receives
+"""
+
+import asyncio
+import sys
+sys.path.append('src/summarizer')
+
+import rollout
+from load_documents import JobContext
+
+CONTEXT = JobContext(job_title="Data Scientist", language="en", skills=["Python"])
+OFFER = "<job_offer><title>Data Scientist</title><skills><item>Python</item></skills></job_offer>"
+
+
+def make_judge(language_answer, failing=()):
+    calls = []
+
+    async def fake_judge(prompt, max_tokens=600, criterion="other", **kwargs):
+        calls.append(criterion)
+        if criterion in failing:
+            return "ERROR: Get judge completion failed"
+        if criterion == "language_consistency":
+            return f'{{"answer": "{language_answer}"}}'
+        if criterion == "xml_format":
+            return '{"valid_xml": true}'
+        return '{"final_score": 0.9}'
+
+    return fake_judge, calls
+
+
+def score(language_answer, gates, cap=0.0, matching="local", failing=()):
+    """Scores, the criteria whose judge call was skipped, the judge calls and the score sources"""
+    fake_judge, calls = make_judge(language_answer, failing)
+    settings = {
+        "get_judge_completion": fake_judge,
+        "CASCADE_GATES": gates,
+        "CASCADE_CAP": cap,
+        "SKILL_COMPLETENESS": "judge",
+        "SKILL_MATCHING": matching,
+    }
+    original = {name: getattr(rollout, name) for name in settings}
+    for name, value in settings.items():
+        setattr(rollout, name, value)
+    try:
+        scores, sources = asyncio.run(rollout.judge_scores(CONTEXT, OFFER))
+    finally:
+        for name, value in original.items():
+            setattr(rollout, name, value)
+    skipped = [criterion for criterion, source in sources.items() if source == "skipped"]
+    return scores, skipped, calls, sources
+
+
+def test_gate_skips_costly_criteria():
+    """A failed language gate skips the remaining judge calls"""
+    print("Testing failed gate...")
+    scores, skipped, calls, _ = score("NO", ["language_consistency", "xml_format"])
+    print(f"   scores: {scores}, skipped: {skipped}")
+    assert calls == ["language_consistency"]
+    assert skipped == ["xml_format", "skill_relevance", "skill_completeness"]
+    assert scores["context_inclusion"] == 0.0  # Local criteria are capped too
+    assert scores["skill_relevance"] == 0.0
+    print("✓ Failed gates skip judge calls")
+
+
+def test_passing_gate_and_cap():
+    """Passing gates change nothing; the cap bounds the skipped criteria"""
+    print("Testing passing gate and cap...")
+    scores, skipped, calls, _ = score("YES", ["language_consistency", "xml_format"])
+    assert skipped == []
+    assert calls == ["language_consistency", "xml_format", "skill_relevance", "skill_completeness"]
+    assert scores["skill_relevance"] == 0.9
+
+    scores, skipped, _, _ = score("NO", ["language_consistency"], cap=0.3)
+    assert skipped == ["xml_format", "skill_relevance", "skill_completeness"]
+    assert scores["xml_format"] == 0.3
+    assert scores["context_inclusion"] == 0.3
+
+    scores, skipped, _, _ = score("NO", [])
+    assert skipped == []
+    print("✓ Passing gates and caps work")
+
+
+def test_score_sources():
+    """Each score says whether the judge gave it, so only pure judge verdicts are distilled"""
+    print("Testing score sources...")
+    _, _, _, sources = score("YES", [], matching="judge")
+    assert set(sources.values()) == {"judge"}
+
+    _, _, _, sources = score("YES", [])
+    assert sources["context_inclusion"] == "local"
+
+    _, _, _, sources = score("NO", ["language_consistency"])
+    assert sources["language_consistency"] == "judge"
+    assert sources["context_inclusion"] == "capped" and sources["xml_format"] == "skipped"
+
+    _, _, _, sources = score("YES", [], matching="judge", failing=["skill_relevance"])
+    assert sources["skill_relevance"] == "error" and sources["xml_format"] == "judge"
+    print(f"✓ Sources tracked: {sources}")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING SCORING CASCADE")
+    print("="*50)
+    test_gate_skips_costly_criteria()
+    test_passing_gate_and_cap()
+    test_score_sources()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
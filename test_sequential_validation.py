@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test file for sequential validation
+Uses fake rollouts with known rewards, so no policy or judge is needed
+"""
+
+import asyncio
+import random
+import sys
+sys.path.append('src/summarizer')
+
+import art
+from load_documents import JobContext
+from sequential_validation import SequentialValidator, confidence_interval
+from straggler import StragglerPolicy
+
+CONTEXTS = [JobContext(job_title=f"Job {i}", language="en", skills=[]) for i in range(100)]
+POLICY = StragglerPolicy()
+
+
+def fake_rollout(rewards):
+    """Rollouts whose reward is the context's fixed reward plus noise"""
+    async def make(context):
+        index = int(context.job_title.split()[1])
+        return art.Trajectory(messages_and_choices=[], reward=rewards[index] + random.gauss(0, 0.1))
+    return make
+
+
+def validate(rewards, best, seed=0, error_rate=0.05):
+    random.seed(seed)
+    validator = SequentialValidator(error_rate=error_rate, round_contexts=10)
+    return asyncio.run(validator.validate(
+        CONTEXTS, fake_rollout(rewards), best, POLICY, rng=random.Random(seed), pbar_desc=None
+    ))
+
+
+def test_interval_is_exact_for_full_population():
+    """With every context in, the interval collapses to the mean"""
+    print("Testing confidence interval...")
+    assert confidence_interval([1.0, 2.0, 3.0], population=3, z=2.0) == (2.0, 2.0, 2.0)
+    mean, low, high = confidence_interval([1.0, 2.0, 3.0], population=30, z=2.0)
+    assert low < mean == 2.0 < high
+    print("✓ Interval shrinks to the exact mean")
+
+
+def test_stops_early_below_the_best():
+    """A score far below the best stops after the first round"""
+    print("Testing early stop...")
+    rewards = [random.Random(i).uniform(6.0, 8.0) for i in range(100)]
+    groups, stats = validate(rewards, best=9.5)
+    assert stats["contexts"] == 10 and not stats["improved"] and len(groups) == 10
+    assert stats["completed"] == 20
+    print(f"✓ Stopped after {stats['contexts']} of {len(CONTEXTS)} contexts")
+
+
+def test_saves_are_validated_to_the_end():
+    """A score clearly above the best is still validated on every context, so the new best is not biased"""
+    print("Testing saved steps...")
+    rewards = [random.Random(i).uniform(6.0, 8.0) for i in range(100)]
+    groups, stats = validate(rewards, best=3.0)
+    assert stats["improved"] and stats["contexts"] == len(CONTEXTS)
+    exact = sum(sum(t.reward for t in group) / len(group.trajectories) for group in groups) / len(groups)
+    assert abs(stats["score"] - exact) < 1e-9 and stats["ci_low"] == stats["score"]
+    print(f"✓ Saved with the full-set score {stats['score']:.3f}")
+
+
+def test_deadline_covers_all_rounds():
+    """The straggler deadline bounds the whole validation, not each round"""
+    print("Testing deadline across rounds...")
+
+    async def slow_rollout(context):
+        await asyncio.sleep(0.1)
+        return art.Trajectory(messages_and_choices=[], reward=5.0)
+
+    validator = SequentialValidator(round_contexts=10)
+    policy = StragglerPolicy(deadline=0.25)
+    _, stats = asyncio.run(validator.validate(CONTEXTS, slow_rollout, -1.0, policy, pbar_desc=None))
+    print(f"   {stats['contexts']} contexts started, {stats['dropped_groups']} groups dropped")
+    # Rounds take 0.1s each; a deadline restarted every round would let all 10 run
+    assert stats["contexts"] <= 30 and stats["contexts_saved"] >= 70
+    print("✓ Deadline shared by the rounds")
+
+
+def test_close_call_uses_all_contexts():
+    """When the score is right at the best, validation runs to the end and decides exactly"""
+    print("Testing close calls...")
+    rewards = [random.Random(i).uniform(0.0, 10.0) for i in range(100)]
+    random.seed(1)
+    _, stats = validate(rewards, best=sum(rewards) / len(rewards))
+    assert stats["contexts"] == 100 and stats["contexts_saved"] == 0
+    assert stats["ci_low"] == stats["score"] == stats["ci_high"]
+    print("✓ Close calls are decided on the full set")
+
+
+def test_error_rate():
+    """Wrong early decisions stay below the error rate"""
+    print("Testing error rate...")
+    rewards = [random.Random(i).uniform(0.0, 10.0) for i in range(100)]
+    true_mean = sum(rewards) / len(rewards)
+    wrong = 0
+    trials = 100
+    for seed in range(trials):
+        for best in (true_mean - 0.3, true_mean + 0.3):
+            _, stats = validate(rewards, best=best, seed=seed)
+            wrong += stats["improved"] != (true_mean > best)
+    print(f"   {wrong}/{2 * trials} wrong decisions")
+    assert wrong / (2 * trials) <= 0.05
+    print("✓ Error rate respected")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING SEQUENTIAL VALIDATION")
+    print("="*50)
+    test_interval_is_exact_for_full_population()
+    test_stops_early_below_the_best()
+    test_saves_are_validated_to_the_end()
+    test_deadline_covers_all_rounds()
+    test_close_call_uses_all_contexts()
+    test_error_rate()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
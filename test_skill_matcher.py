@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test file for the offer parser and local skill matching
+"""
+
+import sys
+sys.path.append('src/summarizer')
+
+from offer_parser import parse_offer
+from skill_matcher import SkillIndex, context_inclusion, match_skills, normalize_skill
+
+OFFER = """<job_offer>
+<title>Data Scientist</title>
+<overview>
+We are looking for a   Data Scientist.
+</overview>
+<responsibilities>
+<item>Build models</item>
+</responsibilities>
+<skills>
+<item>Python Programming</item>
+<item>ML</item>
+<item>SQL</item>
+</skills>
+<nice_to_have>
+<item>Machine Learning</item>
+<item>Docker</item>
+</nice_to_have>
+</job_offer>"""
+
+
+def test_parse_offer():
+    """Sections are extracted, including from malformed offers"""
+    print("Testing offer parsing...")
+    parsed = parse_offer(OFFER)
+    assert parsed.title == "Data Scientist"
+    assert parsed.overview == "We are looking for a Data Scientist."
+    assert parsed.skills == ["Python Programming", "ML", "SQL"]
+    assert parsed.all_skills[-1] == "Docker"
+
+    malformed = parse_offer(OFFER.replace("</skills>", "") + "\nI hope this helps!")
+    assert malformed.skills == ["Python Programming", "ML", "SQL"]
+    assert parse_offer(None).skills == []
+    print("✓ Offer parsing works")
+
+
+def test_parse_other_item_tags():
+    """Entries in tags other than <item> are parsed, one per line or all on one line"""
+    print("Testing other item tags...")
+    multiline = "<skills>\n<skill>Python</skill>\n<skill>SQL</skill>\n</skills>"
+    single_line = "<skills><skill>Python</skill><skill>SQL</skill></skills>"
+    for offer in (multiline, single_line):
+        assert parse_offer(offer).skills == ["Python", "SQL"]
+    nested = "<responsibilities><responsibility><name>Build</name> models</responsibility></responsibilities>"
+    assert parse_offer(nested).responsibilities == ["Build models"]
+    print("✓ Other item tags are parsed")
+
+
+def test_normalization():
+    """Aliases and filler words map variants onto one canonical skill"""
+    print("Testing skill normalization...")
+    assert normalize_skill("Python Programming") == normalize_skill("python")
+    assert normalize_skill("ML") == normalize_skill("Machine Learning")
+    assert normalize_skill("Gestion de projet") == normalize_skill("Project Management")
+    assert normalize_skill("Java") != normalize_skill("JavaScript")
+    print("✓ Skill normalization works")
+
+
+def test_context_inclusion():
+    """base_score x deduplication_factor is computed locally"""
+    print("Testing context inclusion...")
+    index = SkillIndex(["Python", "SQL", "Machine Learning", "Docker", "JavaScript"])
+    result = context_inclusion(["Python", "SQL", "Machine Learning", "Java"], parse_offer(OFFER).all_skills, index)
+    print(f"   {result}")
+
+    assert result["matched_skills"] == ["Python", "SQL", "Machine Learning"]
+    assert result["missing_skills"] == ["Java"]
+    assert result["duplicate_groups"] == [["ML", "Machine Learning"]]
+    assert result["base_score"] == 0.75
+    assert result["deduplication_factor"] == 0.8
+    assert abs(result["final_score"] - 0.6) < 1e-9
+
+    empty = context_inclusion(["Python"], [], index)
+    assert empty["final_score"] == 0.0
+    print("✓ Context inclusion works")
+
+
+def test_near_misses_do_not_match():
+    """Skills that differ in one distinguishing word are different skills"""
+    print("Testing near-miss skills...")
+    index = SkillIndex(["Project Management", "Product Management", "React", "React Native", "Python"])
+    pairs = [
+        ("Project Management", "Product Management"),
+        ("Product Management", "Project Management"),
+        ("React", "React Native"),
+        ("React Native", "React"),
+        ("Java", "JavaScript"),
+    ]
+    for required, extracted in pairs:
+        matched, missing = match_skills([required], [extracted], index)
+        print(f"   {required!r} vs {extracted!r}: {'match' if matched else 'no match'}")
+        assert missing == [required], f"{required!r} should not be covered by {extracted!r}"
+
+    # Variants of the same skill still match
+    for required, extracted in [("Python", "Python 3"), ("Testing", "Unit Testing"), ("Microservice", "Microservices"), ("Data Engineering", "Data Enginering")]:
+        matched, _ = match_skills([required], [extracted], index)
+        assert matched == [required], f"{required!r} should be covered by {extracted!r}"
+
+    result = context_inclusion(["Project Management"], ["Project Management", "Product Management"], index)
+    assert result["duplicate_count"] == 0
+    print("✓ Near misses do not match")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING SKILL MATCHING")
+    print("="*50)
+    test_parse_offer()
+    test_parse_other_item_tags()
+    test_normalization()
+    test_context_inclusion()
+    test_near_misses_do_not_match()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
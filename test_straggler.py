@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test file for the straggler cancellation policy
+Uses fake rollouts with controlled latency instead of the policy model
+"""
+
+import asyncio
+import os
+import sys
+import time
+sys.path.append('src/summarizer')
+
+import art
+from adaptive_sampler import AdaptiveRolloutPolicy
+from load_documents import JobContext
+from straggler import StragglerPolicy, gather_groups_with_deadline
+
+
+async def fake_rollout(delay, reward=1.0, fail=False):
+    await asyncio.sleep(delay)
+    if fail:
+        raise RuntimeError("rollout failed")
+    return art.Trajectory(messages_and_choices=[], reward=reward)
+
+
+def test_hard_deadline_cancels_stragglers():
+    """A hung rollout must not hold the step past the deadline"""
+    print("Testing hard deadline...")
+    groups = [
+        [fake_rollout(0.01) for _ in range(4)],
+        [fake_rollout(0.01) for _ in range(3)] + [fake_rollout(60)],  # one hung rollout
+        [fake_rollout(0.01)] + [fake_rollout(60) for _ in range(3)],  # mostly hung
+    ]
+    policy = StragglerPolicy(deadline=0.2, min_trajectories=2)
+
+    start = time.monotonic()
+    kept, stats = asyncio.run(gather_groups_with_deadline(groups, policy, pbar_desc=None))
+    elapsed = time.monotonic() - start
+    print(f"   elapsed: {elapsed:.2f}s, stats: {stats}")
+
+    assert elapsed < 1.0
+    assert [len(g) for g in kept] == [4, 3]
+    assert stats["cancelled"] == 4
+    assert stats["partial_groups"] == 1
+    assert stats["dropped_groups"] == 1
+    print("✓ Hard deadline works")
+
+
+def test_quantile_cutoff():
+    """Once most rollouts finished, stragglers only get slack x elapsed time"""
+    print("Testing quantile cutoff...")
+    groups = [[fake_rollout(0.05) for _ in range(9)] + [fake_rollout(60)]]
+    policy = StragglerPolicy(quantile=0.9, slack=2.0, min_trajectories=1)
+
+    start = time.monotonic()
+    kept, stats = asyncio.run(gather_groups_with_deadline(groups, policy, pbar_desc=None))
+    elapsed = time.monotonic() - start
+    print(f"   elapsed: {elapsed:.2f}s, stats: {stats}")
+
+    assert elapsed < 0.5
+    assert len(kept[0]) == 9
+    assert stats["cancelled"] == 1
+    print("✓ Quantile cutoff works")
+
+
+def test_failures_are_recorded():
+    """Failed rollouts are kept as group exceptions instead of failing the step"""
+    print("Testing rollout failures...")
+    groups = [[fake_rollout(0.01), fake_rollout(0.01), fake_rollout(0.01, fail=True)]]
+    kept, stats = asyncio.run(
+        gather_groups_with_deadline(groups, StragglerPolicy(tolerate_failures=True), pbar_desc=None)
+    )
+    assert len(kept[0]) == 2
+    assert len(kept[0].exceptions) == 1
+    assert stats["failed"] == 1
+    print("✓ Failures are recorded")
+
+
+def test_failures_raise_by_default():
+    """Without a cutoff or tolerance, a failed rollout fails the step instead of dropping its context"""
+    print("Testing rollout failures without tolerance...")
+    groups = [[fake_rollout(0.01), fake_rollout(0.01, fail=True)], [fake_rollout(60)]]
+    start = time.monotonic()
+    try:
+        asyncio.run(gather_groups_with_deadline(groups, StragglerPolicy(), pbar_desc=None))
+    except RuntimeError as e:
+        assert str(e) == "rollout failed"
+    else:
+        raise AssertionError("Expected the rollout failure to be raised")
+    # The hung rollout is cancelled, not waited for
+    assert time.monotonic() - start < 1.0
+    assert StragglerPolicy(deadline=30).tolerant
+    assert StragglerPolicy(quantile=0.9).tolerant
+    print("✓ Failures raise by default")
+
+
+def test_adaptive_expansion():
+    """Only contexts whose early rewards disagree are expanded to the full group"""
+    print("Testing adaptive rollout expansion...")
+    easy = JobContext(job_title="Easy", language="en", skills=[])
+    hard = JobContext(job_title="Hard", language="en", skills=[])
+    counter = {"Easy": 0, "Hard": 0}
+
+    def make_rollout(context):
+        counter[context.job_title] += 1
+        reward = 10.0 if context.job_title == "Easy" else float(counter["Hard"] % 3)
+        return fake_rollout(0.01, reward=reward)
+
+    policy = AdaptiveRolloutPolicy(initial_rollouts=3, max_rollouts=10)
+    contexts = [easy, hard]
+    kept, stats = asyncio.run(
+        gather_groups_with_deadline(
+            policy.initial_groups(contexts, make_rollout),
+            StragglerPolicy(),
+            pbar_desc=None,
+            expand=policy.expander(contexts, make_rollout),
+        )
+    )
+    savings = policy.savings(len(contexts), stats["rollouts"])
+    print(f"   group sizes: {[len(g) for g in kept]}, savings: {savings}")
+
+    assert [len(g) for g in kept] == [3, 10]
+    assert savings["rollouts_saved"] == 7
+    print("✓ Adaptive expansion works")
+
+
+def test_adaptive_initial_rollouts_validated():
+    """ADAPTIVE_INITIAL_ROLLOUTS below 2 or MIN_GROUP_TRAJECTORIES is rejected"""
+    print("Testing adaptive initial rollouts validation...")
+    saved = {name: os.environ.get(name) for name in ("ADAPTIVE_INITIAL_ROLLOUTS", "MIN_GROUP_TRAJECTORIES")}
+    try:
+        os.environ["MIN_GROUP_TRAJECTORIES"] = "3"
+        os.environ["ADAPTIVE_INITIAL_ROLLOUTS"] = "0"
+        assert AdaptiveRolloutPolicy.from_env(max_rollouts=10).initial_rollouts == 10
+        os.environ["ADAPTIVE_INITIAL_ROLLOUTS"] = "3"
+        assert AdaptiveRolloutPolicy.from_env(max_rollouts=10).initial_rollouts == 3
+        for initial, minimum in (("2", "3"), ("1", "1")):
+            os.environ["ADAPTIVE_INITIAL_ROLLOUTS"] = initial
+            os.environ["MIN_GROUP_TRAJECTORIES"] = minimum
+            try:
+                AdaptiveRolloutPolicy.from_env(max_rollouts=10)
+            except ValueError as e:
+                print(f"   {e}")
+            else:
+                raise AssertionError(f"Expected {initial} initial rollouts to be rejected")
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    print("✓ Initial rollouts are validated")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING STRAGGLER POLICY")
+    print("="*50)
+    test_hard_deadline_cancels_stragglers()
+    test_quantile_cutoff()
+    test_failures_are_recorded()
+    test_failures_raise_by_default()
+    test_adaptive_expansion()
+    test_adaptive_initial_rollouts_validated()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
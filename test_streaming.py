@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test file for streamed generation with early stop
+Feeds synthetic chunks instead of a policy server
+"""
+
+import asyncio
+import sys
+sys.path.append('src/summarizer')
+sys.path.append('benchmarks')
+
+from openai import AsyncOpenAI
+
+from mock_services import MockPolicyServer
+from streaming import OfferStream, stream_completion
+
+OFFER = "<job_offer>\n<title>Data Scientist</title>\n<skills><item>Python</item></skills>\n</job_offer>"
+
+
+def chunks(pieces, usage=None):
+    """Decoded chat.completion.chunk events for a list of text pieces"""
+    for piece in pieces:
+        yield {
+            "id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m",
+            "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}],
+        }
+    if usage:
+        yield {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m", "choices": [], "usage": usage}
+
+
+def consume(pieces, usage=None, **kwargs):
+    """Feed chunks until the stream stops reading; returns the number of chunks read"""
+    stream = OfferStream(**kwargs)
+    sent = 0
+    for chunk in chunks(pieces, usage):
+        sent += 1
+        try:
+            stream.on_chunk(chunk)
+        except StopIteration:
+            break
+    return sent, stream, stream.completion()
+
+
+def tokens(text):
+    return [text[i : i + 3] for i in range(0, len(text), 3)]
+
+
+def test_stops_at_closing_tag():
+    """Reading stops at </job_offer> and rambling is never consumed"""
+    print("Testing early stop...")
+    rambling = "\n\nI hope this job offer meets your needs! " * 20
+    pieces = tokens(OFFER + rambling)
+    sent, stream, completion = consume(pieces)
+    print(f"   read {sent}/{len(pieces)} chunks, stop reason {stream.stop_reason}")
+    assert stream.stop_reason == "closed"
+    assert stream.offer == OFFER
+    assert sent < len(pieces) // 2
+    assert completion.choices[0].message.content.startswith(OFFER)
+    print("✓ Streams stop at </job_offer>")
+
+
+def test_aborts_broken_output():
+    """Output without a root tag or stuck in a loop is aborted"""
+    print("Testing early abort...")
+    _, stream, _ = consume(tokens("Sure! Here is a great job offer for you. " * 20), abort_without_root_chars=100)
+    assert stream.stop_reason == "no_root" and stream.aborted
+    assert len(stream.text) < 110
+
+    looping = "<job_offer>\n" + "<item>Python</item>\n" * 50
+    _, stream, _ = consume(tokens(looping), abort_repeated_lines=5)
+    assert stream.stop_reason == "repetition"
+    assert stream.text.count("<item>") < 10
+    print("✓ Broken output is aborted early")
+
+
+def test_natural_finish_keeps_usage():
+    """A stream that runs to the end keeps its usage chunk"""
+    print("Testing natural finish...")
+    usage = {"prompt_tokens": 100, "completion_tokens": 30, "total_tokens": 130}
+    pieces = tokens("<job_offer>\n<title>Chef</title>\n")
+    sent, stream, completion = consume(pieces, usage=usage)
+    assert stream.stop_reason is None and sent == len(pieces) + 1
+    assert completion.usage.completion_tokens == 30
+    assert completion.choices[0].message.content == stream.text
+    print("✓ Natural finish works")
+
+
+def test_streams_from_a_server():
+    """stream_completion reads server-sent events and closes the response at </job_offer>"""
+    print("Testing a streamed request...")
+
+    async def run():
+        server = MockPolicyServer(latency_ms=50, sigma=0.0)
+        client = AsyncOpenAI(base_url=await server.start(), api_key="mock")
+        try:
+            stream = OfferStream()
+            completion = await stream_completion(
+                client, "mock", [{"role": "user", "content": "Job Title: Chef\nLanguage: en"}], 1500, stream
+            )
+            return stream, completion
+        finally:
+            await client.close()
+            await server.stop()
+
+    stream, completion = asyncio.run(run())
+    print(f"   {stream.chunks} chunks, stop reason {stream.stop_reason}")
+    assert stream.stop_reason == "closed" and stream.offer.endswith("</job_offer>")
+    assert completion.choices[0].message.content.startswith(stream.offer)
+    assert completion.id.startswith("mock-")
+    print("✓ Streamed request works")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING STREAMED GENERATION")
+    print("="*50)
+    test_stops_at_closing_tag()
+    test_aborts_broken_output()
+    test_natural_finish_keeps_usage()
+    test_streams_from_a_server()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test file for token/cost accounting and the hourly budget guard
+Uses a local mock judge client instead of Azure
+"""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+sys.path.append('src/summarizer')
+
+import get_judge_completion
+from judge_pool import JudgeEndpoint, JudgePool
+from usage import BudgetGuard, UsageTracker, usage_tracker
+
+
+class UsageJudgeClient:
+    """Mimics AsyncAzureOpenAI.chat.completions and reports token usage"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, model, temperature, max_tokens, timeout):
+        message = SimpleNamespace(content='{"answer": "YES"}')
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_tracker_counters():
+    """Usage is aggregated per criterion, per step and per run"""
+    print("Testing usage counters...")
+    tracker = UsageTracker()
+    tracker.record("skill_relevance", 1_000_000, 0)
+    tracker.record("xml_format", 0, 100_000)
+    tracker.record("policy", 500, 1500, policy=True)
+    metrics = tracker.step_metrics()
+    print(f"   {metrics}")
+
+    assert metrics["usage/skill_relevance/prompt_tokens"] == 1_000_000
+    assert metrics["usage/xml_format/calls"] == 1
+    assert abs(metrics["usage/judge_cost"] - 3.5) < 1e-9  # $2.50 input + $1.00 output
+    assert metrics["usage/policy/completion_tokens"] == 1500
+
+    tracker.reset_step()
+    tracker.record("xml_format", 1000, 0)
+    metrics = tracker.step_metrics()
+    assert "usage/skill_relevance/calls" not in metrics
+    assert metrics["usage/run_cost"] > 3.5
+    print("✓ Usage counters work")
+
+
+def test_merge_worker_counters():
+    """Counters from rollout worker processes add up in the trainer"""
+    print("Testing merged counters...")
+    tracker = UsageTracker()
+    tracker.record("xml_format", 100, 10)
+    tracker.merge({"xml_format": {"calls": 2, "prompt_tokens": 200, "completion_tokens": 20, "cost": 0.5}})
+    assert tracker.step["xml_format"]["calls"] == 3
+    assert tracker.run["xml_format"]["prompt_tokens"] == 300
+    assert tracker.step_metrics()["usage/xml_format/cost"] > 0.5
+    print("✓ Worker counters are merged")
+
+
+def test_judge_usage_is_recorded():
+    """Billed judge calls are recorded under their criterion, cache hits are not"""
+    print("Testing judge usage capture...")
+    get_judge_completion.judge_pool = JudgePool(
+        [JudgeEndpoint(name="usage-judge", client=UsageJudgeClient(), deployment="mock")]
+    )
+    get_judge_completion.get_judge_completion.cache_clear()
+    usage_tracker.reset_step()
+
+    async def run():
+        for _ in range(3):
+            await get_judge_completion.get_judge_completion("Is this English?", criterion="language_consistency")
+
+    asyncio.run(run())
+    entry = usage_tracker.step["language_consistency"]
+    assert entry["calls"] == 1
+    assert entry["prompt_tokens"] == 1000
+    usage_tracker.reset_step()
+    print("✓ Judge usage is captured")
+
+
+class SlowFirstJudgeClient(UsageJudgeClient):
+    """Stalls on its first call, so that call gets hedged and then cancelled"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def create(self, messages, model, temperature, max_tokens, timeout):
+        self.calls += 1
+        await asyncio.sleep(5.0 if self.calls == 1 else 0.001)
+        return await super().create(messages, model, temperature, max_tokens, timeout)
+
+
+def test_hedge_losers_are_billed():
+    """A cancelled hedge loser is billed for its prompt tokens"""
+    print("Testing hedge loser billing...")
+    pool = JudgePool(
+        [
+            JudgeEndpoint(name="slow", client=SlowFirstJudgeClient(), deployment="mock"),
+            JudgeEndpoint(name="fast", client=UsageJudgeClient(), deployment="mock"),
+        ],
+        hedge_percentile=50,
+        hedge_budget=1.0,
+        hedge_min_samples=1,
+    )
+    # One latency sample, so the first call is hedged after 10ms
+    pool.endpoints[1].latencies.append(0.01)
+    pool.pick = lambda exclude=(): next(e for e in pool.endpoints if e.name not in exclude)
+    get_judge_completion.judge_pool = pool
+    get_judge_completion.get_judge_completion.cache_clear()
+    usage_tracker.reset_step()
+
+    asyncio.run(get_judge_completion.get_judge_completion("Is this valid XML?", criterion="xml_format"))
+    entry = usage_tracker.step["xml_format"]
+    print(f"   {dict(entry)}")
+    assert pool.hedge_wins == 1
+    assert entry["calls"] == 2
+    assert entry["prompt_tokens"] == 2000  # Winner and cancelled loser
+    assert entry["completion_tokens"] == 100  # Winner only
+    usage_tracker.reset_step()
+    print("✓ Hedge losers are billed")
+
+
+def test_budget_guard():
+    """The guard trips at the ceiling and recovers as the window slides"""
+    print("Testing budget guard...")
+    guard = BudgetGuard(tokens_per_hour=1000, action="degrade", window=0.2)
+    guard.add(600, 0.01)
+    assert not guard.degraded()
+    guard.add(600, 0.01)
+    assert guard.degraded()
+    time.sleep(0.25)
+    assert not guard.degraded()
+
+    paused = BudgetGuard(usd_per_hour=1.0, action="pause", window=0.2)
+    paused.add(10, 2.0)
+    assert not paused.degraded()
+    start = time.monotonic()
+    asyncio.run(paused.wait())
+    waited = time.monotonic() - start
+    print(f"   paused for {waited:.2f}s")
+    assert 0.1 < waited < 1.0
+
+    # A zero ceiling would block every judge call forever
+    for ceiling in ({"tokens_per_hour": 0}, {"usd_per_hour": -1.0}):
+        try:
+            BudgetGuard(action="pause", **ceiling)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"Expected {ceiling} to be rejected")
+    print("✓ Budget guard works")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 TESTING USAGE ACCOUNTING")
+    print("="*50)
+    test_tracker_counters()
+    test_merge_worker_counters()
+    test_judge_usage_is_recorded()
+    test_hedge_losers_are_billed()
+    test_budget_guard()
+    print("\n✅ All tests completed successfully!")
+
+
+if __name__ == "__main__":
+    main()